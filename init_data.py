@@ -5,6 +5,8 @@ from src.instance import Instance
 parser = ArgumentParser(prog="init_data.py")
 parser.add_argument("-p", "--period", type=str, metavar="str",
                     help="symbols treading, default 1d, Valid periods: 1d,5d,1mo,3mo,6mo,1y,2y,5y,10y,ytd,max")
+parser.add_argument("--profile", action="store_true",
+                    help="Profile the run and its workers into the log folder. Default PROFILE in config")
 
 group = parser.add_mutually_exclusive_group()
 # Group arguments setup
@@ -14,6 +16,8 @@ group.add_argument("-c", "--config", action="store_true", help="Print the curren
 # Level 0. Fetch
 group.add_argument("-f", "--fetch", action="store_true", help="fetch full symbols from alphavantage.")
 group.add_argument("-i", "--info", action="store_true", help="fetch symbols info yfinance.")
+group.add_argument("-db", "--import-db", action="store_true",
+                   help="import daily csv files into the PostgreSQL ohlcv table.")
 
 # Level 1. Analysis
 group.add_argument("-a", "--analyses", action="store_true", help="analyses symbols")
@@ -30,6 +34,10 @@ args = parser.parse_args()
 period = args.period if args.period else "1d"
 # Create Instance
 _ = Instance()
+# --profile, stats of this process and every worker are merged at exit
+if args.profile or _._config.__dict__.get("PROFILE", False):
+    from src.utilities.profiler import start_profiler
+    profiler = start_profiler(_._config.ROOT_Logs, "init_data")
 
 if args.version:
     exit(f"Stock Pattern Master - init_data.py: version {_._config.VERSION}")
@@ -45,6 +53,16 @@ if args.fetch:
 if args.info:
     _._engine.Trading().fetch_symbols_info()
 
+# level 0.c Copy daily csv history into PostgreSQL, read by pgsql_loader:PgSqlLoader
+if args.import_db:
+    from src.services.loading.loader.pgsql_loader import PgSqlLoader
+    db_loader = PgSqlLoader(_._config.__dict__)
+    try:
+        db_loader.create_schema()
+        db_loader.import_csv(sorted(_._config.FOLDER_Daily.glob("*.csv")))
+    finally:
+        db_loader.close()
+
 # Level 1. Analysis, full stock symbols and each symbol's info does analyses.
 if args.analysis:
     _._engine.Symbol().analyze_symbols_full_list()
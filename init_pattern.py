@@ -31,6 +31,21 @@ parser.add_argument("-r", "--right", type=int, metavar="int", default=6,
 parser.add_argument("--save", type=Path, nargs="?", const=_.instance.FOLDER_Images,
                     help="Specify the save directory")
 parser.add_argument("--idx", type=int, default=0, help="Index to local")
+parser.add_argument("--kernel", type=str, choices=("pandas", "array"), default=None,
+                    help="Pattern finders implementation. Default PATTERN_KERNEL in config or pandas")
+parser.add_argument("--walk-from", type=datetime.fromisoformat, metavar="str", default=None,
+                    help="Walk-forward scan. ISO format date YYYY-MM-DD of the first as-of date")
+parser.add_argument("--walk-step", type=int, metavar="int", default=1,
+                    help="Walk-forward scan. Number of bars between as-of dates")
+parser.add_argument("--walk-bars", type=int, metavar="int", default=160,
+                    help="Walk-forward scan. Number of bars in each as-of frame")
+parser.add_argument("--backtest", type=int, nargs="*", metavar="int", default=None,
+                    help="Backtest detections over the given horizons in bars. Default 5 10 20")
+parser.add_argument("--timings", action="store_true",
+                    help="Time every stage of the scan, summary logged and written to the log folder. "
+                         "Default SCAN_TIMINGS in config")
+parser.add_argument("--profile", action="store_true",
+                    help="Profile the scan and its workers into the log folder. Default PROFILE in config")
 parser.add_argument("-v", "--version", action="store_true", help="Print the current version.")
 
 # Parser Group
@@ -74,6 +89,11 @@ if config["DATA_PATH"] == "" or not data_path.exists():
 # get "args"
 args = parser.parse_args()
 
+# --profile, stats of this process and every worker are merged at exit
+if args.profile or config.get("PROFILE", False):
+    from src.utilities.profiler import start_profiler
+    profiler = start_profiler(_.instance.config.ROOT_Logs, "init_pattern")
+
 # -v --version
 if args.version:
     exit(
@@ -191,5 +211,14 @@ if sym_list is not None and not (
 
 # Process by patterns
 futures: List[concurrent.futures.Future] = []
+if args.walk_from:
+    detections = scaner.process_walk_forward(
+        symbol_list, key, futures, start=args.walk_from, step=args.walk_step, bars=args.walk_bars)
+    print(f"walk-forward detections:{len(detections)}")
+    if args.backtest is not None:
+        print(scaner.backtest_patterns(detections, tuple(args.backtest) or (5, 10, 20)).describe())
+    exit()
 patterns = scaner.process_by_pattern_name(symbol_list, key, futures)
 print(f"patterns:{patterns}")
+if args.backtest is not None:
+    print(scaner.backtest_patterns(patterns, tuple(args.backtest) or (5, 10, 20)).describe())
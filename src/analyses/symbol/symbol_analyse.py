@@ -3,6 +3,7 @@ import pandas as pd
 from typing import List
 from src.service import Service
 from src.analyses.base_analyse import BaseAnalyse
+from src.services.loading.info_store import InfoStore
 
 
 class SymbolAnalyse(BaseAnalyse):
@@ -49,23 +50,13 @@ class SymbolAnalyse(BaseAnalyse):
         json_file_sector = self.path_exist(self._config.FOLDER_Watch / "symbols_sector.json")
         json_file_industry = self.path_exist(self._config.FOLDER_Watch / "symbols_industry.json")
 
-        json_symbols_sector = {}
-        json_symbols_industry = {}
-        for json_file in (self._config.FOLDER_Infos / "EQUITY").glob("*.json"):
-            with (open(json_file, "r")) as file:
-                data = json.load(file)
-                sector = data.get("sector", "Unknown")
-                industry = data.get("industry", "Unknown")
-                symbol = data.get("symbol", "Unknown")
-
-                # sector
-                if sector not in json_symbols_sector:
-                    json_symbols_sector[sector] = []
-                json_symbols_sector[sector].append(symbol)
-                # industry
-                if industry not in json_symbols_industry:
-                    json_symbols_industry[industry] = []
-                json_symbols_industry[industry].append(symbol)
+        store = InfoStore(self._config.FILE_Infos_Store)
+        if not store.exists():
+            store.rebuild(self._config.FOLDER_Infos)
+        equity = store.load()
+        equity = equity[equity["quoteType"] == "EQUITY"][["sector", "industry"]].replace("", "Unknown").reset_index()
+        json_symbols_sector = equity.groupby("sector")["symbol"].agg(list).to_dict()
+        json_symbols_industry = equity.groupby("industry")["symbol"].agg(list).to_dict()
 
         with open(json_file_sector, "w", encoding='utf-8') as json_file:
             json.dump({
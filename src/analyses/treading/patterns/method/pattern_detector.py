@@ -1,9 +1,12 @@
+import json
 import numpy as np
 import pandas as pd
+from pathlib import Path
+from numpy.lib.stride_tricks import sliding_window_view
 from logging import Logger
 from src import Config
 from src.instance import Instance
-from typing import NamedTuple, Optional, TypeVar, Any
+from typing import NamedTuple, Optional, TypeVar, Any, Tuple
 
 T = TypeVar("T")
 
@@ -24,10 +27,20 @@ class Line(NamedTuple):
     y_int: float
 
 
+class Extrema(NamedTuple):
+    # max / min of values[i:] and position of their first occurrence, for every i
+    max: np.ndarray
+    max_pos: np.ndarray
+    min: np.ndarray
+    min_pos: np.ndarray
+
+
 class PatternDetector:
 
-    def __init__(self, logger: Logger):
+    def __init__(self, logger: Logger, pivot_folder: Optional[Path] = None):
         self.logger = logger
+        # Folder where confirmed pivots are persisted for incremental scans
+        self.pivot_folder = pivot_folder
 
     def get_prev_index(self, index: pd.DatetimeIndex, idx: pd.Timestamp) -> int:
         pos = index.get_loc(idx)
@@ -48,35 +61,155 @@ class PatternDetector:
             return pos + 1
         raise TypeError("Expected Integer")
 
-    def get_max_min(self, df: pd.DataFrame, bars_left=6, bars_right=6) -> pd.DataFrame:
+    def get_pivot_positions(
+            self,
+            high: np.ndarray,
+            low: np.ndarray,
+            bars_left=6,
+            bars_right=6
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the integer positions of pivot highs and pivot lows.
+        A bar is a pivot high (low) if it is the first highest High (lowest Low)
+        of the `bars_left + 1 + bars_right` window it is the center candle of.
+        Windows are scanned at once with a strided view instead of a Python loop.
+        """
         window = bars_left + 1 + bars_right
-        l_max_dt = []
-        l_min_dt = []
-        cols = ["P", "V"]
+        high = np.asarray(high, dtype=np.float64)
+        low = np.asarray(low, dtype=np.float64)
+
+        if high.shape[0] < window:
+            empty = np.empty(0, dtype=np.intp)
+            return empty, empty
+
+        # NaN never wins a comparison, same as idxmax / idxmin with skipna
+        high = np.where(np.isnan(high), -np.inf, high)
+        low = np.where(np.isnan(low), np.inf, low)
 
-        for win in df.rolling(window):
-            if win.shape[0] < window:
-                continue
-            idx = win.index[bars_left + 1]  # center candle
-            if win["High"].idxmax() == idx:
-                l_max_dt.append(idx)
-            if win["Low"].idxmin() == idx:
-                l_min_dt.append(idx)
+        # center candle position of every full window
+        center = np.arange(high.shape[0] - window + 1) + bars_left + 1
+        # argmax / argmin return the first occurrence, like idxmax / idxmin
+        max_pos = sliding_window_view(high, window).argmax(axis=1) + center - bars_left - 1
+        min_pos = sliding_window_view(low, window).argmin(axis=1) + center - bars_left - 1
 
-        maxima = pd.DataFrame(df.loc[l_max_dt, ["High", "Volume"]])
+        return max_pos[max_pos == center], min_pos[min_pos == center]
+
+    def get_max_min(self, df: pd.DataFrame, bars_left=6, bars_right=6) -> pd.DataFrame:
+        cols = ["P", "V"]
+        max_pos, min_pos = self.get_pivot_positions(
+            df["High"].to_numpy(),
+            df["Low"].to_numpy(),
+            bars_left=bars_left,
+            bars_right=bars_right)
+
+        maxima = pd.DataFrame(df[["High", "Volume"]].iloc[max_pos])
         maxima.columns = cols
-        minima = pd.DataFrame(df.loc[l_min_dt, ["Low", "Volume"]])
+        minima = pd.DataFrame(df[["Low", "Volume"]].iloc[min_pos])
         minima.columns = cols
-        return pd.concat([maxima, minima]).sort_index()
+        # stable sort keeps the pivot high first when a bar is both high and low
+        return pd.concat([maxima, minima]).sort_index(kind="stable")
+
+    def get_max_min_incremental(self, df: pd.DataFrame, key: str, bars_left=6, bars_right=6) -> pd.DataFrame:
+        """Same result as get_max_min, but only bars appended since the previous call are evaluated.
+        Confirmed pivots are persisted in `pivot_folder` per key (symbol and timeframe)
+        and bars_left/bars_right. A full scan is done when there is no usable state,
+        e.g. on the first run, for back-dated scans or when history was revised.
+        """
+        if self.pivot_folder is None:
+            return self.get_max_min(df, bars_left, bars_right)
+
+        state_file = self.pivot_folder / f"{key}_{bars_left}_{bars_right}.json"
+        pivots = None
+        if state_file.exists():
+            try:
+                state = json.loads(state_file.read_bytes())
+                pivots = self._extend_pivots(df, state, bars_left, bars_right)
+            except (ValueError, KeyError, TypeError) as e:
+                self.logger.warning(f"Discarding pivot state {state_file.name}: {e!r}")
+
+        if pivots is None:
+            pivots = self.get_max_min(df, bars_left, bars_right)
+
+        if df.shape[0]:
+            state_file.write_text(json.dumps({
+                "first": df.index[0].isoformat(),
+                "last": df.index[-1].isoformat(),
+                "high": float(df["High"].iat[-1]),
+                "low": float(df["Low"].iat[-1]),
+                "pivots": [
+                    [idx.isoformat(), p, v]
+                    for idx, p, v in zip(pivots.index, pivots["P"].tolist(), pivots["V"].tolist())
+                ],
+            }))
+        return pivots
+
+    def _extend_pivots(self, df: pd.DataFrame, state: dict, bars_left: int, bars_right: int) -> Optional[pd.DataFrame]:
+        """Return pivots for df from a persisted state, or None if the state does not apply to df"""
+        window = bars_left + 1 + bars_right
+        index = df.index
+        first = pd.Timestamp(state["first"])
+        last = pd.Timestamp(state["last"])
+
+        if index.shape[0] < window:
+            return None
+        # Pivots before the previous first bar were never evaluated
+        if index[0] < first or last not in index:
+            return None
+
+        pos = index.get_loc(last)
+        if not isinstance(pos, int):
+            return None
+        # Last stored bar was revised, confirmed pivots can't be trusted
+        if df["High"].iat[pos] != state["high"] or df["Low"].iat[pos] != state["low"]:
+            return None
+
+        # Windows starting here were incomplete on the previous call
+        tail_start = pos - window + 2
+        if tail_start < 0:
+            return None
+
+        rows = state["pivots"]
+        cached = pd.DataFrame(
+            [row[1:] for row in rows],
+            index=pd.to_datetime([row[0] for row in rows], utc=True).tz_convert(index.tz),
+            columns=["P", "V"])
+        cached.index.name = index.name
+        # Drop pivots that no longer have a full window in the current frame
+        cached = cached.loc[index[bars_left + 1]:]
+
+        appended = self.get_max_min(df.iloc[tail_start:], bars_left, bars_right)
+        if cached.empty:
+            return appended
+        return pd.concat([cached, appended])
 
     def get_atr(self, high: pd.Series, low: pd.Series, close: pd.Series, window=15) -> pd.Series:
-        # Calculate true range
-        tr = pd.DataFrame(index=high.index)
-        tr["h-l"] = high - low
-        tr["h-pc"] = abs(high - close.shift(1))
-        tr["l-pc"] = abs(low - close.shift(1))
-        tr["tr"] = tr[["h-l", "h-pc", "l-pc"]].max(axis=1)
-        return tr.tr.rolling(window=window).mean()
+        # Calculate true range, fmax skips the NaN previous close of the first bar
+        prev_close = close.shift(1)
+        tr = np.fmax(high - low, np.fmax((high - prev_close).abs(), (low - prev_close).abs()))
+        return tr.rolling(window=window).mean()
+
+    def get_suffix_extrema(self, values: np.ndarray) -> Extrema:
+        """Return the max and min from every position to the end of values,
+        with the position of their first occurrence.
+        Replaces `series.loc[idx:].max()` and `series.loc[idx:].idxmax()` scans by O(1) lookups.
+        NaN are skipped as max() and idxmax() do: the max of a suffix that is all NaN
+        is NaN and its position is len(values), which is no position of values.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        size = values.shape[0]
+        reverse = values[::-1]
+        steps = np.arange(size)
+
+        def suffix(accumulate: np.ufunc) -> Tuple[np.ndarray, np.ndarray]:
+            # fmax / fmin keep the running value when they meet a NaN
+            running = accumulate.accumulate(reverse)
+            # The last time the running value is reached in reverse order
+            # is its first occurrence in forward order, NaN never reach it
+            reached = np.maximum.accumulate(np.where(reverse == running, steps, -1))
+            return running[::-1], (size - 1 - reached)[::-1]
+
+        max_val, max_pos = suffix(np.fmax)
+        min_val, min_pos = suffix(np.fmin)
+        return Extrema(max=max_val, max_pos=max_pos, min=min_val, min_pos=min_pos)
 
     def is_bullish_vcp(self, a: float, b: float, c: float, d: float, e: float, avg_bar_length: float) -> bool:
         r"""Volatility Contraction patterns
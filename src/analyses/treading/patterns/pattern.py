@@ -1,30 +1,38 @@
+import numpy as np
 import pandas as pd
-from src.analyses.treading.patterns.method.pattern_detector import PatternDetector
+import src.analyses.treading.patterns.pattern_kernel as Kernel
+from src.analyses.treading.patterns.method.pattern_detector import PatternDetector, Extrema
 from typing import Optional, Dict, Union, Callable, Tuple
 
+# pandas: label based finders below, array: integer position finders in pattern_kernel.py
+KERNELS = ("pandas", "array")
+
 
 def get_pattern_list() -> list:
     return list(get_pattern_dict().keys())
 
 
-def get_pattern_dict() -> Dict[str, Union[str, Callable]]:
+def get_pattern_dict(kernel: str = "pandas") -> Dict[str, Union[str, Callable]]:
+    if kernel not in KERNELS:
+        raise ValueError(f"Pattern kernel must be one of {', '.join(KERNELS)}")
+    finders = vars(Kernel) if kernel == "array" else globals()
     return {
         "all": "all",
         "bull": "bull",
         "bear": "bear",
-        "vcpu": find_bullish_vcp,
-        "vcpd": find_bearish_vcp,
-        "dbot": find_double_bottom,
-        "dtop": find_double_top,
-        "hnsd": find_hns,
-        "hnsu": find_reverse_hns,
-        "trng": find_triangles,
+        "vcpu": finders["find_bullish_vcp"],
+        "vcpd": finders["find_bearish_vcp"],
+        "dbot": finders["find_double_bottom"],
+        "dtop": finders["find_double_top"],
+        "hnsd": finders["find_hns"],
+        "hnsu": finders["find_reverse_hns"],
+        "trng": finders["find_triangles"],
     }
 
 
-def get_pattern_tuple(pattern_name: str) -> Tuple[Callable, ...]:
+def get_pattern_tuple(pattern_name: str, kernel: str = "pandas") -> Tuple[Callable, ...]:
     # get all support patterns
-    fn_dict = get_pattern_dict()
+    fn_dict = get_pattern_dict(kernel)
     # get function out
     fn = fn_dict[pattern_name]
     # base on fn style and name return patterns tuples
@@ -40,7 +48,23 @@ def get_pattern_tuple(pattern_name: str) -> Tuple[Callable, ...]:
         return tuple(v for k, v in fn_dict.items() if k in fn_dict.keys()[3:] and callable(v))
 
 
-def find_bullish_vcp(_: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.DataFrame) -> Optional[dict]:
+def _close_extrema(_: PatternDetector, df: pd.DataFrame, arrays: Optional[Kernel.PatternArrays]) -> Extrema:
+    """Close extrema from each bar to the end, for breach checks"""
+    if arrays is None:
+        return _.get_suffix_extrema(df["Close"].to_numpy())
+    return Extrema(max=arrays.close_max, max_pos=arrays.close_max_pos, min=arrays.close_min, min_pos=arrays.close_min_pos)
+
+
+def _atr(_: PatternDetector, df: pd.DataFrame, arrays: Optional[Kernel.PatternArrays]) -> np.ndarray:
+    """Average true range of every bar"""
+    if arrays is None:
+        return _.get_atr(df.High, df.Low, df.Close).to_numpy()
+    return arrays.atr
+
+
+def find_bullish_vcp(
+        _: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.DataFrame,
+        arrays: Optional[Kernel.PatternArrays] = None) -> Optional[dict]:
     """Find Volatility Contraction Pattern Bullish.
     Returns None if no patterns found.
     Else returns a Tuple of dicts containing local arguments and patterns data.
@@ -55,6 +79,8 @@ def find_bullish_vcp(_: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.
     assert isinstance(a_idx, pd.Timestamp)
     e_idx = df.index[-1]
     e = df.at[e_idx, "Close"]
+    # Close extrema from each bar to the end, for breach checks
+    close_ext = _close_extrema(_, df, arrays)
 
     while True:
         pos_after_a = _.get_next_index(pivots.index, a_idx)
@@ -88,10 +114,8 @@ def find_bullish_vcp(_: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.
 
         if _.is_bullish_vcp(a, b, c, d, e, avg_bar_length):
             # check if Level C has been breached after it was formed
-            if (
-                    c_idx != df.loc[c_idx:, "Close"].idxmax()
-                    or d_idx != df.loc[d_idx:, "Close"].idxmin()
-            ):
+            c_pos, d_pos = df.index.get_loc(c_idx), df.index.get_loc(d_idx)
+            if close_ext.max_pos[c_pos] != c_pos or close_ext.min_pos[d_pos] != d_pos:
                 # Level C is breached, current patterns is not valid
                 # check if C is the last pivot formed
                 if pivots.index[-1] == c_idx or pivots.index[-1] == d_idx:
@@ -120,7 +144,9 @@ def find_bullish_vcp(_: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.
         a_idx, a = c_idx, c
 
 
-def find_double_bottom(_: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.DataFrame) -> Optional[dict]:
+def find_double_bottom(
+        _: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.DataFrame,
+        arrays: Optional[Kernel.PatternArrays] = None) -> Optional[dict]:
     """Find Double bottom.
     Returns None if no patterns found.
     Else returns a Tuple of dicts containing local arguments and patterns data.
@@ -134,7 +160,8 @@ def find_double_bottom(_: PatternDetector, sym: str, df: pd.DataFrame, pivots: p
     d_idx = df.index[-1]
     d = df.at[d_idx, "Close"]
 
-    atr_ser = _.get_atr(df.High, df.Low, df.Close)
+    atr_arr = _atr(_, df, arrays)
+    close_ext = _close_extrema(_, df, arrays)
     assert isinstance(a_idx, pd.Timestamp)
 
     while True:
@@ -148,7 +175,7 @@ def find_double_bottom(_: PatternDetector, sym: str, df: pd.DataFrame, pivots: p
         b_idx = pivots.loc[a_idx:c_idx, "P"].idxmax()
         b = pivots.at[b_idx, "P"]
 
-        atr = atr_ser.at[c_idx]
+        atr = atr_arr[df.index.get_loc(c_idx)]
         if pivots.index.has_duplicates:
             if isinstance(a, (pd.Series, str)):
                 a = pivots.at[a_idx, "P"].iloc[1]
@@ -171,11 +198,12 @@ def find_double_bottom(_: PatternDetector, sym: str, df: pd.DataFrame, pivots: p
                 continue
 
             # check if Level C has been breached after it was formed
-            if c_idx != df.loc[c_idx:, "Close"].idxmin() or b_idx != df.loc[b_idx:, "Close"].idxmax():
+            b_pos, c_pos = df.index.get_loc(b_idx), df.index.get_loc(c_idx)
+            if close_ext.min_pos[c_pos] != c_pos or close_ext.max_pos[b_pos] != b_pos:
                 a_idx, a, a_vol = c_idx, c, c_vol
                 continue
 
-            if df.loc[c_idx:, "Close"].max() > b:
+            if close_ext.max[c_pos] > b:
                 a_idx, a, a_vol = c_idx, c, c_vol
                 continue
 
@@ -199,7 +227,9 @@ def find_double_bottom(_: PatternDetector, sym: str, df: pd.DataFrame, pivots: p
         a_idx, a, a_vol = c_idx, c, c_vol
 
 
-def find_reverse_hns(_: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.DataFrame) -> Optional[dict]:
+def find_reverse_hns(
+        _: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.DataFrame,
+        arrays: Optional[Kernel.PatternArrays] = None) -> Optional[dict]:
     """Find Head and Shoulders - Bullish
     Returns None if no patterns found.
     Else returns an Tuple of dicts containing local arguments and patterns data.
@@ -213,6 +243,8 @@ def find_reverse_hns(_: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.
     c_idx = pivots["P"].idxmin()
     c = pivots.at[c_idx, "P"]
     assert isinstance(c_idx, pd.Timestamp)
+    # High extrema from each bar to the end, for neckline breach check
+    high_max = _.get_suffix_extrema(df["High"].to_numpy()).max if arrays is None else arrays.high_max
 
     while True:
         pos = _.get_prev_index(pivots.index, c_idx)
@@ -263,7 +295,7 @@ def find_reverse_hns(_: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.
                 continue
 
             neckline_price = min(b, d)
-            highest_after_e = df.loc[e_idx:, "High"].max()
+            highest_after_e = high_max[df.index.get_loc(e_idx)]
             if (
                     highest_after_e > neckline_price
                     and abs(highest_after_e - neckline_price) > avgBarLength
@@ -317,7 +349,9 @@ def find_reverse_hns(_: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.
         c_idx, c = e_idx, e
 
 
-def find_bearish_vcp(_: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.DataFrame) -> Optional[dict]:
+def find_bearish_vcp(
+        _: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.DataFrame,
+        arrays: Optional[Kernel.PatternArrays] = None) -> Optional[dict]:
     """Find Volatility Contraction Pattern Bearish.
     Returns None if no patterns found.
     Else returns a Tuple of dicts containing local arguments and patterns data.
@@ -333,6 +367,8 @@ def find_bearish_vcp(_: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.
 
     e_idx = df.index[-1]
     e = df.at[e_idx, "Close"]
+    # Close extrema from each bar to the end, for breach checks
+    close_ext = _close_extrema(_, df, arrays)
 
     while True:
         pos_after_a = _.get_next_index(pivots.index, a_idx)
@@ -364,10 +400,8 @@ def find_bearish_vcp(_: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.
                 d = pivots.at[d_idx, "P"].iloc[0]
 
         if _.is_bearish_vcp(a, b, c, d, e, avgBarLength):
-            if (
-                    d_idx != df.loc[d_idx:, "Close"].idxmax()
-                    or c_idx != df.loc[c_idx:, "Close"].idxmin()
-            ):
+            c_pos, d_pos = df.index.get_loc(c_idx), df.index.get_loc(d_idx)
+            if close_ext.max_pos[d_pos] != d_pos or close_ext.min_pos[c_pos] != c_pos:
                 # check that the patterns is well formed
                 if pivots.index[-1] == d_idx or pivots.index[-1] == c_idx:
                     break
@@ -397,7 +431,9 @@ def find_bearish_vcp(_: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.
         a_idx, a = c_idx, c
 
 
-def find_double_top(_: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.DataFrame) -> Optional[dict]:
+def find_double_top(
+        _: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.DataFrame,
+        arrays: Optional[Kernel.PatternArrays] = None) -> Optional[dict]:
     """Find Double Top.
     Returns None if no patterns found.
     Else returns a Tuple of dicts containing local arguments and patterns data.
@@ -412,7 +448,8 @@ def find_double_top(_: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.D
     d_idx = df.index[-1]
     d = df.at[d_idx, "Close"]
 
-    atr_ser = _.get_atr(df.High, df.Low, df.Close)
+    atr_arr = _atr(_, df, arrays)
+    close_ext = _close_extrema(_, df, arrays)
     assert isinstance(a_idx, pd.Timestamp)
 
     while True:
@@ -426,7 +463,7 @@ def find_double_top(_: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.D
         b_idx = pivots.loc[a_idx:c_idx, "P"].idxmin()
         b = pivots.at[b_idx, "P"]
 
-        atr = atr_ser.at[c_idx]
+        atr = atr_arr[df.index.get_loc(c_idx)]
 
         if pivots.index.has_duplicates:
             if isinstance(a, (pd.Series, str)):
@@ -452,10 +489,8 @@ def find_double_top(_: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.D
                 continue
 
             # check if Level C has been breached after it was formed
-            if (
-                    c_idx != df.loc[c_idx:, "Close"].idxmax()
-                    or b_idx != df.loc[b_idx:, "Close"].idxmin()
-            ):
+            b_pos, c_pos = df.index.get_loc(b_idx), df.index.get_loc(c_idx)
+            if close_ext.max_pos[c_pos] != c_pos or close_ext.min_pos[b_pos] != b_pos:
                 # Level C is breached, current patterns is not valid
                 a_idx, a, a_vol = c_idx, c, c_vol
                 continue
@@ -478,7 +513,9 @@ def find_double_top(_: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.D
         a_idx, a, a_vol = c_idx, c, c_vol
 
 
-def find_hns(_: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.DataFrame) -> Optional[dict]:
+def find_hns(
+        _: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.DataFrame,
+        arrays: Optional[Kernel.PatternArrays] = None) -> Optional[dict]:
     """Find Head and Shoulders - Bearish
     Returns None if no patterns found.
     Else returns a Tuple of dicts containing local arguments and patterns data.
@@ -492,6 +529,8 @@ def find_hns(_: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.DataFram
     c_idx = pivots["P"].idxmax()
     c = pivots.at[c_idx, "P"]
     assert isinstance(c_idx, pd.Timestamp)
+    # Low extrema from each bar to the end, for neckline breach check
+    low_min = _.get_suffix_extrema(df["Low"].to_numpy()).min if arrays is None else arrays.low_min
 
     while True:
         pos = _.get_prev_index(pivots.index, c_idx)
@@ -545,7 +584,7 @@ def find_hns(_: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.DataFram
                 continue
 
             neckline_price = min(b, d)
-            lowest_after_e = df.loc[e_idx:, "Low"].min()
+            lowest_after_e = low_min[df.index.get_loc(e_idx)]
 
             if (
                     lowest_after_e < neckline_price
@@ -601,7 +640,9 @@ def find_hns(_: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.DataFram
         c_idx, c = e_idx, e
 
 
-def find_triangles(_: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.DataFrame) -> Optional[dict]:
+def find_triangles(
+        _: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.DataFrame,
+        arrays: Optional[Kernel.PatternArrays] = None) -> Optional[dict]:
     """Find Triangles - Symmetric, Ascending, Descending.
     Returns None if no patterns found.
     Else returns a Tuple of dicts containing local arguments and patterns data.
@@ -614,6 +655,8 @@ def find_triangles(_: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.Da
 
     f_idx = df.index[-1]
     f = df.at[f_idx, "Close"]
+    # Close extrema from each bar to the end, for breach checks
+    close_ext = _close_extrema(_, df, arrays)
 
     while True:
         b_idx = pivots.loc[a_idx:, "P"].idxmin()
@@ -663,10 +706,11 @@ def find_triangles(_: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.Da
         if triangle is not None:
             # check if high of C or low of D has been breached
             # Check if A is indeed the pivot high
+            c_pos, d_pos = df.index.get_loc(c_idx), df.index.get_loc(d_idx)
             if (
                     a == df.at[a_idx, "Low"]
-                    or c_idx != df.loc[c_idx:, "Close"].idxmax()
-                    or d_idx != df.loc[d_idx:, "Close"].idxmin()
+                    or close_ext.max_pos[c_pos] != c_pos
+                    or close_ext.min_pos[d_pos] != d_pos
             ):
                 a_idx, a = c_idx, c
                 continue
@@ -0,0 +1,192 @@
+"""
+Forward-return backtest of detected patterns.
+
+A detection is measured from the close of its as-of bar, the last bar the scan
+saw (df_end of a pattern dict, as_of of a walk-forward row). Returns and
+excursions are signed in the direction of the pattern: positive is a win for a
+bullish pattern going up as well as for a bearish pattern going down.
+
+All detections of a symbol are evaluated together on a (detections x bars)
+window gathered once, so the cost per detection is a few array operations.
+"""
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+# +1 bullish, -1 bearish. Symmetric triangles are traded on the upper line
+DIRECTIONS = dict(
+    VCPU=1, DBOT=1, HNSU=1, Ascending=1, Symmetric=1,
+    VCPD=-1, DTOP=-1, HNSD=-1, Descending=-1,
+)
+
+
+class Detections(NamedTuple):
+    """Columns of detections, dates are int64 epoch nanoseconds"""
+    sym: np.ndarray
+    pattern: np.ndarray
+    as_of: np.ndarray
+    direction: np.ndarray
+    # Entry line end points
+    entry_x0: np.ndarray
+    entry_y0: np.ndarray
+    entry_x1: np.ndarray
+    entry_y1: np.ndarray
+
+
+def get_entry_line(dct: dict) -> tuple:
+    """Line whose breakout confirms the pattern: the horizontal entry line or
+    neckline, the upper trend line of a triangle or the lower one if Descending"""
+    lines = dct["lines"]
+    return lines[1] if dct["pattern"] == "Descending" else lines[0]
+
+
+def _to_ns(values: Iterable) -> np.ndarray:
+    return pd.to_datetime(pd.Index(list(values)), utc=True).asi8
+
+
+def get_detections(patterns: List[dict]) -> Detections:
+    """Detections from the pattern dicts returned by the scan.
+    The trailing meta dict (timeframe, end_date) is skipped."""
+    patterns = [p for p in patterns if "sym" in p]
+    lines = [get_entry_line(p) for p in patterns]
+    return Detections(
+        sym=np.array([p["sym"] for p in patterns], dtype=str),
+        pattern=np.array([p["pattern"] for p in patterns], dtype=str),
+        as_of=_to_ns(p.get("df_end", p["end"]) for p in patterns),
+        direction=np.array([DIRECTIONS.get(p["pattern"], 1) for p in patterns], dtype=np.int8),
+        entry_x0=_to_ns(line[0][0] for line in lines),
+        entry_y0=np.array([line[0][1] for line in lines], dtype=np.float64),
+        entry_x1=_to_ns(line[1][0] for line in lines),
+        entry_y1=np.array([line[1][1] for line in lines], dtype=np.float64),
+    )
+
+
+def get_frame_detections(df: pd.DataFrame) -> Detections:
+    """Detections from the columns of a walk-forward result"""
+    return Detections(
+        sym=df["sym"].to_numpy(dtype=str),
+        pattern=df["pattern"].to_numpy(dtype=str),
+        as_of=_to_ns(df["as_of"]),
+        direction=np.array([DIRECTIONS.get(p, 1) for p in df["pattern"]], dtype=np.int8),
+        entry_x0=_to_ns(df["entry_x0"]),
+        entry_y0=df["entry_y0"].to_numpy(dtype=np.float64),
+        entry_x1=_to_ns(df["entry_x1"]),
+        entry_y1=df["entry_y1"].to_numpy(dtype=np.float64),
+    )
+
+
+def _positions(index: np.ndarray, dates: np.ndarray) -> np.ndarray:
+    """Bar position of each date in a sorted int64 index, -1 if missing"""
+    pos = np.searchsorted(index, dates)
+    found = pos < len(index)
+    found[found] = index[pos[found]] == dates[found]
+    return np.where(found, pos, -1)
+
+
+def backtest_symbol(
+        df: pd.DataFrame,
+        det: Detections,
+        horizons: Sequence[int] = (5, 10, 20)
+) -> Dict[str, np.ndarray]:
+    """
+    Forward statistics of all detections of one symbol.
+
+    For each horizon h, in the direction of the pattern:
+        ret_h   close to close return after h bars
+        mfe_h   max favorable excursion (High for bullish, Low for bearish)
+        mae_h   max adverse excursion, zero or negative
+    breakout    bars until the first close beyond the extended entry line
+
+    Values are NaN where the bars are not available yet.
+    """
+    index = df.index.asi8
+    close = df["Close"].to_numpy(dtype=np.float64)
+    high = df["High"].to_numpy(dtype=np.float64)
+    low = df["Low"].to_numpy(dtype=np.float64)
+    n = len(index)
+
+    as_of = _positions(index, det.as_of)
+    known = as_of >= 0
+    steps = np.arange(1, max(horizons) + 1)
+
+    # (detections x bars) window of the bars after each as-of bar
+    fwd = as_of[:, None] + steps
+    valid = known[:, None] & (fwd < n)
+    fwd_pos = np.where(valid, fwd, 0)
+    fwd_close = np.where(valid, close[fwd_pos], np.nan)
+    fwd_high = np.where(valid, high[fwd_pos], np.nan)
+    fwd_low = np.where(valid, low[fwd_pos], np.nan)
+
+    base = np.where(known, close[as_of], np.nan)[:, None]
+    bull = det.direction[:, None] > 0
+    sign = np.where(bull, 1.0, -1.0)
+
+    ret = sign * (fwd_close / base - 1)
+    favorable = np.fmax.accumulate(sign * (np.where(bull, fwd_high, fwd_low) / base - 1), axis=1)
+    adverse = np.fmin.accumulate(sign * (np.where(bull, fwd_low, fwd_high) / base - 1), axis=1)
+    adverse = np.fmin(adverse, 0)
+
+    # entry line extended in bar positions, like PatternDetector.generate_trend_line
+    x0 = _positions(index, det.entry_x0)
+    x1 = _positions(index, det.entry_x1)
+    line_known = known & (x0 >= 0) & (x1 >= 0)
+    run = np.where(x1 != x0, x1 - x0, 1)
+    slope = np.where(x1 != x0, (det.entry_y1 - det.entry_y0) / run, 0.0)
+    line = det.entry_y0[:, None] + slope[:, None] * (fwd - x0[:, None])
+    crossed = valid & (sign * (fwd_close - line) > 0)
+    has_breakout = line_known & crossed.any(axis=1)
+
+    out = dict(
+        base=base[:, 0],
+        entry=np.where(line_known, det.entry_y0 + slope * (as_of - x0), np.nan),
+        breakout=np.where(has_breakout, crossed.argmax(axis=1) + 1, np.nan),
+    )
+    for h in horizons:
+        col = h - 1
+        out[f"ret_{h}"] = np.where(valid[:, col], ret[:, col], np.nan)
+        out[f"mfe_{h}"] = np.where(valid[:, col], favorable[:, col], np.nan)
+        out[f"mae_{h}"] = np.where(valid[:, col], adverse[:, col], np.nan)
+    return out
+
+
+def backtest(
+        det: Detections,
+        load: Callable[[str], Optional[pd.DataFrame]],
+        horizons: Sequence[int] = (5, 10, 20)
+) -> pd.DataFrame:
+    """Backtest detections of any number of symbols.
+    load(symbol) returns the symbol's bars covering the entry lines and horizons."""
+    horizons = tuple(sorted(set(horizons)))
+    if not horizons or horizons[0] < 1:
+        raise ValueError("Horizons must be positive numbers of bars")
+
+    symbols, inverse = np.unique(det.sym, return_inverse=True)
+    order = np.argsort(inverse, kind="stable")
+    bounds = np.searchsorted(inverse[order], np.arange(len(symbols) + 1))
+
+    parts: List[Dict[str, np.ndarray]] = []
+    for i, sym in enumerate(symbols):
+        rows = order[bounds[i]:bounds[i + 1]]
+        sub = Detections(*(col[rows] for col in det))
+        df = load(str(sym))
+        if df is None or df.empty:
+            continue
+        if df.index.has_duplicates:
+            df = df[~df.index.duplicated()]
+        stats = backtest_symbol(df, sub, horizons)
+        stats.update(row=rows)
+        parts.append(stats)
+
+    if not parts:
+        return pd.DataFrame(columns=["sym", "pattern", "as_of", "direction"])
+
+    columns = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+    rows = columns.pop("row")
+    result = pd.DataFrame(dict(
+        sym=det.sym[rows],
+        pattern=det.pattern[rows],
+        as_of=pd.to_datetime(det.as_of[rows], utc=True),
+        direction=det.direction[rows],
+        **columns,
+    ))
+    return result.sort_values(["as_of", "sym"], kind="stable").reset_index(drop=True)
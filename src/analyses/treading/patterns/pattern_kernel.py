@@ -0,0 +1,684 @@
+"""
+Array-native pattern finders.
+
+Same detection rules and results as the finders in pattern.py, but the search
+loops work on integer positions over plain NumPy arrays instead of label
+lookups on a DatetimeIndex. Timestamps are only looked up to build the result.
+
+Pivot rows are addressed by their row position in the pivots frame. A pivot
+"label" is the first row sharing its timestamp: a bar that is both pivot high
+and pivot low has two rows (high first), exactly like the label based finders.
+"""
+import numpy as np
+import pandas as pd
+from typing import NamedTuple, Optional
+from src.analyses.treading.patterns.method.pattern_detector import PatternDetector, Point, Coordinate, Line
+
+
+class PatternArrays(NamedTuple):
+    """Plain NumPy arrays of a symbol's bars and pivots, addressed by integer position"""
+    # Bar timestamps, only used to build the result dict
+    index: pd.DatetimeIndex
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    # High - Low of every bar
+    bar_range: np.ndarray
+    # Average true range of every bar, see PatternDetector.get_atr
+    atr: np.ndarray
+    # Suffix extrema from each bar to the last bar, see PatternDetector.get_suffix_extrema
+    close_max: np.ndarray
+    close_max_pos: np.ndarray
+    close_min: np.ndarray
+    close_min_pos: np.ndarray
+    high_max: np.ndarray
+    low_min: np.ndarray
+    # Pivot price (P), volume (V) and bar position of each pivot row
+    price: np.ndarray
+    volume: np.ndarray
+    pos: np.ndarray
+    # First and last pivot row sharing the timestamp of each pivot row
+    first: np.ndarray
+    last: np.ndarray
+    has_duplicates: bool
+
+
+def get_pattern_arrays(_: PatternDetector, df: pd.DataFrame, pivots: pd.DataFrame) -> PatternArrays:
+    """Features shared by all finders, computed once per symbol.
+    The pandas finders of pattern.py take them too, instead of computing their own."""
+    high = df["High"].to_numpy(dtype=np.float64)
+    low = df["Low"].to_numpy(dtype=np.float64)
+    close = df["Close"].to_numpy(dtype=np.float64)
+    pos = df.index.get_indexer(pivots.index)
+
+    close_ext = _.get_suffix_extrema(close)
+
+    return PatternArrays(
+        index=df.index,
+        high=high,
+        low=low,
+        close=close,
+        bar_range=high - low,
+        atr=_.get_atr(df.High, df.Low, df.Close).to_numpy(),
+        close_max=close_ext.max,
+        close_max_pos=close_ext.max_pos,
+        close_min=close_ext.min,
+        close_min_pos=close_ext.min_pos,
+        high_max=_.get_suffix_extrema(high).max,
+        low_min=_.get_suffix_extrema(low).min,
+        price=pivots["P"].to_numpy(),
+        volume=pivots["V"].to_numpy(),
+        pos=pos,
+        first=np.searchsorted(pos, pos, side="left"),
+        last=np.searchsorted(pos, pos, side="right") - 1,
+        has_duplicates=bool(pivots.index.has_duplicates),
+    )
+
+
+def _argmax(values: np.ndarray, start: int, stop: int) -> int:
+    """Position of the first max in values[start:stop + 1]"""
+    if stop < start:
+        raise ValueError("attempt to get argmax of an empty sequence")
+    return start + int(values[start:stop + 1].argmax())
+
+
+def _argmin(values: np.ndarray, start: int, stop: int) -> int:
+    """Position of the first min in values[start:stop + 1]"""
+    if stop < start:
+        raise ValueError("attempt to get argmin of an empty sequence")
+    return start + int(values[start:stop + 1].argmin())
+
+
+def _value(arr: PatternArrays, values: np.ndarray, row: int, nth: int) -> float:
+    """Value of the pivot label at row. When the bar is both pivot high and low,
+    nth selects the high (0) or the low (1) row"""
+    if arr.has_duplicates and arr.last[row] > row:
+        return values[row + nth]
+    return values[row]
+
+
+def _avg_bar_length(arr: PatternArrays, start: int, stop: int) -> float:
+    """Mean High - Low of bars start to stop, both included.
+    Prefix sums would be O(1) but differ from the pandas mean in the last bits,
+    which flips the threshold comparisons on tick rounded prices."""
+    if stop < start:
+        return np.nan
+    return arr.bar_range[start:stop + 1].mean()
+
+
+def _trend_line(arr: PatternArrays, values: np.ndarray, x1: int, x2: int) -> Line:
+    """Position based PatternDetector.generate_trend_line"""
+    index = arr.index
+    p1 = float(values[x1])
+    p2 = float(values[x2])
+    last_pos = index.shape[0] - 1
+
+    m = (p2 - p1) / (x2 - x1)
+    y_intercept = p1 - m * x1
+
+    return Line(
+        line=Coordinate(
+            start=Point(x=index[x1], y=m * x1 + y_intercept),
+            end=Point(x=index[last_pos], y=m * last_pos + y_intercept),
+        ),
+        slope=m,
+        y_int=y_intercept,
+    )
+
+
+def _is_close_max_from(arr: PatternArrays, pos: int) -> bool:
+    """True if the Close at pos is the first highest Close from pos onwards"""
+    return arr.close_max_pos[pos] == pos
+
+
+def _is_close_min_from(arr: PatternArrays, pos: int) -> bool:
+    """True if the Close at pos is the first lowest Close from pos onwards"""
+    return arr.close_min_pos[pos] == pos
+
+
+def find_bullish_vcp(
+        _: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.DataFrame,
+        arrays: Optional[PatternArrays] = None) -> Optional[dict]:
+    """Find Volatility Contraction Pattern Bullish.
+    Returns None if no patterns found.
+    Else returns a Tuple of dicts containing local arguments and patterns data.
+    """
+    arr = arrays if arrays is not None else get_pattern_arrays(_, df, pivots)
+    price, pos, first, last = arr.price, arr.pos, arr.first, arr.last
+    pivot_len = price.shape[0]
+
+    a_row = first[_argmax(price, 0, pivot_len - 1)]
+    a = _value(arr, price, a_row, 0)
+    e_pos = arr.index.shape[0] - 1
+    e = arr.close[e_pos]
+
+    while True:
+        pos_after_a = last[a_row] + 1
+        if pos_after_a >= pivot_len:
+            break
+        b_row = first[_argmin(price, pos_after_a, pivot_len - 1)]
+        pos_after_b = last[b_row] + 1
+        if pos_after_b >= pivot_len:
+            break
+        d_row = first[_argmin(price, pos_after_b, pivot_len - 1)]
+        c_row = first[_argmax(price, b_row, last[d_row])]
+
+        b = _value(arr, price, b_row, 1)
+        c = _value(arr, price, c_row, 0)
+        d = _value(arr, price, d_row, 1)
+        avg_bar_length = _avg_bar_length(arr, pos[a_row], pos[c_row])
+
+        if _.is_bullish_vcp(a, b, c, d, e, avg_bar_length):
+            # check if Level C has been breached after it was formed
+            if not _is_close_max_from(arr, pos[c_row]) or not _is_close_min_from(arr, pos[d_row]):
+                # check if C is the last pivot formed
+                if first[pivot_len - 1] in (c_row, d_row):
+                    break
+                a_row, a = c_row, c
+                continue
+
+            index = arr.index
+            a_idx, b_idx, c_idx, d_idx, e_idx = (index[pos[a_row]], index[pos[b_row]], index[pos[c_row]],
+                                                 index[pos[d_row]], index[e_pos])
+            entry_line = ((c_idx, c), (e_idx, c))
+            ab = ((a_idx, a), (b_idx, b))
+            bc = ((b_idx, b), (c_idx, c))
+            cd = ((c_idx, c), (d_idx, d))
+            de = ((d_idx, d), (e_idx, e))
+
+            _.logger.debug(f"{sym} - VCPU")
+            return dict(
+                sym=sym,
+                pattern="VCPU",
+                start=a_idx,
+                end=e_idx,
+                df_start=index[0],
+                df_end=index[-1],
+                lines=(entry_line, ab, bc, cd, de),
+            )
+
+        a_row, a = c_row, c
+
+
+def find_double_bottom(
+        _: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.DataFrame,
+        arrays: Optional[PatternArrays] = None) -> Optional[dict]:
+    """Find Double bottom.
+    Returns None if no patterns found.
+    Else returns a Tuple of dicts containing local arguments and patterns data.
+    """
+    arr = arrays if arrays is not None else get_pattern_arrays(_, df, pivots)
+    price, volume, pos, first, last = arr.price, arr.volume, arr.pos, arr.first, arr.last
+    pivot_len = price.shape[0]
+
+    a_row = first[_argmin(price, 0, pivot_len - 1)]
+    a = _value(arr, price, a_row, 1)
+    a_vol = _value(arr, volume, a_row, 1)
+    d_pos = arr.index.shape[0] - 1
+    d = arr.close[d_pos]
+
+    while True:
+        pos_after_a = last[a_row] + 1
+        if pos_after_a >= pivot_len:
+            break
+        c_row = first[_argmin(price, pos_after_a, pivot_len - 1)]
+        b_row = first[_argmax(price, a_row, last[c_row])]
+
+        atr = arr.atr[pos[c_row]]
+        b = _value(arr, price, b_row, 0)
+        c = _value(arr, price, c_row, 1)
+        c_vol = _value(arr, volume, c_row, 1)
+        a_pos, b_pos, c_pos = pos[a_row], pos[b_row], pos[c_row]
+        avg_bar_length = _avg_bar_length(arr, a_pos, c_pos)
+
+        if _.is_double_bottom(a, b, c, d, a_vol, c_vol, avg_bar_length, atr):
+            if a == arr.high[a_pos] or b == arr.low[b_pos] or c == arr.high[c_pos]:
+                # check that the patterns is well-formed
+                a_row, a, a_vol = c_row, c, c_vol
+                continue
+
+            # check if Level C has been breached after it was formed
+            if not _is_close_min_from(arr, c_pos) or not _is_close_max_from(arr, b_pos):
+                a_row, a, a_vol = c_row, c, c_vol
+                continue
+
+            if arr.close_max[c_pos] > b:
+                a_row, a, a_vol = c_row, c, c_vol
+                continue
+
+            index = arr.index
+            a_idx, b_idx, c_idx, d_idx = index[a_pos], index[b_pos], index[c_pos], index[d_pos]
+            entry_line = ((b_idx, b), (d_idx, b))
+            ab = ((a_idx, a), (b_idx, b))
+            bc = ((b_idx, b), (c_idx, c))
+            cd = ((c_idx, c), (d_idx, d))
+
+            _.logger.debug(f"{sym} - DBOT")
+            return dict(
+                sym=sym,
+                pattern="DBOT",
+                start=a_idx,
+                end=d_idx,
+                df_start=index[0],
+                df_end=index[-1],
+                lines=(entry_line, ab, bc, cd),
+            )
+
+        a_row, a, a_vol = c_row, c, c_vol
+
+
+def find_reverse_hns(
+        _: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.DataFrame,
+        arrays: Optional[PatternArrays] = None) -> Optional[dict]:
+    """Find Head and Shoulders - Bullish
+    Returns None if no patterns found.
+    Else returns an Tuple of dicts containing local arguments and patterns data.
+    """
+    arr = arrays if arrays is not None else get_pattern_arrays(_, df, pivots)
+    price, pos, first, last = arr.price, arr.pos, arr.first, arr.last
+    pivot_len = price.shape[0]
+    f_pos = arr.index.shape[0] - 1
+    f = arr.close[f_pos]
+
+    c_row = first[_argmin(price, 0, pivot_len - 1)]
+    c = _value(arr, price, c_row, 1)
+
+    while True:
+        # get_prev_index returns the position after a duplicated label
+        prev = last[c_row] + 1 if last[c_row] > c_row else c_row - 1
+        if prev >= pivot_len:
+            break
+        # a position of -1 wraps to the last pivot, like pivots.index[-1]
+        a_row = first[_argmin(price, 0, last[prev])]
+        b_row = first[_argmax(price, a_row, last[c_row])]
+
+        pos_after_c = last[c_row] + 1
+        if pos_after_c >= pivot_len:
+            break
+        e_row = first[_argmin(price, pos_after_c, pivot_len - 1)]
+        d_row = first[_argmax(price, c_row, last[e_row])]
+
+        a = _value(arr, price, a_row, 1)
+        b = _value(arr, price, b_row, 0)
+        d = _value(arr, price, d_row, 0)
+        e = _value(arr, price, e_row, 1)
+        a_pos, b_pos, c_pos, d_pos, e_pos = pos[a_row], pos[b_row], pos[c_row], pos[d_row], pos[e_row]
+        avg_bar_length = _avg_bar_length(arr, b_pos, d_pos)
+
+        if _.is_reverse_hns(a, b, c, d, e, f, avg_bar_length):
+            if (
+                    a == arr.high[a_pos]
+                    or b == arr.low[b_pos]
+                    or c == arr.high[c_pos]
+                    or d == arr.low[d_pos]
+                    or e == arr.high[e_pos]
+            ):
+                # Make sure patterns is well formed
+                c_row, c = e_row, e
+                continue
+
+            neckline_price = min(b, d)
+            highest_after_e = arr.high_max[e_pos]
+            if (
+                    highest_after_e > neckline_price
+                    and abs(highest_after_e - neckline_price) > avg_bar_length
+            ):
+                # check if neckline was breached after patterns formation
+                c_row, c = e_row, e
+                continue
+
+            # bd is the trendline coordinates from B to D (neckline)
+            tline = _trend_line(arr, arr.high, int(b_pos), int(d_pos))
+            y = tline.slope * f_pos + tline.y_int
+            # if close price is greater than neckline (trendline), skip
+            if f > y:
+                c_row, c = e_row, e
+                continue
+
+            index = arr.index
+            a_idx, b_idx, c_idx, d_idx, e_idx, f_idx = (index[a_pos], index[b_pos], index[c_pos],
+                                                        index[d_pos], index[e_pos], index[f_pos])
+            ab = ((a_idx, a), (b_idx, b))
+            bc = ((b_idx, b), (c_idx, c))
+            cd = ((c_idx, c), (d_idx, d))
+            de = ((d_idx, d), (e_idx, e))
+            ef = ((e_idx, e), (f_idx, f))
+
+            if tline.slope > 0:
+                entry_line = ((b_idx, b), (f_idx, b))
+                lines = (entry_line, tline.line, ab, bc, cd, de, ef)
+            else:
+                lines = (tline.line, ab, bc, cd, de, ef)
+
+            _.logger.debug(f"{sym} - HNSU")
+            return dict(
+                sym=sym,
+                pattern="HNSU",
+                start=a_idx,
+                end=f_idx,
+                df_start=index[0],
+                df_end=index[-1],
+                slope=tline.line,
+                y_intercept=tline.y_int,
+                lines=lines,
+            )
+        c_row, c = e_row, e
+
+
+def find_bearish_vcp(
+        _: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.DataFrame,
+        arrays: Optional[PatternArrays] = None) -> Optional[dict]:
+    """Find Volatility Contraction Pattern Bearish.
+    Returns None if no patterns found.
+    Else returns a Tuple of dicts containing local arguments and patterns data.
+    """
+    arr = arrays if arrays is not None else get_pattern_arrays(_, df, pivots)
+    price, pos, first, last = arr.price, arr.pos, arr.first, arr.last
+    pivot_len = price.shape[0]
+
+    a_row = first[_argmin(price, 0, pivot_len - 1)]
+    a = _value(arr, price, a_row, 1)
+    e_pos = arr.index.shape[0] - 1
+    e = arr.close[e_pos]
+
+    while True:
+        pos_after_a = last[a_row] + 1
+        if pos_after_a >= pivot_len:
+            break
+        b_row = first[_argmax(price, pos_after_a, pivot_len - 1)]
+        pos_after_b = last[b_row] + 1
+        if pos_after_b >= pivot_len:
+            break
+        d_row = first[_argmax(price, pos_after_b, pivot_len - 1)]
+        c_row = first[_argmin(price, b_row, last[d_row])]
+
+        b = _value(arr, price, b_row, 0)
+        c = _value(arr, price, c_row, 1)
+        d = _value(arr, price, d_row, 0)
+        avg_bar_length = _avg_bar_length(arr, pos[a_row], pos[c_row])
+
+        if _.is_bearish_vcp(a, b, c, d, e, avg_bar_length):
+            if not _is_close_max_from(arr, pos[d_row]) or not _is_close_min_from(arr, pos[c_row]):
+                # check that the patterns is well formed
+                if first[pivot_len - 1] in (d_row, c_row):
+                    break
+                a_row, a = c_row, c
+                continue
+
+            index = arr.index
+            a_idx, b_idx, c_idx, d_idx, e_idx = (index[pos[a_row]], index[pos[b_row]], index[pos[c_row]],
+                                                 index[pos[d_row]], index[e_pos])
+            entry_line = ((c_idx, c), (e_idx, c))
+            ab = ((a_idx, a), (b_idx, b))
+            bc = ((b_idx, b), (c_idx, c))
+            cd = ((c_idx, c), (d_idx, d))
+            de = ((d_idx, d), (e_idx, e))
+
+            _.logger.debug(f"{sym} - VCPD")
+            return dict(
+                sym=sym,
+                pattern="VCPD",
+                start=a_idx,
+                end=e_idx,
+                df_start=index[0],
+                df_end=index[-1],
+                lines=(entry_line, ab, bc, cd, de),
+            )
+
+        a_row, a = c_row, c
+
+
+def find_double_top(
+        _: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.DataFrame,
+        arrays: Optional[PatternArrays] = None) -> Optional[dict]:
+    """Find Double Top.
+    Returns None if no patterns found.
+    Else returns a Tuple of dicts containing local arguments and patterns data.
+    """
+    arr = arrays if arrays is not None else get_pattern_arrays(_, df, pivots)
+    price, volume, pos, first, last = arr.price, arr.volume, arr.pos, arr.first, arr.last
+    pivot_len = price.shape[0]
+
+    a_row = first[_argmax(price, 0, pivot_len - 1)]
+    a = _value(arr, price, a_row, 0)
+    a_vol = _value(arr, volume, a_row, 0)
+    d_pos = arr.index.shape[0] - 1
+    d = arr.close[d_pos]
+
+    while True:
+        pos_after_a = last[a_row] + 1
+        if pos_after_a >= pivot_len:
+            break
+        c_row = first[_argmax(price, pos_after_a, pivot_len - 1)]
+        b_row = first[_argmin(price, a_row, last[c_row])]
+
+        atr = arr.atr[pos[c_row]]
+        b = _value(arr, price, b_row, 1)
+        c = _value(arr, price, c_row, 0)
+        c_vol = _value(arr, volume, c_row, 0)
+        a_pos, b_pos, c_pos = pos[a_row], pos[b_row], pos[c_row]
+        avg_bar_length = _avg_bar_length(arr, a_pos, c_pos)
+
+        if _.is_double_top(a, b, c, d, a_vol, c_vol, avg_bar_length, atr):
+            if a == arr.low[a_pos] or b == arr.high[b_pos] or c == arr.low[c_pos]:
+                a_row, a, a_vol = c_row, c, c_vol
+                continue
+
+            # check if Level C has been breached after it was formed
+            if not _is_close_max_from(arr, c_pos) or not _is_close_min_from(arr, b_pos):
+                a_row, a, a_vol = c_row, c, c_vol
+                continue
+
+            index = arr.index
+            a_idx, b_idx, c_idx, d_idx = index[a_pos], index[b_pos], index[c_pos], index[d_pos]
+            entry_line = ((b_idx, b), (d_idx, b))
+            ab = ((a_idx, a), (b_idx, b))
+            bc = ((b_idx, b), (c_idx, c))
+            cd = ((c_idx, c), (d_idx, d))
+
+            _.logger.debug(f"{sym} - DTOP")
+            return dict(
+                sym=sym,
+                pattern="DTOP",
+                start=a_idx,
+                end=d_idx,
+                df_start=index[0],
+                df_end=index[-1],
+                lines=(entry_line, ab, bc, cd),
+            )
+        a_row, a, a_vol = c_row, c, c_vol
+
+
+def find_hns(
+        _: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.DataFrame,
+        arrays: Optional[PatternArrays] = None) -> Optional[dict]:
+    """Find Head and Shoulders - Bearish
+    Returns None if no patterns found.
+    Else returns a Tuple of dicts containing local arguments and patterns data.
+    """
+    arr = arrays if arrays is not None else get_pattern_arrays(_, df, pivots)
+    price, pos, first, last = arr.price, arr.pos, arr.first, arr.last
+    pivot_len = price.shape[0]
+    f_pos = arr.index.shape[0] - 1
+    f = arr.close[f_pos]
+
+    c_row = first[_argmax(price, 0, pivot_len - 1)]
+    c = _value(arr, price, c_row, 0)
+
+    while True:
+        # get_prev_index returns the position after a duplicated label
+        prev = last[c_row] + 1 if last[c_row] > c_row else c_row - 1
+        if prev >= pivot_len:
+            break
+        # a position of -1 wraps to the last pivot, like pivots.index[-1]
+        a_row = first[_argmax(price, 0, last[prev])]
+        b_row = first[_argmin(price, a_row, last[c_row])]
+
+        pos_after_c = last[c_row] + 1
+        if pos_after_c >= pivot_len:
+            break
+        e_row = first[_argmax(price, pos_after_c, pivot_len - 1)]
+        d_row = first[_argmin(price, c_row, last[e_row])]
+
+        a = _value(arr, price, a_row, 0)
+        b = _value(arr, price, b_row, 1)
+        d = _value(arr, price, d_row, 1)
+        e = _value(arr, price, e_row, 0)
+        a_pos, b_pos, c_pos, d_pos, e_pos = pos[a_row], pos[b_row], pos[c_row], pos[d_row], pos[e_row]
+        avg_bar_length = _avg_bar_length(arr, b_pos, d_pos)
+
+        if _.is_hns(a, b, c, d, e, f, avg_bar_length):
+            if (
+                    a == arr.low[a_pos]
+                    or b == arr.high[b_pos]
+                    or c == arr.low[c_pos]
+                    or d == arr.high[d_pos]
+                    or e == arr.low[e_pos]
+            ):
+                # Make sure the patterns is well-formed and
+                # pivots are correctly anchored to highs and lows
+                c_row, c = e_row, e
+                continue
+
+            neckline_price = min(b, d)
+            lowest_after_e = arr.low_min[e_pos]
+            if (
+                    lowest_after_e < neckline_price
+                    and abs(lowest_after_e - neckline_price) > avg_bar_length
+            ):
+                # check if the neckline was breached after patterns formation
+                c_row, c = e_row, e
+                continue
+
+            # bd is the line coordinate for points B and D
+            tline = _trend_line(arr, arr.low, int(b_pos), int(d_pos))
+            y = tline.slope * f_pos + tline.y_int
+            # if the close price is below the neckline (trend-line), skip
+            if f < y:
+                c_row, c = e_row, e
+                continue
+
+            index = arr.index
+            a_idx, b_idx, c_idx, d_idx, e_idx, f_idx = (index[a_pos], index[b_pos], index[c_pos],
+                                                        index[d_pos], index[e_pos], index[f_pos])
+            ab = ((a_idx, a), (b_idx, b))
+            bc = ((b_idx, b), (c_idx, c))
+            cd = ((c_idx, c), (d_idx, d))
+            de = ((d_idx, d), (e_idx, e))
+            ef = ((e_idx, e), (f_idx, f))
+
+            if tline.slope < 0:
+                entry_line = ((b_idx, b), (f_idx, b))
+                lines = (entry_line, tline.line, ab, bc, cd, de, ef)
+            else:
+                lines = (tline.line, ab, bc, cd, de, ef)
+
+            _.logger.debug(f"{sym} - HNSD")
+            return dict(
+                sym=sym,
+                pattern="HNSD",
+                start=a_idx,
+                end=f_idx,
+                df_start=index[0],
+                df_end=index[-1],
+                slope=tline.slope,
+                y_intercept=tline.y_int,
+                lines=lines,
+            )
+
+        c_row, c = e_row, e
+
+
+def find_triangles(
+        _: PatternDetector, sym: str, df: pd.DataFrame, pivots: pd.DataFrame,
+        arrays: Optional[PatternArrays] = None) -> Optional[dict]:
+    """Find Triangles - Symmetric, Ascending, Descending.
+    Returns None if no patterns found.
+    Else returns a Tuple of dicts containing local arguments and patterns data.
+    """
+    arr = arrays if arrays is not None else get_pattern_arrays(_, df, pivots)
+    price, pos, first, last = arr.price, arr.pos, arr.first, arr.last
+    pivot_len = price.shape[0]
+
+    a_row = first[_argmax(price, 0, pivot_len - 1)]
+    a = _value(arr, price, a_row, 0)
+    f_pos = arr.index.shape[0] - 1
+    f = arr.close[f_pos]
+
+    while True:
+        b_row = first[_argmin(price, a_row, pivot_len - 1)]
+
+        pos_after_a = last[a_row] + 1
+        if pos_after_a >= pivot_len:
+            break
+
+        # A is already the lowest point
+        if a_row == b_row:
+            a_row = pos_after_a
+            a = _value(arr, price, a_row, 0)
+            continue
+
+        pos_after_b = last[b_row] + 1
+        if pos_after_b >= pivot_len:
+            break
+
+        d_row = first[_argmin(price, pos_after_b, pivot_len - 1)]
+        c_row = first[_argmax(price, pos_after_a, pivot_len - 1)]
+        pos_after_c = last[c_row] + 1
+        if pos_after_c >= pivot_len:
+            break
+
+        e_row = first[_argmax(price, pos_after_c, pivot_len - 1)]
+        b = _value(arr, price, b_row, 1)
+        c = _value(arr, price, c_row, 0)
+        d = _value(arr, price, d_row, 1)
+        e = _value(arr, price, e_row, 0)
+        a_pos, b_pos, c_pos, d_pos = pos[a_row], pos[b_row], pos[c_row], pos[d_row]
+        avg_bar_length = _avg_bar_length(arr, a_pos, d_pos)
+
+        triangle = _.is_triangle(a, b, c, d, e, f, avg_bar_length)
+        if triangle is not None:
+            # check if high of C or low of D has been breached
+            # Check if A is indeed the pivot high
+            if (
+                    a == arr.low[a_pos]
+                    or not _is_close_max_from(arr, c_pos)
+                    or not _is_close_min_from(arr, d_pos)
+            ):
+                a_row, a = c_row, c
+                continue
+
+            upper = _trend_line(arr, arr.high, int(a_pos), int(c_pos))
+            lower = _trend_line(arr, arr.low, int(b_pos), int(d_pos))
+            # If trendlines have intersected, patterns has played out
+            if upper.line.end.y < lower.line.end.y:
+                break
+
+            if triangle == "Ascending" and (
+                    upper.slope > 0.1 and lower.slope < 0.2
+            ):
+                break
+            if triangle == "Descending" and (
+                    lower.slope < -0.1 and upper.slope > -0.2
+            ):
+                break
+            if triangle == "Symmetric" and (
+                    upper.slope > -0.2 and lower.slope < 0.2
+            ):
+                break
+
+            index = arr.index
+            _.logger.debug(f"{sym} - {triangle}")
+            return dict(
+                sym=sym,
+                pattern=triangle,
+                start=index[a_pos],
+                end=index[f_pos],
+                df_start=index[0],
+                df_end=index[-1],
+                slope_upper=upper.slope,
+                slope_lower=lower.slope,
+                lines=(upper.line, lower.line),
+            )
+        # Like the label based finder, only A's position moves on here
+        a_row, c = c_row, c
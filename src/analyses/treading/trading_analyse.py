@@ -1,6 +1,11 @@
+import os
 import json
+import time
+import logging
 import importlib
 import concurrent
+import numpy as np
+import pandas as pd
 from tqdm import tqdm
 from pathlib import Path
 from datetime import datetime
@@ -8,25 +13,253 @@ from argparse import ArgumentParser
 from concurrent.futures import Future
 from src.service import Service
 from src.analyses.base_analyse import BaseAnalyse
-from typing import Tuple, Callable, List, Optional
+from src.utilities.timings import TIMINGS
+from typing import Tuple, Callable, List, Optional, Dict, Union
 from src.services.loading.loader.abstract_loader import AbstractLoader
+from src.services.loading.loader.arena_loader import ArenaLoader
 import src.analyses.treading.patterns.pattern as Pattern
+import src.analyses.treading.patterns.pattern_kernel as Kernel
+import src.analyses.treading.patterns.pattern_backtest as Backtest
 from src.analyses.treading.patterns.method.pattern_detector import PatternDetector
 
 
+def _scan_symbol(
+        symbol: str,
+        df: Optional[pd.DataFrame],
+        functions: Tuple[Callable, ...],
+        loader: AbstractLoader,
+        detector: PatternDetector,
+        logger: logging.Logger,
+        kernel: str = "pandas",
+        pivot_state: bool = False,
+        bars_left: int = 6,
+        bars_right: int = 6
+) -> List[dict]:
+    # initialize result: patterns
+    patterns: List[dict] = []
+
+    if df is None or df.empty:
+        return patterns
+
+    if df.index.has_duplicates:
+        df = df[~df.index.duplicated()]
+    # get feature points
+    with TIMINGS.time("get_max_min"):
+        if pivot_state:
+            pivots = detector.get_max_min_incremental(
+                df=df,
+                key=f"{symbol.upper()}_{loader.timeframe}",
+                bars_left=bars_left,
+                bars_right=bars_right)
+        else:
+            pivots = detector.get_max_min(
+                df=df,
+                bars_left=bars_left,
+                bars_right=bars_right)
+
+    if not pivots.shape[0]:
+        return patterns
+
+    # features shared by all finders, computed once per symbol,
+    # a single pandas finder computes only those it needs
+    arrays = None
+    if kernel == "array" or len(functions) > 1:
+        with TIMINGS.time("get_pattern_arrays"):
+            arrays = Kernel.get_pattern_arrays(detector, df, pivots)
+
+    # main loop to scan for patterns
+    for function in functions:
+        if not callable(function):
+            raise TypeError(f"Expected callable. Got {type(function)}")
+        try:
+            with TIMINGS.time(function.__name__):
+                result = function(detector, symbol, df, pivots, arrays)
+        except Exception as e:
+            logger.exception(f"SYMBOL name: {symbol}", exc_info=e)
+            return patterns
+        # add detected patterns into result
+        if result:
+            with TIMINGS.time("make_serializable"):
+                patterns.append(detector.make_serializable(result))
+            TIMINGS.count("patterns")
+
+    return patterns
+
+
+# Scan settings of a worker process, set once per process by _init_scan_worker
+_scan_settings: dict = {}
+
+
+def _init_scan_worker(settings: dict):
+    _scan_settings.clear()
+    _scan_settings.update(settings)
+    TIMINGS.reset(enabled=_scan_settings.pop("timings", False))
+
+
+def _scan_batch(symbols: List[str]) -> Tuple[List[dict], dict]:
+    """Scan a batch of symbols with the settings of this worker process,
+    returns the patterns found and the timing of the batch"""
+    start = time.perf_counter()
+    patterns: List[dict] = []
+    # the next symbols of the batch load while this one is scanned,
+    # loader.get is the time spent waiting for them
+    frames = _scan_settings["loader"].iter_many(symbols)
+    while True:
+        with TIMINGS.time("loader.get"):
+            item = next(frames, None)
+        if item is None:
+            break
+        patterns.extend(_scan_symbol(*item, **_scan_settings))
+    TIMINGS.count("symbols", len(symbols))
+    timing = dict(pid=os.getpid(), symbols=len(symbols), seconds=time.perf_counter() - start)
+    if TIMINGS.enabled:
+        timing["stages"] = TIMINGS.drain()
+    return patterns, timing
+
+
+# columns of the walk-forward output, dates are int64 epoch nanoseconds
+WALK_COLUMNS = ("sym", "pattern", "as_of", "start", "end", "entry_x0", "entry_y0", "entry_x1", "entry_y1")
+
+
+def _walk_symbol(
+        symbol: str,
+        df: Optional[pd.DataFrame],
+        functions: Tuple[Callable, ...],
+        detector: PatternDetector,
+        logger: logging.Logger,
+        start: datetime,
+        kernel: str = "pandas",
+        step: int = 1,
+        bars: int = 160,
+        bars_left: int = 6,
+        bars_right: int = 6
+) -> Dict[str, list]:
+    # initialize result: one list per output column
+    columns: Dict[str, list] = {k: [] for k in WALK_COLUMNS}
+
+    if df is None or df.empty:
+        return columns
+
+    if df.index.has_duplicates:
+        df = df[~df.index.duplicated()]
+
+    # Pivots are confirmed by a fixed window, so the pivots of any frame are
+    # the full history pivots whose window fits inside that frame
+    with TIMINGS.time("get_max_min"):
+        pivots = detector.get_max_min(df=df, bars_left=bars_left, bars_right=bars_right)
+    pivot_pos = df.index.get_indexer(pivots.index)
+
+    start = pd.Timestamp(start)
+    if df.index.tz is not None and start.tz is None:
+        start = start.tz_localize(df.index.tz)
+    first = df.index.searchsorted(start)
+
+    for end in range(first, len(df), step):
+        begin = max(0, end - bars + 1)
+        lo = np.searchsorted(pivot_pos, begin + bars_left + 1, side="left")
+        hi = np.searchsorted(pivot_pos, end - bars_right + 1, side="right")
+        if lo >= hi:
+            continue
+
+        frame = df.iloc[begin:end + 1]
+        frame_pivots = pivots.iloc[lo:hi]
+        TIMINGS.count("frames")
+
+        arrays = None
+        if kernel == "array" or len(functions) > 1:
+            with TIMINGS.time("get_pattern_arrays"):
+                arrays = Kernel.get_pattern_arrays(detector, frame, frame_pivots)
+
+        as_of = df.index[end].value
+        for function in functions:
+            try:
+                with TIMINGS.time(function.__name__):
+                    result = function(detector, symbol, frame, frame_pivots, arrays)
+            except Exception as e:
+                logger.exception(f"SYMBOL name: {symbol} as of {df.index[end]}", exc_info=e)
+                break
+            if result:
+                TIMINGS.count("patterns")
+                columns["sym"].append(symbol)
+                columns["pattern"].append(result["pattern"])
+                columns["as_of"].append(as_of)
+                columns["start"].append(pd.Timestamp(result["start"]).value)
+                columns["end"].append(pd.Timestamp(result["end"]).value)
+                (x0, y0), (x1, y1) = Backtest.get_entry_line(result)
+                columns["entry_x0"].append(pd.Timestamp(x0).value)
+                columns["entry_y0"].append(float(y0))
+                columns["entry_x1"].append(pd.Timestamp(x1).value)
+                columns["entry_y1"].append(float(y1))
+
+    return columns
+
+
+def _walk_batch(symbols: List[str]) -> Tuple[Dict[str, list], dict]:
+    """Walk forward a batch of symbols with the settings of this worker process,
+    returns the detections as columns and the timing of the batch"""
+    start = time.perf_counter()
+    settings = _scan_settings
+    columns: Dict[str, list] = {k: [] for k in WALK_COLUMNS}
+    frames = settings["loader"].iter_many(symbols)
+    while True:
+        with TIMINGS.time("loader.get"):
+            item = next(frames, None)
+        if item is None:
+            break
+        result = _walk_symbol(
+            *item,
+            functions=settings["functions"],
+            detector=settings["detector"],
+            logger=settings["logger"],
+            start=settings["walk_start"],
+            kernel=settings["kernel"],
+            step=settings["walk_step"],
+            bars=settings["walk_bars"],
+            bars_left=settings["bars_left"],
+            bars_right=settings["bars_right"])
+        for k, v in result.items():
+            columns[k].extend(v)
+    TIMINGS.count("symbols", len(symbols))
+    timing = dict(pid=os.getpid(), symbols=len(symbols), seconds=time.perf_counter() - start)
+    if TIMINGS.enabled:
+        timing["stages"] = TIMINGS.drain()
+    return columns, timing
+
+
+def _save_plot(plotter, dct: dict) -> Optional[dict]:
+    """Save the image of a pattern in a worker process, returns the worker's timings"""
+    with TIMINGS.time("SavingPlotService.save"):
+        plotter.save(dct)
+    return TIMINGS.drain() if TIMINGS.enabled else None
+
+
 class TradingAnalyse(BaseAnalyse):
 
+    # columns of the walk-forward output, see _walk_symbol
+    walk_columns = WALK_COLUMNS
+
     def __init__(self, service: Service, args: ArgumentParser):
         super().__init__(service)
         # Setup instance, args, etc.
         self.args: ArgumentParser = args
-        self.PatternDetector = PatternDetector(self._logger)
+        # pattern finders implementation, see Pattern.KERNELS
+        self.kernel = getattr(args, "kernel", None) or self._config.__dict__.get("PATTERN_KERNEL", "pandas")
+        # Persist confirmed pivots between runs, only for scans up to the latest bar
+        self.pivot_state = self._config.__dict__.get("PIVOT_STATE", False) and not args.date
+        self.PatternDetector = PatternDetector(
+            self._logger,
+            pivot_folder=self._config.FOLDER_Pivots if self.pivot_state else None)
+        # timings of the batches of the last scan, see _scan_batch
+        self.batch_timings: List[dict] = []
+        # Time every stage of a scan in the workers, see Timings
+        self.timings = bool(getattr(args, "timings", False) or self._config.__dict__.get("SCAN_TIMINGS", False))
 
         # Dynamically initialize the loader
         loader_name = self._config.__dict__.get("LOADER", "trading_csv_loader:TradingCsvLoader")
         module_name, class_name = loader_name.split(":")
         loader_module = importlib.import_module(f"src.services.loading.loader.{module_name}")
-        self.loader = getattr(loader_module, class_name)(
+        self.loader_class = getattr(loader_module, class_name)
+        self.loader = self.loader_class(
             config=self._config.__dict__,
             tf=args.tf,
             end_date=args.date)
@@ -36,59 +269,79 @@ class TradingAnalyse(BaseAnalyse):
             for future in futures:
                 future.cancel()
             concurrent.futures.wait(futures)
-        if loader.closed:
+        if not loader.closed:
             loader.close()
 
-    def _scan_pattern(
-            self,
-            symbol: str,
-            functions: Tuple[Callable, ...],
-            loader: AbstractLoader,
-            bars_left: int = 6,
-            bars_right: int = 6
-    ) -> List[dict]:
-        # initialize result: patterns
-        patterns: List[dict] = []
-
-        # Load symbol (default loader is csv trading_data_loader)
-        df = loader.get(symbol)
+    def _get_functions(self, pattern_name: str) -> Tuple[Callable, ...]:
+        fn_dict = Pattern.get_pattern_dict(self.kernel)
+        key_list = Pattern.get_pattern_list()
+        # Get function out
+        fn = fn_dict[pattern_name]
 
-        if df is None or df.empty:
-            return patterns
+        # check functions
+        if callable(fn):
+            return (fn,)
+        if fn == "bull":
+            bull_list = ("vcpu", "hnsu", "dbot")
+            return tuple(v for k, v in fn_dict.items() if k in bull_list and callable(v))
+        if fn == "bear":
+            bear_list = ("vcpd", "hnsd", "dtop")
+            return tuple(v for k, v in fn_dict.items() if k in bear_list and callable(v))
+        return tuple(v for k, v in fn_dict.items() if k in key_list[3:] and callable(v))
 
-        if df.index.has_duplicates:
-            df = df[~df.index.duplicated()]
-        # get feature points
-        pivots = self.PatternDetector.get_max_min(
-            df=df,
-            bars_left=bars_left,
-            bars_right=bars_right)
+    def _scan_worker_settings(self, fns: Tuple[Callable, ...], loader: AbstractLoader) -> dict:
+        """Everything a worker needs to scan, sent once per worker process"""
+        return dict(
+            functions=fns,
+            loader=loader,
+            detector=self.PatternDetector,
+            logger=self._logger,
+            kernel=self.kernel,
+            pivot_state=self.pivot_state,
+            bars_left=self.args.left,
+            bars_right=self.args.right,
+            timings=self.timings)
 
-        if not pivots.shape[0]:
-            return patterns
+    def _get_chunk_size(self, symbols: int) -> int:
+        """SCAN_CHUNK_SIZE from config, default about 4 batches per worker, at most 64 symbols"""
+        chunk_size = self._config.__dict__.get("SCAN_CHUNK_SIZE", 0)
+        if chunk_size:
+            return max(1, int(chunk_size))
+        return max(1, min(64, symbols // (4 * (os.cpu_count() or 1))))
 
-        # main loop to scan for patterns
-        for function in functions:
-            if not callable(function):
-                raise TypeError(f"Expected callable. Got {type(function)}")
-            try:
-                result = function(self.PatternDetector, symbol, df, pivots)
-            except Exception as e:
-                self._logger.exception(f"SYMBOL name: {symbol}", exc_info=e)
-                return patterns
-            # add detected patterns into result
-            if result:
-                patterns.append(self.PatternDetector.make_serializable(result))
+    def _log_batch_timings(self, chunk_size: int):
+        if not self.batch_timings:
+            return
+        seconds = np.array([t["seconds"] for t in self.batch_timings])
+        symbols = sum(t["symbols"] for t in self.batch_timings)
+        self._logger.info(
+            f"Scanned {symbols} symbols in {len(seconds)} batches of {chunk_size}: "
+            f"batch mean {seconds.mean():.3f}s, max {seconds.max():.3f}s, "
+            f"{symbols / seconds.sum():.1f} symbols/s per worker")
 
-        return patterns
+    def _report_timings(self, seconds: float):
+        """Log the stage timings of the last scan and write them to ROOT_Logs/scan_timings.json"""
+        report = dict(
+            generated=datetime.now().isoformat(timespec="seconds"),
+            pattern=self.args.pattern,
+            timeframe=self.loader.timeframe,
+            kernel=self.kernel,
+            workers=len({t["pid"] for t in self.batch_timings}),
+            seconds=round(seconds, 3),
+            **TIMINGS.to_dict())
+        self._logger.info(f"Scan stage timings, summed over workers, scan took {seconds:.3f}s\n{TIMINGS.summary()}")
+        timings_file = self._config.ROOT_Logs / "scan_timings.json"
+        timings_file.write_text(json.dumps(report, indent=2))
 
     def _process_by_pattern(
             self,
             symbol_list: List,
             fns: Tuple[Callable, ...],
-            futures: List[concurrent.futures.Future]
+            futures: List[concurrent.futures.Future],
+            loader: Optional[AbstractLoader] = None
     ) -> List[dict]:
         patterns: List[dict] = []
+        loader = loader or self.loader
         # Load or initialize state dict for storing previously detected patterns
         state = None
         state_file = None
@@ -110,31 +363,36 @@ class TradingAnalyse(BaseAnalyse):
         if save_folder and not save_folder.exists():
             self.path_exist(save_folder)
 
-        # begin a scan process
-        with concurrent.futures.ProcessPoolExecutor() as executor:
+        # begin a scan process, workers get the scan settings once
+        start = time.perf_counter()
+        TIMINGS.reset(enabled=self.timings)
+        chunk_size = self._get_chunk_size(len(symbol_list))
+        batches = [symbol_list[i:i + chunk_size] for i in range(0, len(symbol_list), chunk_size)]
+        with concurrent.futures.ProcessPoolExecutor(
+                initializer=_init_scan_worker,
+                initargs=(self._scan_worker_settings(fns, loader),)
+        ) as executor:
             # load concurrent task
-            for sym in symbol_list:
-                future = executor.submit(
-                    self._scan_pattern,
-                    symbol=sym,
-                    functions=fns,
-                    loader=self.loader,
-                    bars_left=self.args.left,
-                    bars_right=self.args.right)
-                futures.append(future)
-
-            for future in tqdm(
-                    iterable=concurrent.futures.as_completed(futures),
-                    total=len(futures)
-            ):
-                try:
-                    result = future.result()
-                except Exception as e:
-                    self._cleanup(self.loader, futures)
-                    self._logger.exception("Error in Future - scanning patterns", exc_info=e)
-                    return []
-                patterns.extend(result)
+            for batch in batches:
+                futures.append(executor.submit(_scan_batch, batch))
+
+            self.batch_timings = []
+            with tqdm(total=len(symbol_list)) as progress:
+                for future in concurrent.futures.as_completed(futures):
+                    try:
+                        result, timing = future.result()
+                    except Exception as e:
+                        self._cleanup(self.loader, futures)
+                        self._logger.exception("Error in Future - scanning patterns", exc_info=e)
+                        return []
+                    patterns.extend(result)
+                    TIMINGS.merge(timing.pop("stages", None))
+                    self.batch_timings.append(timing)
+                    self._logger.debug(
+                        f"Batch of {timing['symbols']} symbols in {timing['seconds']:.3f}s on pid {timing['pid']}")
+                    progress.update(timing["symbols"])
             futures.clear()
+            self._log_batch_timings(chunk_size)
 
             if state is not None:
                 # if no args.file option, no need to save state, return patterns
@@ -181,6 +439,8 @@ class TradingAnalyse(BaseAnalyse):
 
             patterns_to_output = patterns if state is None else filtered
             if not patterns_to_output:
+                if self.timings:
+                    self._report_timings(time.perf_counter() - start)
                 return []
             # Save the images if required
             if save_folder:
@@ -189,19 +449,21 @@ class TradingAnalyse(BaseAnalyse):
                     loader=self.loader,
                     save_folder=save_folder)
                 for i in patterns_to_output:
-                    future = executor.submit(plotter.save, i.copy())
+                    future = executor.submit(_save_plot, plotter, i.copy())
                     futures.append(future)
 
                 self._logger.info("Saving images")
 
                 for future in tqdm(concurrent.futures.as_completed(futures), total=len(futures)):
                     try:
-                        future.result()
+                        TIMINGS.merge(future.result())
                     except Exception as e:
                         self._cleanup(self.loader, futures)
                         self._logger.exception("Error in Futures - Saving images ", exc_info=e)
                         return []
 
+        if self.timings:
+            self._report_timings(time.perf_counter() - start)
         patterns_to_output.append({
             "timeframe": self.loader.timeframe,
             "end_date": self.args.date.isoformat() if self.args.date else None,
@@ -216,26 +478,138 @@ class TradingAnalyse(BaseAnalyse):
             futures: List[concurrent.futures.Future]
     ) -> List[dict]:
 
-        fn_dict = Pattern.get_pattern_dict()
-        key_list = Pattern.get_pattern_list()
-        # Get function out
-        fn = fn_dict[pattern_name]
+        fns = self._get_functions(pattern_name)
 
-        # check functions
-        if callable(fn):
-            fns = (fn,)
-        elif fn == "bull":
-            bull_list = ("vcpu", "hnsu", "dbot")
-            fns = tuple(v for k, v in fn_dict.items() if k in bull_list and callable(v))
-        elif fn == "bear":
-            bear_list = ("vcpd", "hnsd", "dtop")
-            fns = tuple(v for k, v in fn_dict.items() if k in bear_list and callable(v))
-        else:
-            fns = tuple(v for k, v in fn_dict.items() if k in key_list[3:] and callable(v))
+        # Optionally load every symbol once into shared memory for the workers
+        loader = self.loader
+        if self._config.__dict__.get("SHARED_MEMORY", False):
+            loader = ArenaLoader(self.loader, symbol_list)
 
         try:
-            return self._process_by_pattern(symbol_list, fns, futures)
+            return self._process_by_pattern(symbol_list, fns, futures, loader)
         except KeyboardInterrupt:
             self._cleanup(self.loader, futures)
             self._logger.info("User exit")
             exit()
+        finally:
+            if loader is not self.loader:
+                loader.close()
+
+    def process_walk_forward(
+            self,
+            symbol_list: List,
+            pattern_name: str,
+            futures: List[concurrent.futures.Future],
+            start: datetime,
+            step: int = 1,
+            bars: int = 160
+    ) -> pd.DataFrame:
+        """
+        Replay the scan as of every `step`-th bar from `start` up to `args.date`
+        or the latest bar. Each symbol is loaded once and every as-of frame holds
+        the last `bars` bars, as a regular scan on that date would see.
+        Detections are saved to a compressed npz file in the states folder.
+        """
+        fns = self._get_functions(pattern_name)
+
+        # enough history for the first frame and every bar after `start`
+        end_date = self.args.date or datetime.now()
+        period = bars + int(np.busday_count(start.date(), end_date.date())) + 1
+        loader = self.loader_class(
+            config=self._config.__dict__,
+            tf=self.args.tf,
+            end_date=self.args.date,
+            period=period)
+
+        # workers get the walk settings once, and walk batches of symbols
+        settings = dict(self._scan_worker_settings(fns, loader), walk_start=start, walk_step=step, walk_bars=bars)
+        scan_start = time.perf_counter()
+        TIMINGS.reset(enabled=self.timings)
+        chunk_size = self._get_chunk_size(len(symbol_list))
+        batches = [symbol_list[i:i + chunk_size] for i in range(0, len(symbol_list), chunk_size)]
+
+        columns: Dict[str, list] = {k: [] for k in self.walk_columns}
+        try:
+            with concurrent.futures.ProcessPoolExecutor(
+                    initializer=_init_scan_worker,
+                    initargs=(settings,)
+            ) as executor:
+                for batch in batches:
+                    futures.append(executor.submit(_walk_batch, batch))
+
+                self.batch_timings = []
+                with tqdm(total=len(symbol_list)) as progress:
+                    for future in concurrent.futures.as_completed(futures):
+                        try:
+                            result, timing = future.result()
+                        except Exception as e:
+                            self._cleanup(loader, futures)
+                            self._logger.exception("Error in Future - walking patterns", exc_info=e)
+                            return pd.DataFrame(columns=list(self.walk_columns))
+                        for k, v in result.items():
+                            columns[k].extend(v)
+                        TIMINGS.merge(timing.pop("stages", None))
+                        self.batch_timings.append(timing)
+                        progress.update(timing["symbols"])
+                futures.clear()
+                self._log_batch_timings(chunk_size)
+        except KeyboardInterrupt:
+            self._cleanup(loader, futures)
+            self._logger.info("User exit")
+            exit()
+
+        if self.timings:
+            self._report_timings(time.perf_counter() - scan_start)
+
+        arrays = dict(
+            sym=np.array(columns["sym"], dtype=str),
+            pattern=np.array(columns["pattern"], dtype=str),
+            as_of=np.array(columns["as_of"], dtype=np.int64),
+            start=np.array(columns["start"], dtype=np.int64),
+            end=np.array(columns["end"], dtype=np.int64),
+            entry_x0=np.array(columns["entry_x0"], dtype=np.int64),
+            entry_y0=np.array(columns["entry_y0"], dtype=np.float64),
+            entry_x1=np.array(columns["entry_x1"], dtype=np.int64),
+            entry_y1=np.array(columns["entry_y1"], dtype=np.float64))
+
+        name = self.args.file.stem if self.args.file else "symbols"
+        walk_file = self._config.FOLDER_States / (
+            f"walk_{name}_{pattern_name}_{loader.timeframe}_{start:%Y%m%d}_{end_date:%Y%m%d}.npz")
+        np.savez_compressed(walk_file, timeframe=np.array(loader.timeframe), **arrays)
+        self._logger.info(f"Saved {len(arrays['sym'])} walk-forward detections to {walk_file}")
+
+        df = pd.DataFrame(arrays)
+        for col in ("as_of", "start", "end", "entry_x0", "entry_x1"):
+            df[col] = pd.to_datetime(df[col], utc=True)
+        return df
+
+    def backtest_patterns(
+            self,
+            patterns: Union[List[dict], pd.DataFrame],
+            horizons: Tuple[int, ...] = (5, 10, 20)
+    ) -> pd.DataFrame:
+        """
+        Forward returns, excursions and entry line breakout timing of detected
+        patterns, see pattern_backtest. Accepts the pattern dicts of a scan or
+        the result of a walk-forward scan.
+        """
+        if isinstance(patterns, pd.DataFrame):
+            det = Backtest.get_frame_detections(patterns)
+        else:
+            det = Backtest.get_detections(patterns)
+        if not len(det.sym):
+            return pd.DataFrame(columns=["sym", "pattern", "as_of", "direction"])
+
+        # bars from the earliest entry line up to the latest available bar
+        first = pd.Timestamp(min(det.entry_x0.min(), det.as_of.min()), tz="UTC")
+        period = int(np.busday_count(first.date(), datetime.now().date())) + 1
+        loader = self.loader_class(
+            config=self._config.__dict__,
+            tf=self.args.tf,
+            period=period)
+
+        try:
+            return Backtest.backtest(det, loader.get, horizons)
+        finally:
+            if not loader.closed:
+                loader.close()
@@ -132,6 +132,7 @@ class Config:
         self.FOLDER_Daily = self.path_exist(self.ROOT_Data / "daily")
         self.FOLDER_Tradings = self.path_exist(self.ROOT_Data / "daily")
         self.FOLDER_Infos = self.path_exist(self.ROOT_Data / "infos")
+        self.FOLDER_Cache = self.path_exist(self.ROOT_Data / "cache")
 
         # research sub-folder
         self.FOLDER_Watch = self.path_exist(self.ROOT_Research / "watch")
@@ -139,10 +140,12 @@ class Config:
         self.FOLDER_Lines = self.path_exist(self.ROOT_Research / "lines")
         self.FOLDER_Images = self.path_exist(self.ROOT_Research / "images")
         self.FOLDER_States = self.path_exist(self.ROOT_Research / "states")
+        self.FOLDER_Pivots = self.path_exist(self.FOLDER_States / "pivots")
 
         # Files
         self.FILE_WatchList = self.path_exist(Path(self.__dict__["SYM_LIST"]))
         self.FILE_Infos_Errors = self.path_exist(self.FOLDER_Infos / "errors.json")
+        self.FILE_Infos_Store = self.FOLDER_Infos / "infos.npz"
         # </editor-fold>
 
         # <editor-fold desc="Declare Format">
@@ -1,4 +1,5 @@
 import io
+import os
 import pandas as pd
 from src import Config
 from pathlib import Path
@@ -23,3 +24,121 @@ class CsvEngine(BaseEngine):
     def save_df(self, df: DataFrame):
         df.to_csv(self.Path, index=True, header=True)  # Save to CSV
 
+    def write_df(self, df: DataFrame):
+        """Replace the file with df, written to a temporary file and renamed"""
+        tmp = self.Path.with_name(f"{self.Path.name}.{os.getpid()}.tmp")
+        df.to_csv(tmp, index=True, header=True)
+        os.replace(tmp, self.Path)
+
+    @staticmethod
+    def _find_cut(f, first_date: bytes, header_end: int, size: int) -> int:
+        """Offset of the first row dated first_date or later, scanning rows back
+        from the end. Rows are in date order, their date is the leading field."""
+        cut = size
+        pos = size
+        # start of the line cut by the previous chunk read
+        carry = b""
+        while pos > header_end:
+            step = min(64 * 1024, pos - header_end)
+            pos -= step
+            f.seek(pos)
+            chunk = f.read(step) + carry
+            lines = chunk.split(b"\n")
+            if pos > header_end:
+                # the first line may start in the chunk before
+                carry = lines.pop(0)
+            end = pos + len(chunk)
+            for line in reversed(lines):
+                start = end - len(line)
+                end = start - 1
+                if not line.strip():
+                    continue
+                if line[:len(first_date)] < first_date:
+                    return cut
+                cut = start
+        return cut
+
+    def append_df(self, df: DataFrame) -> int:
+        """
+        Merge df into the file, new dates are appended and dates already
+        stored are replaced by the rows of df. When df ends on or after the
+        last stored date, only the rows from the first date of df on are
+        written, not the whole file. Otherwise, or when the columns differ,
+        the merged history is rewritten.
+        Rows must be dated by their index, in the same format as the file.
+        Returns the number of rows written.
+        """
+        if df.empty:
+            return 0
+        df = df.sort_index()
+        header = ",".join([str(df.index.name or ""), *map(str, df.columns)]).encode()
+        data = df.to_csv(index=True, header=False).encode()
+        # calendar date as written, the time and offset of a day may differ between fetches
+        first_date = data[:10]
+        last_date = data[data.rstrip(b"\r\n").rfind(b"\n") + 1:][:10]
+        with open(self.Path, "rb") as f:
+            stored_header = f.readline().rstrip(b"\r\n")
+            stored_last_date = self._last_date(f, f.tell(), f.seek(0, os.SEEK_END))
+        if stored_header != header:
+            # new or empty file, or other columns
+            return self._rewrite_merged(df, merge=bool(stored_header))
+        if stored_last_date > last_date:
+            # appending would cut the rows stored after df
+            return self._rewrite_merged(df, merge=True)
+
+        with open(self.Path, "r+b") as f:
+            header_end = len(f.readline())
+            size = f.seek(0, os.SEEK_END)
+            cut = self._find_cut(f, first_date, header_end, size)
+            f.seek(cut)
+            replaced = f.read()
+            if replaced == data:
+                return 0
+            if cut == size and self._last_byte(f, size) != b"\n":
+                data = b"\n" + data
+            try:
+                f.seek(cut)
+                f.truncate()
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            except OSError:
+                # put back the rows that were cut
+                f.seek(cut)
+                f.truncate()
+                f.write(replaced)
+                raise
+        return len(df)
+
+    def _rewrite_merged(self, df: DataFrame, merge: bool) -> int:
+        """Rewrite the file with df merged into the stored history, df replacing the dates it holds"""
+        if merge:
+            stored = pd.read_csv(self.Path, index_col=0, dtype={0: object})
+            # replaced by calendar date as written, as in _find_cut
+            replaced = stored.index.str[:10].isin(df.index.astype(str).str[:10])
+            stored = stored[~replaced]
+            stored.index = pd.to_datetime(stored.index, utc=True).tz_convert(df.index.tz)
+            stored.index.name = df.index.name
+            df = pd.concat([stored, df]).sort_index()
+        self.write_df(df)
+        return len(df)
+
+    @staticmethod
+    def _last_date(f, header_end: int, size: int) -> bytes:
+        """Date of the last row, empty when the file has no row"""
+        pos = size
+        tail = b""
+        while pos > header_end:
+            step = min(4096, pos - header_end)
+            pos -= step
+            f.seek(pos)
+            tail = f.read(step) + tail
+            lines = tail.rstrip(b"\r\n").split(b"\n")
+            if len(lines) > 1 or pos == header_end:
+                return lines[-1][:10]
+        return b""
+
+    @staticmethod
+    def _last_byte(f, size: int) -> bytes:
+        f.seek(size - 1)
+        return f.read(1)
@@ -1,11 +1,136 @@
+import io
+import os
+import time
+import atexit
+import threading
 import psycopg2
+from pathlib import Path
+import numpy as np
+import pandas as pd
 from pandas import DataFrame
 from psycopg2 import sql
+from psycopg2.pool import ThreadedConnectionPool
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence
 from src import Config
 from src.engines.base_engine import BaseEngine
 
 
+class PgSqlPool(ThreadedConnectionPool):
+    """
+    Thread-safe pool that opens connections on demand, up to maxconn, and
+    keeps them open once returned. connection() waits for a free connection
+    when all are in use.
+
+    connection() hands out a healthy connection: closed connections are
+    discarded, and one idle for more than `ping_after` seconds is checked
+    with a SELECT 1 first, as the server or a firewall may have dropped it.
+    """
+
+    def __init__(self, maxconn: int, ping_after: float, **kwargs):
+        # no connection opened here, returned connections are all kept
+        super().__init__(0, maxconn, **kwargs)
+        self.minconn = maxconn
+        self.ping_after = ping_after
+        self._slots = threading.BoundedSemaphore(maxconn)
+        # id of the connection: monotonic time it was last returned
+        self._last_used: Dict[int, float] = {}
+
+    @staticmethod
+    def _ping(conn) -> bool:
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _checkout(self):
+        # every pooled connection may be stale, plus one new connection
+        for _ in range(self.maxconn + 1):
+            conn = self.getconn()
+            last_used = self._last_used.pop(id(conn), None)
+            if not conn.closed and (
+                    last_used is None or time.monotonic() - last_used < self.ping_after or self._ping(conn)):
+                return conn
+            self.putconn(conn, close=True)
+        raise psycopg2.OperationalError("No healthy connection to the database")
+
+    @contextmanager
+    def connection(self) -> Iterator[psycopg2.extensions.connection]:
+        """Connection committed on exit, rolled back on error, then returned to the pool"""
+        with self._slots:
+            conn = self._checkout()
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                if not conn.closed:
+                    conn.rollback()
+                raise
+            finally:
+                if not conn.closed:
+                    self._last_used[id(conn)] = time.monotonic()
+                self.putconn(conn, close=bool(conn.closed))
+
+
+# Process-wide pools, by connection settings
+_pools: Dict[tuple, PgSqlPool] = {}
+_pools_lock = threading.Lock()
+# Pools inherited from the parent process, see _after_fork
+_inherited: List[PgSqlPool] = []
+
+
+def get_pool(db_conn: dict, maxconn: int = 4, ping_after: float = 60.0) -> PgSqlPool:
+    """Pool of this process for the connection settings, created on first use"""
+    key = tuple(sorted((k, str(v)) for k, v in db_conn.items()))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.closed:
+            pool = _pools[key] = PgSqlPool(
+                maxconn=maxconn,
+                ping_after=ping_after,
+                **{k: v for k, v in db_conn.items() if v is not None})
+        return pool
+
+
+def close_pools():
+    """Close the connections of every pool of this process"""
+    with _pools_lock:
+        for pool in _pools.values():
+            if not pool.closed:
+                pool.closeall()
+        _pools.clear()
+
+
+def _after_fork():
+    global _pools_lock
+    _pools_lock = threading.Lock()
+    # A forked worker must not use the parent's connections, nor close them:
+    # closing sends a terminate message on the socket the parent still uses.
+    # They are kept referenced and the worker opens its own.
+    _inherited.extend(_pools.values())
+    _pools.clear()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+atexit.register(close_pools)
+
+
+# Type codes of smallint, integer and bigint columns in cursor.description
+INTEGER_TYPES = {21, 23, 20}
+
+
 class PgSqlEngine(BaseEngine):
+    """
+    PostgreSQL access through the process-wide pool of `DB_CONN`.
+
+    Creating an engine does not connect, connections are opened by the pool
+    when first needed and reused by every engine of the process.
+    Pool size is `DB_POOL_SIZE` (default 4), idle connections are checked
+    after `DB_POOL_PING` seconds (default 60).
+    """
 
     def __init__(self, config: Config):
         super().__init__(config)
@@ -14,14 +139,25 @@ class PgSqlEngine(BaseEngine):
         self.dbname = config.DB_CONN.get("dbname")
         self.user = config.DB_CONN.get("user")
         self.password = config.DB_CONN.get("password")
+        self.pool_size = max(1, int(self._config.__dict__.get("DB_POOL_SIZE", 4)))
+        self.ping_after = float(self._config.__dict__.get("DB_POOL_PING", 60))
 
-        self.db_conn = psycopg2.connect(
-            host=self.host,
-            port=self.port,
-            dbname=self.dbname,
-            user=self.user,
-            password=self.password,
-        )
+    @property
+    def pool(self) -> PgSqlPool:
+        return get_pool(
+            dict(host=self.host, port=self.port, dbname=self.dbname, user=self.user, password=self.password),
+            maxconn=self.pool_size,
+            ping_after=self.ping_after)
+
+    def connection(self):
+        """Context-managed pooled connection, committed on exit"""
+        return self.pool.connection()
+
+    @contextmanager
+    def cursor(self) -> Iterator[psycopg2.extensions.cursor]:
+        """Context-managed cursor of a pooled connection, committed on exit"""
+        with self.connection() as conn, conn.cursor() as cursor:
+            yield cursor
 
     def save_df(
             self,
@@ -29,7 +165,7 @@ class PgSqlEngine(BaseEngine):
             df_source: DataFrame,
             execute_func: callable
     ):
-        with self.db_conn.cursor() as cursor:
+        with self.connection() as db_conn, db_conn.cursor() as cursor:
             insert_query = psycopg2.sql.SQL(sql_query)
             for _, row in df_source.iterrows():
                 result = ()
@@ -38,4 +174,120 @@ class PgSqlEngine(BaseEngine):
                     cursor.execute(insert_query, result)
                 except Exception as e:
                     print(f"Error: {e}")
-                self.db_conn.commit()
+                db_conn.commit()
+
+    @staticmethod
+    def _integers_as_int(df: DataFrame, columns: List[str]) -> DataFrame:
+        """
+        Float values of integer columns written without decimals. pandas makes
+        an integer column with missing values float, and COPY rejects the 1.0
+        it writes. Values with decimals or out of range are left for COPY to reject.
+        """
+        floats = [c for c in columns if pd.api.types.is_float_dtype(df[c])]
+        if not floats:
+            return df
+        df = df.copy()
+        for col in floats:
+            values = df[col].to_numpy()
+            whole = ~np.isnan(values) & (values % 1 == 0) & (np.abs(values) < 2 ** 63)
+            converted = values.astype(object)
+            converted[whole] = values[whole].astype(np.int64)
+            df[col] = converted
+        return df
+
+    def bulk_upsert(
+            self,
+            table: str,
+            df_source: DataFrame,
+            key_columns: Sequence[str],
+            batch_size: Optional[int] = None,
+            reject_path: Optional[Path] = None,
+    ) -> dict:
+        """
+        Upsert the rows of df_source into table, columns named as in the table.
+
+        Rows are streamed with COPY into a temporary staging table, `batch_size`
+        rows per COPY (config `DB_COPY_BATCH`, default 10000), then merged by a
+        single INSERT ... ON CONFLICT (key_columns) DO UPDATE, and committed once.
+
+        A batch COPY rejects is split in halves until the failing rows are found.
+        They are written, with the database error, to reject_path, default
+        `{table}_rejects.csv` in the log folder, and the other rows are kept.
+        Duplicated keys keep their last row.
+
+        Returns the load metrics: rows, duplicates, rejected, merged, seconds, rows_per_sec.
+        """
+        start_time = time.perf_counter()
+        batch_size = max(1, int(batch_size or self._config.__dict__.get("DB_COPY_BATCH", 10000)))
+        reject_path = reject_path or self._config.ROOT_Logs / f"{table}_rejects.csv"
+
+        df = df_source.drop_duplicates(subset=list(key_columns), keep="last")
+        columns = list(df.columns)
+        target = sql.Identifier(*table.split("."))
+        staging = sql.Identifier(f"{table.split('.')[-1]}_staging")
+        column_list = sql.SQL(", ").join(map(sql.Identifier, columns))
+        copy_query = sql.SQL("COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv)").format(
+            staging=staging, columns=column_list)
+        updates = [c for c in columns if c not in key_columns]
+        merge_query = sql.SQL(
+            "INSERT INTO {target} ({columns}) SELECT {columns} FROM {staging} ON CONFLICT ({keys}) DO {action}"
+        ).format(
+            target=target,
+            staging=staging,
+            columns=column_list,
+            keys=sql.SQL(", ").join(map(sql.Identifier, key_columns)),
+            action=sql.SQL("UPDATE SET {}").format(sql.SQL(", ").join(
+                sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(c)) for c in updates
+            )) if updates else sql.SQL("NOTHING"))
+
+        rejects: List[DataFrame] = []
+
+        def copy_rows(cursor, rows: DataFrame):
+            buffer = io.StringIO()
+            rows.to_csv(buffer, index=False, header=False)
+            buffer.seek(0)
+            cursor.execute("SAVEPOINT bulk_copy")
+            try:
+                cursor.copy_expert(copy_query, buffer)
+                cursor.execute("RELEASE SAVEPOINT bulk_copy")
+            except (psycopg2.DataError, psycopg2.IntegrityError) as e:
+                cursor.execute("ROLLBACK TO SAVEPOINT bulk_copy")
+                if len(rows) == 1:
+                    rejects.append(rows.assign(error=str(e).strip().splitlines()[0]))
+                    return
+                half = len(rows) // 2
+                copy_rows(cursor, rows.iloc[:half])
+                copy_rows(cursor, rows.iloc[half:])
+
+        with self.cursor() as cursor:
+            cursor.execute(sql.SQL(
+                "CREATE TEMP TABLE {staging} (LIKE {target} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) ON COMMIT DROP"
+            ).format(staging=staging, target=target))
+            cursor.execute(sql.SQL("SELECT {columns} FROM {target} LIMIT 0").format(
+                columns=column_list, target=target))
+            df = self._integers_as_int(df, [c.name for c in cursor.description if c.type_code in INTEGER_TYPES])
+            for i in range(0, len(df), batch_size):
+                copy_rows(cursor, df.iloc[i:i + batch_size])
+            cursor.execute(merge_query)
+            merged = cursor.rowcount
+
+        rejected = sum(len(r) for r in rejects)
+        if rejects:
+            reject_path.parent.mkdir(parents=True, exist_ok=True)
+            pd.concat(rejects).to_csv(reject_path, index=False)
+            self._logger.warning(f"{rejected} rows rejected from {table}, see {reject_path}")
+        elif reject_path.exists():
+            # rejects of a previous load
+            reject_path.unlink()
+
+        seconds = time.perf_counter() - start_time
+        metrics = dict(
+            rows=len(df_source),
+            duplicates=len(df_source) - len(df),
+            rejected=rejected,
+            merged=merged,
+            seconds=round(seconds, 3),
+            rows_per_sec=round(len(df_source) / seconds, 1) if seconds else 0.0,
+        )
+        self._logger.info(f"Bulk upsert into {table}: {metrics}")
+        return metrics
@@ -0,0 +1,167 @@
+import os
+import json
+import mmap
+import zlib
+import threading
+import numpy as np
+from pathlib import Path
+from zoneinfo import ZoneInfo
+from typing import Dict, List, Optional
+from datetime import datetime, time, timedelta
+
+
+# yfinance periods, shortest first, with the calendar days they cover
+PERIOD_DAYS = {
+    "1d": 1, "5d": 5, "1mo": 30, "3mo": 90, "6mo": 180,
+    "1y": 365, "2y": 730, "5y": 1826, "10y": 3652, "max": None,
+}
+
+
+def last_close(now: datetime, tz: ZoneInfo, close: time = time(16)) -> datetime:
+    """Close time of the last weekday session ended before now"""
+    now = now.astimezone(tz)
+    day = now.date() if now.time() >= close else now.date() - timedelta(1)
+    while day.weekday() >= 5:
+        day -= timedelta(1)
+    return datetime.combine(day, close, tzinfo=tz)
+
+
+class FetchManifest:
+    """
+    Per-symbol state of the daily CSV files, kept by the fetch services.
+
+    For every symbol fetched, the manifest holds the date of its last bar,
+    when it was fetched, its row count and a CRC32 of the file, along with
+    the file size and mtime the entry was taken from.
+
+    A symbol is current when it was fetched after the last market close and
+    its file was not changed since. A file of the same size with another
+    mtime, e.g. written again with the same rows, is compared by its CRC32.
+    Fetching only the other symbols turns a full refresh into a delta refresh.
+    Symbols that failed have no new entry, so they are fetched again on the
+    next run.
+
+    Parameters:
+    :param path: JSON file of the manifest
+    :type path: Path
+    :param tz: Time zone of the market
+    :type tz: ZoneInfo
+    :param save_every: Entries recorded between two saves during a run
+    :type save_every: int
+    """
+
+    def __init__(self, path: Path, tz: ZoneInfo, save_every: int = 100):
+        self.path = Path(path)
+        self.tz = tz
+        self.save_every = save_every
+        self.lock = threading.Lock()
+        self.unsaved = 0
+        self.entries: Dict[str, dict] = {}
+        if self.path.exists() and self.path.stat().st_size:
+            self.entries = json.loads(self.path.read_bytes())
+
+    @staticmethod
+    def scan(file: Path) -> dict:
+        """Last bar date, row count and CRC32 of a CSV file, in one read"""
+        stat = file.stat()
+        entry = dict(last_date=None, rows=0, checksum=f"{0:08x}", size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        if not stat.st_size:
+            return entry
+        with open(file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            entry["checksum"] = f"{zlib.crc32(mm):08x}"
+            buf = np.frombuffer(mm, dtype=np.uint8)
+            # non-empty lines after the header
+            starts = np.flatnonzero(buf[:-1] == 10) + 1
+            starts = starts[(buf[starts] != 10) & (buf[starts] != 13)]
+            entry["rows"] = len(starts)
+            if len(starts):
+                entry["last_date"] = mm[int(starts[-1]):int(starts[-1]) + 10].decode()
+            del buf
+        return entry
+
+    @staticmethod
+    def checksum(file: Path) -> str:
+        """CRC32 of a file"""
+        with open(file, "rb") as f:
+            if not os.fstat(f.fileno()).st_size:
+                return f"{0:08x}"
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return f"{zlib.crc32(mm):08x}"
+
+    @classmethod
+    def unchanged(cls, entry: dict, file: Path) -> bool:
+        """The file is the one entry was taken from"""
+        stat = file.stat()
+        if stat.st_size != entry["size"]:
+            return False
+        if stat.st_mtime_ns == entry["mtime_ns"]:
+            return True
+        # same size, only a full read tells a rewrite with the same rows from a change
+        if "checksum" not in entry or cls.checksum(file) != entry["checksum"]:
+            return False
+        # the file is not read again on the next check
+        entry["mtime_ns"] = stat.st_mtime_ns
+        return True
+
+    def record(self, symbol: str, file: Path, fetched_at: Optional[datetime] = None):
+        """Update the entry of symbol from its file, just fetched"""
+        entry = self.scan(file)
+        entry["fetched_at"] = (fetched_at or datetime.now(self.tz)).isoformat(timespec="seconds")
+        with self.lock:
+            self.entries[symbol] = entry
+            self.unsaved += 1
+            if self.unsaved < self.save_every:
+                return
+        # saved as the run goes, an interrupted run resumes from there
+        self.save()
+
+    def is_current(self, symbol: str, file: Path, now: Optional[datetime] = None) -> bool:
+        """Fetched since the last close and the file is unchanged"""
+        entry = self.entries.get(symbol)
+        if entry is None or not file.exists() or not self.unchanged(entry, file):
+            return False
+        now = now or datetime.now(self.tz)
+        return datetime.fromisoformat(entry["fetched_at"]) >= last_close(now, self.tz)
+
+    def last_date(self, symbol: str, file: Path) -> Optional[str]:
+        """Date of the last bar of symbol, from the file if it changed since its entry"""
+        if not file.exists():
+            return None
+        entry = self.entries.get(symbol)
+        if entry is None or not self.unchanged(entry, file):
+            entry = self.scan(file)
+        return entry["last_date"]
+
+    @staticmethod
+    def period(last_date: Optional[str], period: str, now: datetime) -> str:
+        """Shortest period from `period` on covering the days since last_date"""
+        if last_date is None or period not in PERIOD_DAYS:
+            return period
+        missing = (now.date() - datetime.fromisoformat(last_date).date()).days
+        periods = list(PERIOD_DAYS)
+        for name in periods[periods.index(period):]:
+            days = PERIOD_DAYS[name]
+            if days is None or days >= missing:
+                return name
+        return period
+
+    def plan(self, symbols: List[str], files: Dict[str, Path], period: str,
+             now: Optional[datetime] = None) -> Dict[str, List[str]]:
+        """Symbols to fetch grouped by period, current symbols are left out.
+        A symbol missing days gets a period long enough to fill the gap."""
+        now = now or datetime.now(self.tz)
+        groups: Dict[str, List[str]] = {}
+        for symbol in symbols:
+            file = files[symbol]
+            if self.is_current(symbol, file, now):
+                continue
+            groups.setdefault(self.period(self.last_date(symbol, file), period, now), []).append(symbol)
+        return groups
+
+    def save(self):
+        """Write the manifest to a temporary file and rename it"""
+        with self.lock:
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(self.entries, indent=1, sort_keys=True))
+            os.replace(tmp, self.path)
+            self.unsaved = 0
@@ -1,13 +1,13 @@
 import json
 import io
 import pandas as pd
-from pandas import Series, Timestamp
-from typing import List, Hashable
+from typing import Optional
 import yfinance as yf
-from tqdm import tqdm
 
 from src.engine import Engine
 from src.services.base_service import BaseService
+from src.services.fetching.info_harvester import InfoProvider, info_harvester
+from src.services.loading.info_store import InfoStore
 
 
 def asset_type(asset_type: str) -> int:
@@ -23,12 +23,6 @@ def asset_type(asset_type: str) -> int:
         return -1
 
 
-def DATE2(value: str) -> object | Timestamp | Timestamp:
-    if pd.isna(value):
-        return None
-    return pd.to_datetime(value)
-
-
 class FetchingSymbolService(BaseService):
 
     def __init__(self, engine: Engine):
@@ -47,65 +41,63 @@ class FetchingSymbolService(BaseService):
         # df_source["ipoDate"] = pd.to_datetime(df_source['ipoDate'], errors='coerce')
         # df_source["delistingDate"] = pd.to_datetime(df_source['delistingDate'], errors='coerce')
 
-        # sql query
-        sql_query = """
-                        INSERT INTO symbol (symbol, name, market, asset_type, ipo_date, delisting_date, status)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (symbol) DO UPDATE SET
-                            name = EXCLUDED.name,
-                            market = EXCLUDED.market,
-                            asset_type = EXCLUDED.asset_type,
-                            ipo_date = EXCLUDED.ipo_date,
-                            delisting_date = EXCLUDED.delisting_date,
-                            status = EXCLUDED.status
-                    """
-
-        # insert function
-        def insert_fn(_: Hashable, row: Series):
-            return (
-                row.get('symbol', default="null"),
-                row.get('name', default="null"),
-                row.get('exchange', default="null"),
-                asset_type(row.get('assetType', default="NULL")),
-                DATE2(row.get('ipoDate')),
-                DATE2(row.get('delistingDate')),
-                row['status'] == "Active",
-            )
-
-        self._engine.db().save_df(
-            sql_query=sql_query,
-            df_source=df_source,
-            execute_func=insert_fn
+        # columns of the symbol table, dates are parsed by PostgreSQL,
+        # rows it can not parse end up in the reject file
+        df_symbol = pd.DataFrame({
+            "symbol": df_source["symbol"],
+            "name": df_source["name"],
+            "market": df_source["exchange"],
+            "asset_type": df_source["assetType"].map(asset_type),
+            "ipo_date": df_source["ipoDate"],
+            "delisting_date": df_source["delistingDate"],
+            "status": df_source["status"] == "Active",
+        })
+
+        self._engine.db().bulk_upsert(
+            table="symbol",
+            df_source=df_symbol,
+            key_columns=["symbol"],
         )
 
-    def fetch_symbols_info(self):
+    def save_symbol_info(self, symbol: str, info: dict, store: Optional[InfoStore] = None):
+        quote_type = info.get("quoteType", "unknown")
+        self._engine.json(self._config.FOLDER_Infos, quote_type, f"{symbol}.json").save(info)
+        if store is not None:
+            store.add(symbol, info)
+
+    def fetch_symbols_info(self, provider: Optional[InfoProvider] = None):
+        """
+        Fetch the info of every symbol of FullSymbols.csv concurrently, see InfoHarvester
+        for the `INFO_*` settings. Info files fresher than `INFO_TTL_DAYS` are kept, an
+        interrupted run resumes from its checkpoint. Failures are written to errors.json.
+        Infos are also upserted into the columnar InfoStore read by SymbolAnalyse.
+        """
         full_symbols = pd.read_csv(self._config.FOLDER_Symbols / "FullSymbols.csv")
         full_symbols["symbol"] = full_symbols["symbol"].astype(str)
         symbols = full_symbols["symbol"].tolist()
-        # symbols = ["BC","BC/PA"]
-        symbols_str = " ".join(symbols)
-        tickers = yf.Tickers(symbols_str)
-
-        error_path = self.path_exist(self._config.FILE_Infos_Errors)
-        if error_path.exists():
-            with open(error_path.resolve(), "w"):
-                pass
-        for symbol in tqdm(symbols, desc="Fetching symbol info"):
-            try:
-                # get ticker object
-                ticker = tickers.tickers[symbol]
-                # get info & quote type
-                ticker_info = ticker.info
-                if "quoteType" in ticker_info:
-                    quote_type = ticker_info["quoteType"]
-                else:
-                    quote_type = "unknown"
-                # Save the treading to a csv file
-                self._.json_Data("infos", f"{quote_type}", f"{symbol}.json").save(ticker_info)
-            except Exception as e:
-                with open(error_path.resolve(), "a") as error_file:
-                    error_file.write(f"{symbol}\n")
-                print(f"Error: fetch {symbol} info - got Error:{e}")
+
+        store = InfoStore(self._config.FILE_Infos_Store)
+        if not store.exists():
+            # first run, start from the info files already fetched
+            store.rebuild(self._config.FOLDER_Infos)
+
+        harvester = info_harvester(
+            self._config.__dict__,
+            save=lambda symbol, info: self.save_symbol_info(symbol, info, store),
+            folder=self._config.FOLDER_Infos,
+            checkpoint=self._config.FOLDER_Infos / "checkpoint.json",
+            provider=provider)
+        try:
+            stats = harvester.harvest(symbols)
+        finally:
+            store.flush()
+        failures = stats.pop("failures")
+        for symbol, error in failures.items():
+            self._logger.error(f"Error: fetch {symbol} info - got Error:{error}")
+        self._engine.json(self._config.FILE_Infos_Errors).save(failures)
+        self._logger.info(
+            f"Fetched info: {stats['fetched']} symbols, {stats['skipped']} up to date, "
+            f"{stats['failed']} failed in {stats['seconds']}s, {stats['symbols_per_sec']} symbols/s")
 
     def showing_symbol_info_single(self, symbol: str):
         ticker = yf.Ticker(symbol.upper())
@@ -1,10 +1,11 @@
 import json
-from typing import List
+from pathlib import Path
+from typing import List, Optional
 import pandas as pd
-from tqdm import tqdm
-import yfinance as yf
 from src.engine import Engine
 from src.services.base_service import BaseService
+from src.services.fetching.fetch_manifest import FetchManifest
+from src.services.fetching.history_fetcher import HistoryProvider, history_fetcher
 
 
 class FetchingTradingService(BaseService):
@@ -12,22 +13,67 @@ class FetchingTradingService(BaseService):
     def __init__(self, engine: Engine):
         super().__init__(engine)
 
+    def save_history(self, symbol: str, history: pd.DataFrame) -> Path:
+        csv = self._engine.csv("daily", f"{symbol}.csv")
+        if self._config.__dict__.get("FETCH_INCREMENTAL", True):
+            # only the fetched dates are written, the stored history is kept
+            csv.append_df(history)
+        else:
+            csv.save_df(history)
+        return csv.Path
+
+    def update_failure_ledger(self, symbols: List[str], failures: dict):
+        """Symbols fetched are cleared from the ledger, failures are recorded with their error"""
+        ledger = self._engine.json(self._config.FOLDER_Watch, "tradings_fetch_failures.json")
+        data = ledger.load() if ledger.Path.stat().st_size else {}
+        for symbol in symbols:
+            data.pop(symbol, None)
+        data.update(failures)
+        ledger.save(data)
+
     def fetch_history(
             self,
             name: str,
             symbols: List[str] = None,
-            period="1d"):
+            period="1d",
+            provider: Optional[HistoryProvider] = None):
+        """
+        Fetch the trading history of symbols concurrently, see HistoryFetcher for the
+        `FETCH_*` settings. Failed symbols are kept in tradings_fetch_failures.json.
+
+        Symbols fetched since the last close are skipped, others get a period long
+        enough to fill the days since their last bar, see FetchManifest.
+        `FETCH_SKIP_CURRENT` false fetches every symbol with `period`.
+        """
         def main_process():
-            tickers = yf.Tickers(" ".join(symbols))
-            for ticker_symbol in tqdm(symbols, desc=f"Fetching {name} trading history"):
-                try:
-                    # get ticker object
-                    ticker = tickers.tickers[ticker_symbol]
-                    # Save the treading to a csv file
-                    history = ticker.plot_trading(period=period)
-                    self._engine.csv("daily", f"{ticker_symbol}.csv").save_df(history)
-                except Exception as e:
-                    self._logger.error(f"Error: fetch {ticker_symbol} trading history - got Error:{e}")
+            manifest = FetchManifest(
+                self._config.FOLDER_Watch / "tradings_fetch_manifest.json",
+                tz=self._config.TIMEZONE_US)
+
+            def save(symbol: str, history: pd.DataFrame):
+                manifest.record(symbol, self.save_history(symbol, history))
+
+            if self._config.__dict__.get("FETCH_SKIP_CURRENT", True):
+                files = {symbol: self._config.FOLDER_Daily / f"{symbol}.csv" for symbol in symbols}
+                groups = manifest.plan(symbols, files, period)
+            else:
+                groups = {period: list(symbols)}
+            pending = sum(len(group) for group in groups.values())
+            self._logger.info(f"Fetching {name}: {len(symbols) - pending} symbols up to date, {pending} to fetch")
+
+            fetcher = history_fetcher(self._config.__dict__, save=save, provider=provider)
+            try:
+                for group_period, group in groups.items():
+                    stats = fetcher.fetch(group, period=group_period, desc=f"Fetching {name} trading history")
+                    failures = stats.pop("failures")
+                    for symbol, failure in failures.items():
+                        self._logger.error(f"Error: fetch {symbol} trading history - got Error:{failure['error']}")
+                    self.update_failure_ledger(group, failures)
+                    self._logger.info(
+                        f"Fetched {name} ({group_period}): {stats['fetched']}/{stats['symbols']} symbols "
+                        f"in {stats['seconds']}s, {stats['symbols_per_sec']} symbols/s")
+            finally:
+                manifest.save()
 
         # run main_process with logging
         self.logging_process_time(
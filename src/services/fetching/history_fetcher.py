@@ -0,0 +1,213 @@
+import time
+import random
+import logging
+import threading
+import pandas as pd
+from tqdm import tqdm
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Protocol
+
+
+logger = logging.getLogger(__name__)
+
+
+class HistoryProvider(Protocol):
+    """Source of daily history, the yfinance one is YFinanceProvider"""
+
+    def download(self, symbols: List[str], period: str, timeout: float) -> Dict[str, pd.DataFrame]:
+        """History of each symbol found, symbols without data are left out.
+        `timeout` bounds the wait for each symbol, a symbol timing out is left out."""
+        ...
+
+
+class YFinanceProvider:
+    """
+    Bulk download of several symbols in one yf.download call.
+    yf.download requests each symbol on its own with `timeout`, a symbol that
+    fails or times out is returned without data and the others are kept.
+    """
+
+    def download(self, symbols: List[str], period: str, timeout: float) -> Dict[str, pd.DataFrame]:
+        import yfinance as yf
+
+        # Same columns and UTC offset dates as Ticker.history
+        data = yf.download(
+            symbols,
+            period=period,
+            group_by="ticker",
+            actions=True,
+            auto_adjust=True,
+            ignore_tz=False,
+            threads=False,
+            progress=False,
+            timeout=timeout)
+        histories = {}
+        for symbol in symbols:
+            if isinstance(data.columns, pd.MultiIndex):
+                if symbol not in data.columns.get_level_values(0):
+                    continue
+                df = data[symbol]
+            else:
+                # a single symbol has flat columns
+                df = data
+            df = df.dropna(how="all")
+            if not df.empty:
+                histories[symbol] = df
+        return histories
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket, `rate` tokens per second and bursts of up to
+    `capacity`. acquire() blocks until a token is available.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class HistoryFetcher:
+    """
+    Fetch the daily history of many symbols concurrently.
+
+    Symbols are requested `batch_size` at a time, one bulk download per batch,
+    by `threads` worker threads sharing a token bucket of `rate` requests per
+    second. A request that fails is retried with exponential backoff and jitter,
+    symbols it returned no data for are retried in the next attempt.
+    `timeout` is the wait for each symbol, not for the batch: a symbol timing out
+    is returned without data, and only the symbols still pending are retried.
+
+    Every history is passed to `save` from the worker thread, symbols still
+    failing after `retries` attempts are reported with their last error.
+
+    Parameters:
+    :param provider: Source of the history, YFinanceProvider or a stub
+    :type provider: HistoryProvider
+    :param save: Called with (symbol, history) for every symbol fetched
+    :type save: Callable[[str, pd.DataFrame], None]
+    """
+
+    def __init__(
+            self,
+            provider: HistoryProvider,
+            save: Callable[[str, pd.DataFrame], None],
+            threads: int = 4,
+            rate: float = 2.0,
+            burst: int = 4,
+            batch_size: int = 50,
+            retries: int = 3,
+            backoff: float = 1.0,
+            timeout: float = 30.0,
+    ):
+        self.provider = provider
+        self.save = save
+        self.threads = max(1, threads)
+        self.bucket = TokenBucket(rate, max(1, burst))
+        self.batch_size = max(1, batch_size)
+        self.retries = max(1, retries)
+        self.backoff = backoff
+        self.timeout = timeout
+
+    def _fetch_batch(self, symbols: List[str], period: str) -> Dict[str, dict]:
+        """Fetch and save a batch, returns the failures by symbol"""
+        pending = list(symbols)
+        errors: Dict[str, str] = {}
+        attempts = dict.fromkeys(symbols, 0)
+        for attempt in range(self.retries):
+            if attempt:
+                # 1x, 2x, 4x ... backoff, with jitter so threads do not retry in step
+                time.sleep(self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+            self.bucket.acquire()
+            for symbol in pending:
+                attempts[symbol] += 1
+            try:
+                histories = self.provider.download(pending, period=period, timeout=self.timeout)
+            except Exception as e:
+                errors.update((symbol, f"{type(e).__name__}: {e}") for symbol in pending)
+                continue
+
+            missing = []
+            for symbol in pending:
+                df = histories.get(symbol)
+                if df is None or df.empty:
+                    errors[symbol] = "No data returned"
+                    missing.append(symbol)
+                    continue
+                try:
+                    self.save(symbol, df)
+                    errors.pop(symbol, None)
+                except Exception as e:
+                    # not a download error, retrying would not help
+                    errors[symbol] = f"{type(e).__name__}: {e}"
+            pending = missing
+            if not pending:
+                break
+
+        now = datetime.now().isoformat(timespec="seconds")
+        return {
+            symbol: dict(error=error, attempts=attempts[symbol], time=now)
+            for symbol, error in errors.items()
+        }
+
+    def fetch(self, symbols: List[str], period: str = "1d", desc: str = "Fetching") -> dict:
+        """
+        Fetch the history of symbols.
+        Returns the run stats: symbols, fetched, failed, seconds, symbols_per_sec,
+        and the failures by symbol in `failures`.
+        """
+        start_time = time.perf_counter()
+        symbols = list(dict.fromkeys(symbols))
+        batches = [symbols[i:i + self.batch_size] for i in range(0, len(symbols), self.batch_size)]
+        failures: Dict[str, dict] = {}
+
+        with ThreadPoolExecutor(max_workers=self.threads) as executor, \
+                tqdm(total=len(symbols), desc=desc) as progress:
+            futures = {executor.submit(self._fetch_batch, batch, period): batch for batch in batches}
+            for future in as_completed(futures):
+                failures.update(future.result())
+                progress.update(len(futures[future]))
+
+        seconds = time.perf_counter() - start_time
+        stats = dict(
+            symbols=len(symbols),
+            fetched=len(symbols) - len(failures),
+            failed=len(failures),
+            seconds=round(seconds, 3),
+            symbols_per_sec=round(len(symbols) / seconds, 1) if seconds else 0.0,
+        )
+        logger.info(f"{desc}: {stats}")
+        stats["failures"] = failures
+        return stats
+
+
+def history_fetcher(config: dict, save: Callable[[str, pd.DataFrame], None],
+                    provider: Optional[HistoryProvider] = None) -> HistoryFetcher:
+    """HistoryFetcher with the `FETCH_*` settings of config"""
+    return HistoryFetcher(
+        provider=provider or YFinanceProvider(),
+        save=save,
+        threads=int(config.get("FETCH_THREADS", 4)),
+        rate=float(config.get("FETCH_RATE", 2.0)),
+        burst=int(config.get("FETCH_BURST", 4)),
+        batch_size=int(config.get("FETCH_BATCH_SIZE", 50)),
+        retries=int(config.get("FETCH_RETRIES", 3)),
+        backoff=float(config.get("FETCH_BACKOFF", 1.0)),
+        timeout=float(config.get("FETCH_TIMEOUT", 30.0)),
+    )
@@ -0,0 +1,216 @@
+import os
+import json
+import time
+import random
+import logging
+import threading
+from tqdm import tqdm
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, Optional, Protocol
+from src.services.fetching.history_fetcher import TokenBucket
+
+
+logger = logging.getLogger(__name__)
+
+
+class InfoProvider(Protocol):
+    """Source of symbol info, the yfinance one is YFinanceInfoProvider"""
+
+    def info(self, symbol: str) -> dict:
+        """Info of symbol, raise if it can not be fetched"""
+        ...
+
+
+class YFinanceInfoProvider:
+    """Ticker.info of yfinance, one request per symbol, with the timeout of yfinance"""
+
+    def info(self, symbol: str) -> dict:
+        import yfinance as yf
+
+        info = yf.Ticker(symbol).info
+        # unknown symbols return a near empty dict
+        if not info or len(info) <= 1:
+            raise ValueError("No info returned")
+        return info
+
+
+def info_files(folder: Path) -> Dict[str, Path]:
+    """Info file of every symbol in the quote type folders of folder"""
+    files = {}
+    for sub in os.scandir(folder):
+        if not sub.is_dir():
+            continue
+        for entry in os.scandir(sub.path):
+            if entry.name.endswith(".json"):
+                files[entry.name[:-5]] = Path(entry.path)
+    return files
+
+
+class InfoHarvester:
+    """
+    Fetch the info of many symbols, `threads` requests at a time.
+
+    Requests share a token bucket of `rate` requests per second. A failed
+    request is retried `retries` times with exponential backoff and jitter.
+
+    Symbols whose info file in `folder` is more recent than `ttl` seconds are
+    skipped. The symbols done and failed are checkpointed to `checkpoint`
+    every `checkpoint_every` symbols. An interrupted run is resumed from the
+    checkpoint, even for symbols the TTL would not skip. The checkpoint is
+    removed once a run completes.
+
+    Parameters:
+    :param provider: Source of the info, YFinanceInfoProvider or a stub
+    :type provider: InfoProvider
+    :param save: Called with (symbol, info) for every symbol fetched
+    :type save: Callable[[str, dict], None]
+    :param folder: Folder of the info files, one sub-folder per quote type
+    :type folder: Path
+    :param checkpoint: JSON file of the run state
+    :type checkpoint: Path
+    """
+
+    def __init__(
+            self,
+            provider: InfoProvider,
+            save: Callable[[str, dict], None],
+            folder: Path,
+            checkpoint: Path,
+            threads: int = 8,
+            rate: float = 5.0,
+            burst: int = 8,
+            retries: int = 3,
+            backoff: float = 1.0,
+            ttl: float = 7 * 86400,
+            checkpoint_every: int = 100,
+    ):
+        self.provider = provider
+        self.save = save
+        self.folder = Path(folder)
+        self.checkpoint = Path(checkpoint)
+        self.threads = max(1, threads)
+        self.bucket = TokenBucket(rate, max(1, burst))
+        self.retries = max(1, retries)
+        self.backoff = backoff
+        self.ttl = ttl
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.lock = threading.Lock()
+        self.state = dict(started=None, done=[], failed={})
+
+    def _load_checkpoint(self) -> dict:
+        if self.checkpoint.exists() and self.checkpoint.stat().st_size:
+            try:
+                return json.loads(self.checkpoint.read_bytes())
+            except ValueError:
+                logger.warning(f"Ignoring unreadable checkpoint {self.checkpoint}")
+        return dict(started=datetime.now().isoformat(timespec="seconds"), done=[], failed={})
+
+    def _save_checkpoint(self):
+        with self.lock:
+            tmp = self.checkpoint.with_name(f"{self.checkpoint.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(self.state))
+            os.replace(tmp, self.checkpoint)
+
+    def pending(self, symbols: Iterable[str]) -> List[str]:
+        """Symbols neither done in the checkpointed run nor fresher than the TTL"""
+        done = set(self.state["done"])
+        now = time.time()
+        files = info_files(self.folder) if self.ttl > 0 else {}
+        return [
+            symbol for symbol in dict.fromkeys(symbols)
+            if symbol not in done
+            and not (symbol in files and now - files[symbol].stat().st_mtime < self.ttl)
+        ]
+
+    def _harvest(self, symbol: str) -> Optional[str]:
+        """Fetch and save the info of symbol, returns the last error if it failed"""
+        error = None
+        for attempt in range(self.retries):
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+            self.bucket.acquire()
+            try:
+                info = self.provider.info(symbol)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                continue
+            try:
+                self.save(symbol, info)
+                return None
+            except Exception as e:
+                # not a download error, retrying would not help
+                return f"{type(e).__name__}: {e}"
+        return error
+
+    def harvest(self, symbols: Iterable[str], desc: str = "Fetching symbol info") -> dict:
+        """
+        Fetch the info of the symbols not skipped.
+        Returns the run stats: symbols, skipped, fetched, failed, seconds,
+        symbols_per_sec, and the failures by symbol in `failures`.
+        """
+        start_time = time.perf_counter()
+        symbols = list(dict.fromkeys(symbols))
+        self.state = self._load_checkpoint()
+        pending = self.pending(symbols)
+        failures: Dict[str, str] = {}
+        unsaved = 0
+
+        with ThreadPoolExecutor(max_workers=self.threads) as executor, \
+                tqdm(total=len(pending), desc=desc) as progress:
+            futures = {executor.submit(self._harvest, symbol): symbol for symbol in pending}
+            try:
+                for future in as_completed(futures):
+                    symbol = futures[future]
+                    error = future.result()
+                    with self.lock:
+                        if error is None:
+                            self.state["done"].append(symbol)
+                            self.state["failed"].pop(symbol, None)
+                        else:
+                            failures[symbol] = error
+                            self.state["failed"][symbol] = error
+                    progress.update(1)
+                    unsaved += 1
+                    if unsaved >= self.checkpoint_every:
+                        self._save_checkpoint()
+                        unsaved = 0
+            except BaseException:
+                # keep what is done for the next run
+                for future in futures:
+                    future.cancel()
+                self._save_checkpoint()
+                raise
+
+        # run complete, the next one starts over
+        self.checkpoint.unlink(missing_ok=True)
+        seconds = time.perf_counter() - start_time
+        stats = dict(
+            symbols=len(symbols),
+            skipped=len(symbols) - len(pending),
+            fetched=len(pending) - len(failures),
+            failed=len(failures),
+            seconds=round(seconds, 3),
+            symbols_per_sec=round(len(pending) / seconds, 1) if seconds else 0.0,
+        )
+        logger.info(f"{desc}: {stats}")
+        stats["failures"] = failures
+        return stats
+
+
+def info_harvester(config: dict, save: Callable[[str, dict], None], folder: Path, checkpoint: Path,
+                   provider: Optional[InfoProvider] = None) -> InfoHarvester:
+    """InfoHarvester with the `INFO_*` settings of config"""
+    return InfoHarvester(
+        provider=provider or YFinanceInfoProvider(),
+        save=save,
+        folder=folder,
+        checkpoint=checkpoint,
+        threads=int(config.get("INFO_THREADS", 8)),
+        rate=float(config.get("INFO_RATE", 5.0)),
+        burst=int(config.get("INFO_BURST", 8)),
+        retries=int(config.get("INFO_RETRIES", 3)),
+        backoff=float(config.get("INFO_BACKOFF", 1.0)),
+        ttl=float(config.get("INFO_TTL_DAYS", 7)) * 86400,
+    )
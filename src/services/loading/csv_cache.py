@@ -0,0 +1,86 @@
+import os
+import logging
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class CsvCache:
+    """
+    Binary columnar copy of daily OHLCV CSV files.
+
+    Each CSV is converted once to an uncompressed .npz holding its dates as int64
+    UTC epoch nanoseconds and one array per column. The source mtime and size are
+    stored alongside, a cache file is rebuilt as soon as the CSV changes.
+
+    get() returns the whole history with a UTC DatetimeIndex named Date, the same
+    frame load_symbol_history builds from the CSV text.
+
+    Parameters:
+    :param folder: Folder of the cache files
+    :type folder: Path
+    """
+
+    def __init__(self, folder: Path):
+        self.folder = Path(folder).expanduser()
+        self.folder.mkdir(parents=True, exist_ok=True)
+
+    def path(self, file: Path) -> Path:
+        return self.folder / f"{file.stem}.npz"
+
+    @staticmethod
+    def read_csv(file: Path) -> pd.DataFrame:
+        df = pd.read_csv(file, index_col="Date", dtype={"Date": object})
+        df.index = pd.to_datetime(df.index, utc=True)
+        df.index.name = "Date"
+        return df
+
+    def _read(self, path: Path, stat: os.stat_result) -> Optional[pd.DataFrame]:
+        try:
+            with np.load(path, allow_pickle=False) as npz:
+                if tuple(npz["source"]) != (stat.st_mtime_ns, stat.st_size):
+                    return None
+                columns = [str(c) for c in npz["columns"]]
+                index = pd.DatetimeIndex(npz["date"].view("M8[ns]"), name="Date").tz_localize("UTC")
+                return pd.DataFrame({col: npz[f"col_{i}"] for i, col in enumerate(columns)}, index=index)
+        except (OSError, KeyError, ValueError):
+            # missing, partially written or foreign file, rebuild it
+            return None
+
+    def _write(self, path: Path, df: pd.DataFrame, stat: os.stat_result):
+        arrays = {f"col_{i}": df[col].to_numpy() for i, col in enumerate(df.columns)}
+        # Write to a temporary file and rename, concurrent readers never see a partial file
+        tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp")
+        with tmp.open("wb") as f:
+            np.savez(
+                f,
+                source=np.array([stat.st_mtime_ns, stat.st_size], dtype=np.int64),
+                columns=np.array(df.columns, dtype=str),
+                date=df.index.asi8,
+                **arrays)
+        os.replace(tmp, path)
+
+    def get(self, file: Path) -> Optional[pd.DataFrame]:
+        """Whole history of a CSV file, from the cache while the CSV is unchanged"""
+        try:
+            stat = file.stat()
+        except FileNotFoundError:
+            return None
+        if not stat.st_size:
+            return None
+
+        path = self.path(file)
+        df = self._read(path, stat)
+        if df is not None:
+            return df
+
+        df = self.read_csv(file)
+        try:
+            self._write(path, df, stat)
+        except OSError as e:
+            logger.warning(f"Could not write cache {path}: {e}")
+        return df
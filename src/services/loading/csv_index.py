@@ -0,0 +1,170 @@
+import io
+import os
+import mmap
+import logging
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import NamedTuple, Optional, Tuple
+from datetime import datetime
+from src.services.loading.csv_tail import END_OF_DAY, line_starts, parse_dates, read_tail
+
+
+logger = logging.getLogger(__name__)
+
+
+class RowIndex(NamedTuple):
+    # Byte offset of every row and of the end of the last row
+    starts: np.ndarray
+    end: int
+    # UTC epoch nanoseconds of every row
+    dates: np.ndarray
+    # Bytes of the last row, to detect changes other than appended rows
+    tail: bytes
+    # Source file stat the index was built from
+    mtime_ns: int
+    size: int
+
+
+class CsvIndex:
+    """
+    Sidecar index of the rows of daily OHLCV CSV files.
+
+    For every file, an .idx file in `folder` holds the byte offset and the date of
+    each row. Reading `period` rows up to any end_date is a searchsorted on the
+    dates and a single read of the row range, however far back the date is.
+
+    The index is refreshed on read when the file changed. If the file only grew,
+    and its last indexed row is unchanged, only the rows from that row on are
+    indexed again. Any other change rebuilds the whole index.
+
+    Parameters:
+    :param folder: Folder of the index files
+    :type folder: Path
+    """
+
+    def __init__(self, folder: Path):
+        self.folder = Path(folder).expanduser()
+        self.folder.mkdir(parents=True, exist_ok=True)
+
+    def path(self, file: Path) -> Path:
+        return self.folder / f"{file.stem}.idx"
+
+    def _load(self, path: Path) -> Optional[RowIndex]:
+        # int64 words: end, mtime_ns, size, rows, tail length, starts, dates, tail bytes
+        try:
+            words = np.fromfile(path, dtype=np.int64)
+            end, mtime_ns, size, rows, tail_len = (int(v) for v in words[:5])
+            starts = words[5:5 + rows]
+            dates = words[5 + rows:5 + 2 * rows]
+            tail = words[5 + 2 * rows:].tobytes()[:tail_len]
+            if len(dates) != rows or len(tail) != tail_len:
+                return None
+            return RowIndex(starts, end, dates, tail, mtime_ns, size)
+        except (OSError, ValueError):
+            # missing, partially written or foreign file, rebuild it
+            return None
+
+    def _save(self, path: Path, index: RowIndex):
+        rows = len(index.starts)
+        tail = index.tail + b"\0" * (-len(index.tail) % 8)
+        words = np.concatenate((
+            np.array([index.end, index.mtime_ns, index.size, rows, len(index.tail)], dtype=np.int64),
+            index.starts,
+            index.dates,
+            np.frombuffer(tail, dtype=np.int64)))
+        # Write to a temporary file and rename, concurrent readers never see a partial file
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        words.tofile(tmp)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _index_rows(mm: mmap.mmap, start: int, stop: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Offsets and dates of the rows in [start, stop), start being a row start"""
+        if stop <= start:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        data = mm[start:stop]
+        starts = line_starts(np.frombuffer(data, dtype=np.uint8))
+        dates = parse_dates(data, starts)
+        if dates is None:
+            # layout parse_dates does not handle, let pandas parse the dates
+            dates = pd.to_datetime(
+                pd.read_csv(io.BytesIO(data), header=None, usecols=[0], dtype=object)[0],
+                utc=True, format="ISO8601").to_numpy().view(np.int64)
+        return starts.astype(np.int64) + start, dates
+
+    def update(self, file: Path) -> RowIndex:
+        """Index of file, refreshed and saved if the file changed"""
+        stat = file.stat()
+        path = self.path(file)
+        index = self._load(path)
+        if index is not None and (index.mtime_ns, index.size) == (stat.st_mtime_ns, stat.st_size):
+            return index
+
+        with open(file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            header_end = mm.find(b"\n") + 1 or len(mm)
+            stop = len(mm)
+            # ignore trailing blank lines
+            while stop > header_end and mm[stop - 1] in b"\r\n":
+                stop -= 1
+
+            starts = np.empty(0, dtype=np.int64)
+            dates = np.empty(0, dtype=np.int64)
+            resume = header_end
+            if index is not None and len(index.starts) and stat.st_size >= index.size:
+                last = int(index.starts[-1])
+                # Rows appended since, the last indexed row is indexed again
+                # as it may have had no line end yet
+                if mm[last:last + len(index.tail)] == index.tail:
+                    starts, dates, resume = index.starts[:-1], index.dates[:-1], last
+
+            new_starts, new_dates = self._index_rows(mm, resume, stop)
+
+            starts = np.concatenate((starts, new_starts))
+            tail = mm[int(starts[-1]):stop] if len(starts) else b""
+
+        index = RowIndex(
+            starts=starts,
+            end=stop,
+            dates=np.concatenate((dates, new_dates)),
+            tail=tail,
+            mtime_ns=stat.st_mtime_ns,
+            size=stat.st_size)
+        try:
+            self._save(path, index)
+        except OSError as e:
+            logger.warning(f"Could not write index {path}: {e}")
+        return index
+
+    def read(self, file: Path, period: int = 160, end_date: Optional[datetime] = None) -> pd.DataFrame:
+        """
+        Last `period` rows of file up to end_date, or the end of the file,
+        same result as read_tail. Raise IndexError if end_date is before the first row.
+        """
+        try:
+            index = self.update(file)
+        except ValueError:
+            # a row being written or an unknown date layout, the tail reader only
+            # parses the rows it returns
+            return read_tail(file, period=period, end_date=end_date)
+        stop = len(index.dates)
+        if end_date is not None:
+            end_ns = pd.Timestamp(end_date.replace(tzinfo=END_OF_DAY)).value
+            stop = int(np.searchsorted(index.dates, end_ns, side="right"))
+            if not stop:
+                raise IndexError("Date out of bounds of current DataFrame")
+        start = max(0, stop - period)
+
+        first = int(index.starts[start]) if start < len(index.starts) else index.end
+        last = int(index.starts[stop]) if stop < len(index.starts) else index.end
+        with open(file, "rb") as f:
+            header = f.readline()
+            f.seek(first)
+            data = f.read(last - first)
+
+        df = pd.read_csv(io.BytesIO(header + data), usecols=lambda col: col != "Date")
+        if len(df) != stop - start:
+            # file changed while reading
+            return read_tail(file, period=period, end_date=end_date)
+        df.index = pd.DatetimeIndex(index.dates[start:stop].view("M8[ns]"), name="Date").tz_localize("UTC")
+        return df
@@ -0,0 +1,150 @@
+"""
+Memory-mapped tail reader for daily OHLCV CSV files.
+
+Rows of a symbol's CSV are in date order, one per line. The file is mapped
+read-only and only the byte range of the requested rows is copied and parsed:
+the rows up to end_date are located with a binary search on line starts, the
+last `period` of them by counting newlines backwards with NumPy.
+Cost depends on the number of rows returned, not on the size of the file.
+
+Dates are decoded straight from the bytes, pd.to_datetime is slow on the mixed
+UTC offsets (-05:00, -04:00) written by yfinance.
+"""
+import io
+import os
+import mmap
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Optional
+from datetime import datetime, timezone, timedelta
+
+# Same end of day as the chunked reader it replaces, midnight at UTC-4
+END_OF_DAY = timezone(timedelta(days=-1, seconds=72000))
+# Initial guess of the bytes per row, grown until enough rows are found
+ROW_BYTES = 80
+
+
+def find_date_end(mm: mmap.mmap, lo: int, hi: int, key: bytes) -> int:
+    """Start of the first line in [lo, hi) whose date prefix sorts after key,
+    hi if there is none. lo must be a line start."""
+    width = len(key)
+    first = lo
+    while lo < hi:
+        mid = (lo + hi) // 2
+        start = mm.rfind(b"\n", first, mid) + 1 or first
+        if mm[start:start + width] > key:
+            hi = start
+        else:
+            end = mm.find(b"\n", start, hi)
+            lo = hi if end == -1 else end + 1
+    return lo
+
+
+def find_rows_start(mm: mmap.mmap, lo: int, stop: int, rows: int) -> int:
+    """Start of the `rows`-th line before stop, lo if there are fewer lines.
+    stop must be a line start or the end of data."""
+    guess = rows * ROW_BYTES
+    while True:
+        start = max(lo, stop - guess)
+        view = np.frombuffer(mm, dtype=np.uint8, count=stop - 1 - start, offset=start)
+        newlines = np.flatnonzero(view == 10)
+        del view
+        if len(newlines) >= rows:
+            return start + int(newlines[-rows]) + 1
+        if start == lo:
+            return lo
+        guess *= 4
+
+
+def line_starts(buf: np.ndarray) -> np.ndarray:
+    """Offsets of the lines in buf, skipping empty lines as pd.read_csv does"""
+    starts = np.concatenate(([0], np.flatnonzero(buf[:-1] == 10) + 1))
+    return starts[(buf[starts] != 10) & (buf[starts] != 13)]
+
+
+def parse_dates(data: bytes, starts: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+    """
+    UTC epoch nanoseconds of the leading date field of every line in data,
+    or of the lines at `starts` if given.
+    Dates are YYYY-MM-DD, optionally followed by HH:MM:SS and a +HH:MM offset.
+    None if the lines do not all share one of these layouts.
+    """
+    buf = np.frombuffer(data, dtype=np.uint8)
+    if starts is None:
+        starts = line_starts(buf)
+    width = data.find(b",")
+    if width not in (10, 19, 25) or len(buf) < starts[-1] + width + 1:
+        return None
+    field = buf[starts[:, None] + np.arange(width + 1)]
+    if (field[:, width] != ord(",")).any() or (field[:, [4, 7]] != ord("-")).any():
+        return None
+    digits = field.astype(np.int64) - ord("0")
+
+    def number(*pos):
+        value = np.zeros(len(digits), dtype=np.int64)
+        for i in pos:
+            value = value * 10 + digits[:, i]
+        return value
+
+    month = (number(0, 1, 2, 3) - 1970).astype("M8[Y]").astype("M8[M]") + (number(5, 6) - 1).astype("m8[M]")
+    ns = (month.astype("M8[D]") + (number(8, 9) - 1).astype("m8[D]")).astype("M8[ns]").astype(np.int64)
+    if width >= 19:
+        if (field[:, [13, 16]] != ord(":")).any():
+            return None
+        ns += ((number(11, 12) * 60 + number(14, 15)) * 60 + number(17, 18)) * 1_000_000_000
+    if width == 25:
+        sign = np.where(field[:, 19] == ord("-"), -1, 1)
+        if (~np.isin(field[:, 19], (ord("-"), ord("+")))).any():
+            return None
+        ns -= sign * (number(20, 21) * 60 + number(23, 24)) * 60_000_000_000
+    return ns
+
+
+def read_tail(path: Path, period: int = 160, end_date: Optional[datetime] = None) -> Optional[pd.DataFrame]:
+    """
+    Last `period` rows of a CSV file up to end_date, or the end of the file.
+    None if the file is empty.
+    Raise IndexError if end_date is before the first row.
+    An end_date after the last row reads up to the end of the file and returns
+    a full `period` of rows, where the chunked reader returned fewer.
+    """
+    if end_date is not None:
+        end_date = end_date.replace(tzinfo=END_OF_DAY)
+
+    with open(path, "rb") as f:
+        # an empty file can not be mapped
+        if not os.fstat(f.fileno()).st_size:
+            return None
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    with mm:
+        size = len(mm)
+        header_end = mm.find(b"\n") + 1 or size
+        stop = size
+        # ignore trailing blank lines
+        while stop > header_end and mm[stop - 1] in b"\r\n":
+            stop -= 1
+        if end_date is not None:
+            # rows of end_date are kept, the exact cut is made below on parsed dates
+            stop = find_date_end(mm, header_end, stop, end_date.date().isoformat().encode())
+            if stop == header_end:
+                raise IndexError("Date out of bounds of current DataFrame")
+        # one spare row for rows of end_date beyond the exact cut
+        start = find_rows_start(mm, header_end, stop, period + 1) if stop > header_end else stop
+        header = mm[:header_end]
+        data = mm[start:stop]
+
+    dates = parse_dates(data) if data else None
+    if dates is None:
+        df = pd.read_csv(io.BytesIO(header + data), dtype={"Date": object})
+        df["Date"] = pd.to_datetime(df["Date"], utc=True, format="ISO8601")
+        df.set_index("Date", inplace=True)
+    else:
+        df = pd.read_csv(io.BytesIO(header + data), usecols=lambda col: col != "Date")
+        df.index = pd.DatetimeIndex(dates.view("M8[ns]"), name="Date").tz_localize("UTC")
+    if end_date is None:
+        return df.iloc[-period:]
+    df = df.loc[:end_date]
+    if df.empty:
+        raise IndexError("Date out of bounds of current DataFrame")
+    return df.iloc[-period:]
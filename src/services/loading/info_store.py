@@ -0,0 +1,145 @@
+import os
+import json
+import time
+import logging
+import threading
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+class InfoStore:
+    """
+    Info of all symbols in a single columnar file, instead of one JSON per symbol.
+
+    The file is an uncompressed .npz with one array per selected field, indexed by
+    symbol, plus the raw info JSON of each symbol as one utf-8 buffer and its
+    offsets. Reading the fields does not read nor decode the raw JSON.
+
+    Infos are upserted by symbol. add() buffers them from any thread, flush()
+    writes them, and add() too every `flush_every` infos if it is set.
+    The stored rows are kept in memory between writes, a write does not read
+    the file again unless another process changed it.
+
+    Parameters:
+    :param path: File of the store
+    :type path: Path
+    """
+
+    text_fields = ("quoteType", "shortName", "longName", "exchange", "sector", "industry", "country", "currency")
+    number_fields = ("marketCap",)
+
+    def __init__(self, path: Path, flush_every: Optional[int] = None):
+        self.path = Path(path)
+        self.flush_every = flush_every
+        self.lock = threading.Lock()
+        self.pending: Dict[str, dict] = {}
+        # stored rows with their raw JSON, and the stat of the file they match
+        self._table: Optional[pd.DataFrame] = None
+        self._table_stat: Optional[Tuple[int, int]] = None
+
+    def exists(self) -> bool:
+        return self.path.exists() and self.path.stat().st_size > 0
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _current(self) -> pd.DataFrame:
+        """Stored rows with their raw JSON, read only if the file changed since last read or written"""
+        stat = self._stat()
+        if self._table is None or stat != self._table_stat:
+            self._table = self.load(raw=True)
+            self._table_stat = stat
+        return self._table
+
+    def load(self, raw: bool = False) -> pd.DataFrame:
+        """Fields of every symbol, with the raw info JSON in column `raw` if asked"""
+        columns = [*self.text_fields, *self.number_fields, "updated"]
+        if not self.exists():
+            df = pd.DataFrame(columns=columns + (["raw"] if raw else []))
+            df.index.name = "symbol"
+            return df
+        with np.load(self.path, allow_pickle=False) as npz:
+            df = pd.DataFrame({col: npz[col] for col in columns}, index=pd.Index(npz["symbol"], name="symbol"))
+            if raw:
+                offsets = npz["raw_offsets"]
+                data = npz["raw"].tobytes()
+                df["raw"] = [data[a:b].decode() for a, b in zip(offsets[:-1], offsets[1:])]
+        return df
+
+    def _write(self, df: pd.DataFrame):
+        blobs = [s.encode() for s in df["raw"]]
+        offsets = np.concatenate(([0], np.cumsum([len(b) for b in blobs], dtype=np.int64)))
+        arrays = {col: df[col].to_numpy(dtype=str) for col in self.text_fields}
+        arrays.update({col: df[col].to_numpy(dtype=np.float64) for col in [*self.number_fields, "updated"]})
+        # Write to a temporary file and rename, concurrent readers never see a partial file
+        tmp = self.path.with_name(f"{self.path.stem}.{os.getpid()}.tmp")
+        with tmp.open("wb") as f:
+            np.savez(
+                f,
+                symbol=df.index.to_numpy(dtype=str),
+                raw=np.frombuffer(b"".join(blobs), dtype=np.uint8),
+                raw_offsets=offsets,
+                **arrays)
+        os.replace(tmp, self.path)
+        self._table = df
+        self._table_stat = self._stat()
+
+    def rows(self, infos: Dict[str, dict]) -> pd.DataFrame:
+        """Store rows of infos, by symbol"""
+        now = time.time()
+        df = pd.DataFrame.from_records([
+            {
+                **{col: "" if info.get(col) is None else str(info[col]) for col in self.text_fields},
+                **{col: info[col] if isinstance(info.get(col), (int, float)) else np.nan for col in self.number_fields},
+                "updated": now,
+                "raw": json.dumps(info, default=str),
+            }
+            for info in infos.values()
+        ], index=pd.Index(list(infos), name="symbol"))
+        return df
+
+    def upsert(self, infos: Dict[str, dict]):
+        """Insert or replace the info of symbols"""
+        if not infos:
+            return
+        new = self.rows(infos)
+        current = self._current()
+        df = pd.concat([current[~current.index.isin(new.index)], new]).sort_index()
+        self._write(df)
+
+    def add(self, symbol: str, info: dict):
+        """Buffer the info of symbol, written by flush() or every `flush_every` infos"""
+        with self.lock:
+            self.pending[symbol] = info
+            if self.flush_every is None or len(self.pending) < self.flush_every:
+                return
+        self.flush()
+
+    def flush(self):
+        """Write the buffered infos"""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.upsert(pending)
+
+    def rebuild(self, folder: Path):
+        """Build the store from the per-symbol info files of folder, one sub-folder per quote type"""
+        infos = {}
+        for file in Path(folder).glob("*/*.json"):
+            try:
+                infos[file.stem] = json.loads(file.read_bytes())
+            except ValueError as e:
+                logger.warning(f"Skipping {file}: {e}")
+        with self.lock:
+            if self.path.exists():
+                self.path.unlink()
+            self.upsert(infos)
+        logger.info(f"Info store {self.path}: {len(infos)} symbols")
@@ -0,0 +1,231 @@
+import os
+import json
+import time
+import zlib
+import logging
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+PRICE_COLUMNS = ["Open", "High", "Low", "Close"]
+COLUMNS = ["Date", *PRICE_COLUMNS, "Volume"]
+
+
+def fingerprint(file: Path, tail: int = 4096) -> dict:
+    """Size, mtime and CRC32 of the last `tail` bytes of file"""
+    with open(file, "rb") as f:
+        stat = os.fstat(f.fileno())
+        f.seek(max(0, stat.st_size - tail))
+        return dict(size=stat.st_size, mtime_ns=stat.st_mtime_ns, tail=f"{zlib.crc32(f.read()):08x}")
+
+
+def _issue(issues: List[dict], check: str, mask: np.ndarray, dates: np.ndarray, detail: str = ""):
+    """Add the issue `check` if any row of mask is set, with the first row's date"""
+    count = int(np.count_nonzero(mask))
+    if count:
+        first = dates[np.argmax(mask)]
+        issues.append(dict(check=check, count=count, first=None if pd.isna(first) else str(first)[:10],
+                           detail=detail))
+
+
+def check_file(file: Path, gap_days: int = 5) -> dict:
+    """
+    Check a daily CSV file, returns its fingerprint, rows, last date and issues.
+
+    Every check runs on whole columns: unreadable file, empty file, missing
+    columns, non-numeric columns, unparsable dates, dates out of order,
+    duplicate dates, gaps of more than `gap_days` business days, NaN values,
+    and OHLC bars where high or low do not bound open and close, or negative values.
+    """
+    file = Path(file)
+    result = dict(file=file.name, **fingerprint(file), rows=0, last_date=None, issues=[])
+    issues = result["issues"]
+    try:
+        df = pd.read_csv(file, dtype={"Date": str})
+    except Exception as e:
+        issues.append(dict(check="read", count=1, first=None, detail=f"{type(e).__name__}: {e}"))
+        return result
+    result["rows"] = len(df)
+    if df.empty:
+        issues.append(dict(check="empty", count=1, first=None, detail="No rows"))
+        return result
+    missing = [col for col in COLUMNS if col not in df.columns]
+    if missing:
+        issues.append(dict(check="columns", count=len(missing), first=None, detail=f"Missing {missing}"))
+        return result
+
+    # calendar date of each bar, the UTC offset is left out
+    dates = pd.to_datetime(df["Date"].str[:10], format="%Y-%m-%d", errors="coerce").to_numpy("datetime64[D]")
+    valid = ~np.isnat(dates)
+    _issue(issues, "dates", ~valid, df["Date"].to_numpy(), "Unparsable date")
+    if valid.any():
+        result["last_date"] = str(dates[valid].max())
+
+    values = {}
+    for col in [*PRICE_COLUMNS, "Volume"]:
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            issues.append(dict(check="dtype", count=1, first=None, detail=f"{col} is {df[col].dtype}"))
+        values[col] = pd.to_numeric(df[col], errors="coerce").to_numpy(np.float64)
+
+    d = dates[valid]
+    if len(d) > 1:
+        step = np.diff(d).astype(np.int64)
+        _issue(issues, "order", np.concatenate(([False], step < 0)), d, "Date before the previous one")
+        _issue(issues, "duplicates", np.concatenate(([False], step == 0)), d, "Same date as the previous one")
+        ordered = np.unique(d)
+        missed = np.busday_count(ordered[:-1], ordered[1:]) - 1
+        _issue(issues, "gaps", np.concatenate(([False], missed > gap_days)), ordered,
+               f"More than {gap_days} business days missing")
+
+    for col, v in values.items():
+        _issue(issues, "nans", np.isnan(v), dates, f"{col} has NaN values")
+
+    o, h, l, c = (values[col] for col in PRICE_COLUMNS)
+    with np.errstate(invalid="ignore"):
+        # NaN compares False, rows with NaN are only reported as nans
+        _issue(issues, "ohlc", (h < np.fmax(o, c)) | (l > np.fmin(o, c)) | (h < l), dates,
+               "High or Low do not bound Open and Close")
+        _issue(issues, "negative", (np.fmin(np.fmin(o, h), np.fmin(l, c)) < 0) | (values["Volume"] < 0), dates,
+               "Negative price or volume")
+    return result
+
+
+def _check_batch(files: List[str], gap_days: int) -> List[dict]:
+    return [check_file(Path(file), gap_days) for file in files]
+
+
+class IntegrityChecker:
+    """
+    Check the daily CSV files of a folder in a process pool, see check_file.
+
+    The fingerprint and result of every file are kept in `state`. Files whose
+    size, mtime and tail CRC32 did not change since are not read again, their
+    previous result is reported. run() writes the issues of every file to
+    `report` as JSON.
+
+    Parameters:
+    :param folder: Folder of the daily CSV files
+    :type folder: Path
+    :param state: JSON file of the fingerprints and results of the last run
+    :type state: Path
+    :param report: JSON file of the issues found
+    :type report: Path
+    :param workers: Worker processes, 1 checks in this process
+    :type workers: Optional[int]
+    :param gap_days: Business days missing between two bars reported as a gap
+    :type gap_days: int
+    """
+
+    def __init__(self, folder: Path, state: Path, report: Path, workers: Optional[int] = None, gap_days: int = 5):
+        self.folder = Path(folder)
+        self.state = Path(state)
+        self.report = Path(report)
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.gap_days = gap_days
+
+    def _load_state(self) -> Dict[str, dict]:
+        if self.state.exists() and self.state.stat().st_size:
+            try:
+                state = json.loads(self.state.read_bytes())
+                # results of another gap setting are checked again
+                if state.get("gap_days") == self.gap_days:
+                    return state["files"]
+            except (ValueError, KeyError):
+                logger.warning(f"Ignoring unreadable integrity state {self.state}")
+        return {}
+
+    def _write_json(self, path: Path, data: dict):
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(data, indent=1))
+        os.replace(tmp, path)
+
+    def changed(self, files: List[Path], previous: Dict[str, dict]) -> List[Path]:
+        """Files new or changed since their previous result"""
+        changed = []
+        for file in files:
+            entry = previous.get(file.name)
+            if entry is None:
+                changed.append(file)
+                continue
+            try:
+                stat = file.stat()
+                if (stat.st_size, stat.st_mtime_ns) != (entry["size"], entry["mtime_ns"]) \
+                        or fingerprint(file)["tail"] != entry["tail"]:
+                    changed.append(file)
+            except OSError:
+                changed.append(file)
+        return changed
+
+    def _check(self, files: List[Path]) -> List[dict]:
+        if self.workers == 1 or len(files) < 2:
+            return _check_batch([str(file) for file in tqdm(files, desc="Checking")], self.gap_days)
+        results = []
+        # about 4 batches per worker, at most 64 files
+        size = max(1, min(64, len(files) // (4 * self.workers)))
+        batches = [[str(file) for file in files[i:i + size]] for i in range(0, len(files), size)]
+        with ProcessPoolExecutor(max_workers=self.workers) as executor, \
+                tqdm(total=len(files), desc="Checking") as progress:
+            futures = [executor.submit(_check_batch, batch, self.gap_days) for batch in batches]
+            for future in as_completed(futures):
+                batch = future.result()
+                results.extend(batch)
+                progress.update(len(batch))
+        return results
+
+    def run(self, force: bool = False) -> dict:
+        """
+        Check the files changed since the last run, every file if force.
+        Returns the run stats: files, checked, skipped, with_issues, seconds,
+        files_per_sec, and the issues by file in `issues`.
+        """
+        start_time = time.perf_counter()
+        files = sorted(self.folder.glob("*.csv"))
+        previous = {} if force else self._load_state()
+        changed = self.changed(files, previous)
+        results = {result["file"]: result for result in self._check(changed)}
+
+        # results of the unchanged files are kept, deleted files are dropped
+        entries = {file.name: results.get(file.name) or previous[file.name] for file in files}
+        self._write_json(self.state, dict(gap_days=self.gap_days, files=entries))
+
+        issues = {name: entry["issues"] for name, entry in entries.items() if entry["issues"]}
+        seconds = time.perf_counter() - start_time
+        stats = dict(
+            files=len(files),
+            checked=len(changed),
+            skipped=len(files) - len(changed),
+            with_issues=len(issues),
+            seconds=round(seconds, 3),
+            files_per_sec=round(len(files) / seconds, 1) if seconds else 0.0,
+        )
+        counts: Dict[str, int] = {}
+        for file_issues in issues.values():
+            for issue in file_issues:
+                counts[issue["check"]] = counts.get(issue["check"], 0) + 1
+        self._write_json(self.report, dict(
+            generated=datetime.now().isoformat(timespec="seconds"),
+            folder=str(self.folder),
+            stats=stats,
+            files_by_check=counts,
+            issues=issues))
+        logger.info(f"Integrity of {self.folder}: {stats}")
+        stats["issues"] = issues
+        return stats
+
+
+def integrity_checker(config: dict, folder: Path, state: Path, report: Path) -> IntegrityChecker:
+    """IntegrityChecker with the `INTEGRITY_*` settings of config"""
+    return IntegrityChecker(
+        folder=folder,
+        state=state,
+        report=report,
+        workers=int(config.get("INTEGRITY_WORKERS", 0)) or None,
+        gap_days=int(config.get("INTEGRITY_GAP_DAYS", 5)),
+    )
@@ -1,5 +1,5 @@
 import pandas as pd
-from typing import Optional
+from typing import Dict, Iterable, Iterator, Optional, Tuple
 from datetime import datetime
 from abc import ABC, abstractmethod
 
@@ -40,3 +40,19 @@ class AbstractLoader(ABC):
     def close(self):
         """Close pending database connections, network sessions or other cleanup operations"""
         pass
+
+    def iter_many(self, symbols: Iterable[str]) -> Iterator[Tuple[str, Optional[pd.DataFrame]]]:
+        """Yields (symbol, OHLC data) for each symbol, in the order given.
+        Override to overlap loading of the next symbols with the consumer.
+        :param symbols: Instrument symbols
+        :type symbols: Iterable[str]
+        """
+        for symbol in symbols:
+            yield symbol, self.get(symbol)
+
+    def get_many(self, symbols: Iterable[str]) -> Dict[str, Optional[pd.DataFrame]]:
+        """Returns OHLC data for several symbols as a dict keyed by symbol
+        :param symbols: Instrument symbols
+        :type symbols: Iterable[str]
+        """
+        return dict(self.iter_many(symbols))
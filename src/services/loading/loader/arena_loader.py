@@ -0,0 +1,127 @@
+import logging
+import numpy as np
+import pandas as pd
+from datetime import tzinfo
+from multiprocessing import util
+from typing import Dict, Iterable, Optional, Tuple
+from multiprocessing.shared_memory import SharedMemory
+from src.services.loading.loader.abstract_loader import AbstractLoader
+
+
+logger = logging.getLogger(__name__)
+
+
+def _detach(shm: SharedMemory):
+    """Close the attachment of a worker, when its arena is collected or the worker exits"""
+    try:
+        shm.close()
+    except BufferError:
+        # frames still viewing the block, the process exit releases it
+        pass
+
+
+class ArenaLoader(AbstractLoader):
+    """
+    OHLCV of many symbols loaded once into a multiprocessing shared memory block.
+
+    The block holds one contiguous int64 array of dates followed by one array per
+    OHLCV column, every symbol being a [start, stop) row range of these arrays.
+    Pickling only sends the block name and the offsets, so a copy passed to a
+    worker process attaches to the block and get() returns zero-copy, read-only
+    views instead of reading the file again.
+
+    The process that created the arena owns the block and must call close(),
+    which releases it once all workers are done. A worker's attachment is
+    closed by a finalizer, when its copy is collected or the worker exits.
+
+    Parameters:
+    :param loader: Loader used once to read each symbol
+    :type loader: AbstractLoader
+    :param symbols: Symbols to load
+    :type symbols: Iterable[str]
+    """
+
+    columns = ("Open", "High", "Low", "Close", "Volume")
+
+    def __init__(self, loader: AbstractLoader, symbols: Iterable[str]):
+        self.closed = False
+        self.timeframes = loader.timeframes
+        self.timeframe = loader.timeframe
+
+        frames: Dict[str, pd.DataFrame] = {}
+        for symbol, df in loader.iter_many(symbols):
+            if df is None or df.empty:
+                continue
+            frames[symbol] = df
+
+        # one int64 or float64 array per column, whichever holds every symbol's values
+        self.dtypes = {
+            col: np.result_type(np.int64, *(df[col].dtype for df in frames.values())).str
+            for col in self.columns
+        }
+        # time zone and index name of each symbol, loaders may give them per file
+        self.tz: Dict[str, Optional[tzinfo]] = {symbol: df.index.tz for symbol, df in frames.items()}
+        self.index_names: Dict[str, str] = {symbol: df.index.name for symbol, df in frames.items()}
+
+        self.offsets: Dict[str, Tuple[int, int]] = {}
+        self.rows = 0
+        for symbol, df in frames.items():
+            self.offsets[symbol] = (self.rows, self.rows + len(df))
+            self.rows += len(df)
+
+        # SharedMemory can not be empty
+        self._shm: Optional[SharedMemory] = SharedMemory(create=True, size=max(self.rows, 1) * 8 * 6)
+        self._owner = True
+        self.name = self._shm.name
+
+        dates, arrays = self._views(writeable=True)
+        for symbol, df in frames.items():
+            start, stop = self.offsets[symbol]
+            dates[start:stop] = df.index.asi8
+            for col in self.columns:
+                arrays[col][start:stop] = df[col].to_numpy()
+        del dates, arrays
+        logger.info(f"Arena {self.name}: {len(self.offsets)} symbols, {self.rows} rows")
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state.update(_shm=None, _owner=False)
+        return state
+
+    def _views(self, writeable: bool = False) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        if self._shm is None:
+            self._shm = SharedMemory(name=self.name)
+            # exitpriority, so the finalizer also runs when a pool worker exits
+            util.Finalize(self, _detach, args=(self._shm,), exitpriority=10)
+        buf = self._shm.buf
+        dates = np.ndarray((self.rows,), dtype=np.int64, buffer=buf)
+        arrays = {
+            col: np.ndarray((self.rows,), dtype=self.dtypes[col], buffer=buf, offset=8 * self.rows * (i + 1))
+            for i, col in enumerate(self.columns)
+        }
+        if not writeable:
+            dates.flags.writeable = False
+            for arr in arrays.values():
+                arr.flags.writeable = False
+        return dates, arrays
+
+    def get(self, symbol: str) -> Optional[pd.DataFrame]:
+        if symbol not in self.offsets:
+            return None
+        start, stop = self.offsets[symbol]
+        dates, arrays = self._views()
+        index = pd.DatetimeIndex(dates[start:stop].view("M8[ns]"), name=self.index_names[symbol])
+        tz = self.tz[symbol]
+        if tz is not None:
+            index = index.tz_localize("UTC").tz_convert(tz)
+        return pd.DataFrame({col: arr[start:stop] for col, arr in arrays.items()}, index=index, copy=False)
+
+    def close(self):
+        """Detach from the block, the owner also frees it"""
+        if self._shm is None:
+            return
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+        self._shm = None
+        self.closed = True
@@ -0,0 +1,247 @@
+import io
+import logging
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from psycopg2 import sql
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from src.engines.pgsql_engine import PgSqlPool, get_pool
+from src.services.loading.csv_tail import END_OF_DAY
+from src.services.loading.loader.abstract_loader import AbstractLoader
+from src.services.loading.loader.trading_csv_loader import TradingCsvLoader
+
+
+logger = logging.getLogger(__name__)
+
+
+class PgSqlLoader(AbstractLoader):
+    """
+    A class to load Daily or higher timeframe data from a PostgreSQL table.
+
+    Weekly and monthly bars are aggregated in SQL. get_many and iter_many read
+    `DB_BATCH_SIZE` symbols per query, each symbol's last rows being read
+    backwards on the (symbol, date) primary key.
+    Connections come from the process-wide pool of `DB_CONN`, see PgSqlEngine,
+    created on first use in each process, so the loader can be sent to worker processes.
+
+    Frames are the same as TradingCsvLoader's: daily bars are indexed at midnight
+    of the exchange timezone `DB_TZ` (default America/New_York) in UTC, as the
+    CSV files written by yfinance, and end_date is cut at the same time of day.
+
+    Parameters:
+    :param config: User config, connection settings in `DB_CONN`
+    :type config: dict
+    :param timeframe: daily, weekly or monthly
+    :type timeframe: str
+    :param end_date: End date up to which date must be returned
+    :type end_date: Optional[datetime]
+    :param period: Number of bars of the timeframe to return up to end_date
+    """
+
+    timeframes = dict(daily="day", weekly="week", monthly="month")
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS {table} (
+            symbol  varchar(20)      NOT NULL,
+            date    date             NOT NULL,
+            open    double precision NOT NULL,
+            high    double precision NOT NULL,
+            low     double precision NOT NULL,
+            close   double precision NOT NULL,
+            volume  bigint           NOT NULL,
+            PRIMARY KEY (symbol, date)
+        )
+    """
+
+    # Last `period` rows of each symbol up to end_date, read backwards on the primary key
+    QUERY_DAILY = """
+        SELECT s.symbol, b.date, b.open, b.high, b.low, b.close, b.volume
+        FROM unnest(%(symbols)s::varchar[]) AS s(symbol)
+        CROSS JOIN LATERAL (
+            SELECT date, open, high, low, close, volume FROM {table}
+            WHERE symbol = s.symbol AND date <= %(end_date)s
+            ORDER BY date DESC
+            LIMIT %(rows)s
+        ) b
+        ORDER BY s.symbol, b.date
+    """
+
+    # Same rows aggregated per week or month, the last `period` bars are kept.
+    # Weeks are labeled by their Sunday and months by their first day,
+    # as pandas W-SUN and MS resampling does.
+    QUERY_RESAMPLED = """
+        SELECT symbol, date, open, high, low, close, volume FROM (
+            SELECT s.symbol,
+                   date_trunc(%(unit)s, b.date)::date + %(label_offset)s AS date,
+                   (array_agg(b.open ORDER BY b.date))[1] AS open,
+                   max(b.high) AS high,
+                   min(b.low) AS low,
+                   (array_agg(b.close ORDER BY b.date DESC))[1] AS close,
+                   sum(b.volume)::bigint AS volume,
+                   row_number() OVER (PARTITION BY s.symbol ORDER BY date_trunc(%(unit)s, b.date) DESC) AS rn
+            FROM unnest(%(symbols)s::varchar[]) AS s(symbol)
+            CROSS JOIN LATERAL (
+                SELECT date, open, high, low, close, volume FROM {table}
+                WHERE symbol = s.symbol AND date <= %(end_date)s
+                ORDER BY date DESC
+                LIMIT %(rows)s
+            ) b
+            GROUP BY s.symbol, date_trunc(%(unit)s, b.date)
+        ) bars
+        WHERE rn <= %(period)s
+        ORDER BY symbol, date
+    """
+
+    UPSERT = """
+        INSERT INTO {table} (symbol, date, open, high, low, close, volume)
+        SELECT symbol, date, open, high, low, close, volume FROM {staging}
+        ON CONFLICT (symbol, date) DO UPDATE SET
+            open = EXCLUDED.open,
+            high = EXCLUDED.high,
+            low = EXCLUDED.low,
+            close = EXCLUDED.close,
+            volume = EXCLUDED.volume
+    """
+
+    columns = ["Open", "High", "Low", "Close", "Volume"]
+
+    def __init__(
+            self,
+            config: dict,
+            tf: Optional[str] = None,
+            end_date: Optional[datetime] = None,
+            period: int = 160,
+    ):
+        self.closed = False
+        # Time frame
+        self.default_timeframe = str(config.get("DEFAULT_TF", "daily"))
+        if tf is None:
+            tf = self.default_timeframe
+        if tf not in self.timeframes:
+            valid_values = ", ".join(self.timeframes.keys())
+            raise ValueError(f"Timeframe must be one of {valid_values}")
+        self.timeframe = tf
+        self.end_date = end_date
+        if end_date:
+            # whole week or month of end_date, as TradingCsvLoader
+            if self.timeframe == "weekly":
+                self.end_date = TradingCsvLoader.last_day_week(end_date)
+            elif self.timeframe == "monthly":
+                self.end_date = TradingCsvLoader.last_day_month(end_date)
+        self.period = period
+
+        self.db_conn = dict(config.get("DB_CONN", {}))
+        self.table = config.get("DB_OHLCV_TABLE", "ohlcv_daily")
+        self.pool_size = max(1, int(config.get("DB_POOL_SIZE", 4)))
+        self.ping_after = float(config.get("DB_POOL_PING", 60))
+        self.batch_size = max(1, int(config.get("DB_BATCH_SIZE", 500)))
+        self.tz = str(config.get("DB_TZ", "America/New_York"))
+
+    @property
+    def pool(self) -> PgSqlPool:
+        return get_pool(self.db_conn, maxconn=self.pool_size, ping_after=self.ping_after)
+
+    def _execute(self, query: sql.Composable, params: Optional[dict] = None) -> Tuple[List[tuple], List[str]]:
+        with self.pool.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(query, params)
+            rows = cursor.fetchall() if cursor.description else []
+            columns = [d[0] for d in cursor.description] if cursor.description else []
+        return rows, columns
+
+    def _last_date(self) -> date:
+        """Last bar date up to end_date. read_tail keeps the bars up to end_date at
+        END_OF_DAY, the bar of that date is left out when its midnight is later."""
+        if self.end_date is None:
+            return datetime.now().date()
+        cut = pd.Timestamp(self.end_date.replace(tzinfo=END_OF_DAY))
+        return cut.tz_convert(self.tz).date()
+
+    def _query_batch(self, symbols: List[str]) -> Dict[str, pd.DataFrame]:
+        params = dict(symbols=[s.upper() for s in symbols], end_date=self._last_date(), rows=self.period)
+        table = sql.Identifier(*self.table.split("."))
+        if self.timeframe == "daily":
+            query = sql.SQL(self.QUERY_DAILY).format(table=table)
+        else:
+            unit = self.timeframes[self.timeframe]
+            # A week holds up to 7 daily rows and a month 31, enough rows for
+            # `period` complete bars. The oldest, partial bar is dropped.
+            days = 7 if unit == "week" else 31
+            params.update(
+                unit=unit,
+                label_offset=6 if unit == "week" else 0,
+                rows=days * (self.period + 1),
+                period=self.period)
+            query = sql.SQL(self.QUERY_RESAMPLED).format(table=table)
+
+        rows, _ = self._execute(query, params)
+        if not rows:
+            return {}
+
+        df = pd.DataFrame(rows, columns=["symbol", "Date", *self.columns])
+        if self.timeframe == "daily":
+            df["Date"] = pd.to_datetime(df["Date"]).dt.tz_localize(self.tz).dt.tz_convert("UTC")
+        else:
+            # resampled bars are labeled at midnight UTC, as pandas resamples the CSV bars
+            df["Date"] = pd.to_datetime(df["Date"], utc=True)
+        # rows are ordered by symbol, split them at each new symbol
+        sym = df["symbol"].to_numpy()
+        bounds = np.flatnonzero(sym[1:] != sym[:-1]) + 1
+        starts = np.concatenate(([0], bounds))
+        stops = np.concatenate((bounds, [len(df)]))
+        frames = df.set_index("Date")[self.columns]
+        return {sym[a]: frames.iloc[a:b] for a, b in zip(starts, stops)}
+
+    def get(self, symbol: str) -> Optional[pd.DataFrame]:
+        return self.get_many([symbol]).get(symbol)
+
+    def iter_many(self, symbols: Iterable[str]) -> Iterator[Tuple[str, Optional[pd.DataFrame]]]:
+        """Yields (symbol, DataFrame) in the order given, one query per batch"""
+        symbols = list(symbols)
+        for i in range(0, len(symbols), self.batch_size):
+            batch = symbols[i:i + self.batch_size]
+            frames = self._query_batch(batch)
+            for symbol in batch:
+                yield symbol, frames.get(symbol.upper())
+
+    def create_schema(self):
+        """Create the bars table if it does not exist"""
+        table = sql.Identifier(*self.table.split("."))
+        self._execute(sql.SQL(self.SCHEMA).format(table=table))
+
+    def import_csv(self, files: Iterable[Path]) -> int:
+        """
+        Bulk import daily CSV files, one per symbol named SYMBOL.csv.
+        Rows are copied into a temporary table and upserted, existing bars are updated.
+        Returns the number of rows imported.
+        """
+        table = sql.Identifier(*self.table.split("."))
+        staging = sql.Identifier("ohlcv_staging")
+        total = 0
+        with self.pool.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(sql.SQL(
+                "CREATE TEMP TABLE IF NOT EXISTS {staging} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP"
+            ).format(staging=staging, table=table))
+            for file in files:
+                df = pd.read_csv(file, usecols=["Date", *self.columns], dtype={"Date": object}).dropna()
+                if df.empty:
+                    continue
+                # calendar date of the bar, as written in the file
+                df["Date"] = df["Date"].str[:10]
+                df.insert(0, "symbol", file.stem.upper())
+                df["Volume"] = df["Volume"].astype(np.int64)
+                buffer = io.StringIO()
+                df.to_csv(buffer, index=False, header=False)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    sql.SQL("COPY {staging} (symbol, date, open, high, low, close, volume) "
+                            "FROM STDIN WITH (FORMAT csv)").format(staging=staging),
+                    buffer)
+                total += len(df)
+            cursor.execute(sql.SQL(self.UPSERT).format(table=table, staging=staging))
+        logger.info(f"Imported {total} rows into {self.table}")
+        return total
+
+    def close(self):
+        """Connections stay in the process-wide pool, closed at exit"""
+        self.closed = True
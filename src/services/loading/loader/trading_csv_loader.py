@@ -1,8 +1,14 @@
 import logging
 import pandas as pd
 from pathlib import Path
-from typing import Optional
+from itertools import islice
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, Optional, Tuple
 from datetime import datetime, timedelta
+from src.services.loading.csv_cache import CsvCache
+from src.services.loading.csv_index import CsvIndex
+from src.services.loading.csv_tail import read_tail, END_OF_DAY
 from src.services.loading.loader.abstract_loader import AbstractLoader
 
 
@@ -22,6 +28,11 @@ class TradingCsvLoader(AbstractLoader):
     :type end_date: Optional[datetime]
     :param period: Number of lines to return from end_date or end of file
 
+    With `CSV_CACHE` set in config, files are read from their binary copy
+    in `FOLDER_Cache`, see CsvCache. With `CSV_INDEX` set, rows are located
+    with a sidecar row index in `FOLDER_Cache`, see CsvIndex.
+
+    iter_many and get_many load up to `LOADER_THREADS` files concurrently.
     """
 
     timeframes = dict(daily="D", weekly="W-SUN", monthly="MS")
@@ -65,13 +76,20 @@ class TradingCsvLoader(AbstractLoader):
             Volume="sum",
         )
 
-        self.chunk_size = 1024 * 6
+        self.cache: Optional[CsvCache] = None
+        if config.get("CSV_CACHE", False):
+            self.cache = CsvCache(config.get("FOLDER_Cache", self.data_path / ".cache"))
+        # Threads of iter_many, file reads and parsing release the GIL
+        self.threads = max(1, int(config.get("LOADER_THREADS", 4)))
+
+        self.index: Optional[CsvIndex] = None
+        if config.get("CSV_INDEX", False):
+            self.index = CsvIndex(config.get("FOLDER_Cache", self.data_path / ".cache"))
 
         if tf == self.default_timeframe:
             self.period = period
         elif tf == "weekly":
             self.period = 7 * period
-            self.chunk_size = 1024 * 19
         elif tf == "monthly":
             days = 7 if self.default_timeframe == "weekly" else 1
             self.period = 30 * period // days
@@ -83,18 +101,19 @@ class TradingCsvLoader(AbstractLoader):
             logger.warning(f"File not found: {file}")
             return
 
+        if self.cache is not None:
+            return self.process_cached(file, self.end_date)
+
         if self.timeframe == "monthly":
             # It is faster to load the entire file for monthly
             # Considering the average size of file
             return self.process_monthly(file, self.end_date)
 
         try:
-            csv_loader = loader.CsvLoader(file)
-            df = csv_loader.load_symbol_history(
-                period=self.period,
-                end_date=self.end_date,
-                chunk_size=self.chunk_size
-            )
+            if self.index is not None:
+                df = self.index.read(file, period=self.period, end_date=self.end_date)
+            else:
+                df = read_tail(file, period=self.period, end_date=self.end_date)
         except (IndexError, ValueError):
             return
 
@@ -119,6 +138,48 @@ class TradingCsvLoader(AbstractLoader):
         assert isinstance(df, pd.DataFrame)
         return df
 
+    def iter_many(self, symbols: Iterable[str]) -> Iterator[Tuple[str, Optional[pd.DataFrame]]]:
+        """Yields (symbol, DataFrame) in the order given, while the next
+        symbols are loaded by a thread pool"""
+        if self.threads == 1:
+            yield from super().iter_many(symbols)
+            return
+
+        symbols = iter(symbols)
+        executor = ThreadPoolExecutor(max_workers=self.threads)
+        try:
+            # keep a bounded number of symbols in flight ahead of the consumer
+            pending = deque(
+                (symbol, executor.submit(self.get, symbol))
+                for symbol in islice(symbols, 2 * self.threads))
+            while pending:
+                symbol, future = pending.popleft()
+                for nxt in islice(symbols, 1):
+                    pending.append((nxt, executor.submit(self.get, nxt)))
+                yield symbol, future.result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def process_cached(self, file, end_date) -> Optional[pd.DataFrame]:
+        df = self.cache.get(file)
+        if df is None or df.empty:
+            return None
+        if end_date:
+            # Same end of day as read_tail
+            end_date = end_date.replace(tzinfo=END_OF_DAY)
+            if df.index[0] > end_date:
+                # Date out of bounds of current DataFrame
+                return None
+            df = df.loc[:end_date]
+        df = df.iloc[-self.period:]
+
+        if self.timeframe == self.default_timeframe:
+            return df
+
+        df = df.resample(self.offset_str).agg(self.ohlc_dict).dropna()
+        assert isinstance(df, pd.DataFrame)
+        return df
+
     @staticmethod
     def last_day_week(date: datetime) -> datetime:
         """Given a date returns the date for Saturday"""
@@ -0,0 +1,2 @@
+from .harness import Benchmark, Skip, compare
+from .synthetic import PATTERNS, make_universe, write_csv
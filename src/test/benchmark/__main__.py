@@ -0,0 +1,68 @@
+import sys
+import json
+import tempfile
+from pathlib import Path
+from argparse import ArgumentParser
+from src.test.benchmark.cases import CASES, BenchUniverse
+from src.test.benchmark.harness import commit_info, compare, run_cases, write_results
+
+"""
+Benchmark each stage of a scan on a synthetic universe, see cases.py.
+
+Run: python -m src.test.benchmark [--sizes 100 1000] [--only find.] [--out results.json]
+                                  [--compare previous.json]
+
+Results are written as JSON, to ROOT_Logs/benchmark/<commit>.json by default.
+With --compare, the min time of every case is compared to a previous results
+file, the exit status is 1 when a case got slower than --threshold. It is 1
+too when a case failed, e.g. a finder missed a planted pattern.
+"""
+
+ROOT = Path(__file__).parents[3]
+
+parser = ArgumentParser(prog="python -m src.test.benchmark")
+parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000], metavar="int",
+                    help="symbols in the universe, default 100 1000")
+parser.add_argument("--bars", type=int, default=300, metavar="int", help="daily bars per symbol, default 300")
+parser.add_argument("--seed", type=int, default=0, metavar="int", help="seed of the synthetic universe")
+parser.add_argument("--rounds", type=int, default=5, metavar="int", help="timed rounds per case, default 5")
+parser.add_argument("--warmup", type=int, default=1, metavar="int", help="untimed rounds per case, default 1")
+parser.add_argument("--only", type=str, metavar="str", help="cases whose name contains str")
+parser.add_argument("--out", type=Path, metavar="str", help="results file")
+parser.add_argument("--compare", type=Path, metavar="str", help="previous results file to compare to")
+parser.add_argument("--threshold", type=float, default=1.1, metavar="float",
+                    help="slowdown ratio reported as a regression, default 1.1")
+parser.add_argument("-l", "--list", action="store_true", help="list the cases")
+args = parser.parse_args()
+
+if args.list:
+    exit("\n".join(CASES))
+
+out = args.out
+if out is None:
+    from src.config import Config
+    commit = commit_info(ROOT).get("id", "nocommit")[:12]
+    out = Config().ROOT_Logs / "benchmark" / f"{commit}.json"
+
+sizes = sorted(set(args.sizes))
+with tempfile.TemporaryDirectory(prefix="benchmark_") as tmp:
+    universe = BenchUniverse(Path(tmp) / "daily", max(sizes), bars=args.bars, seed=args.seed)
+    results = run_cases(CASES, universe.env, sizes, rounds=args.rounds, warmup=args.warmup, only=args.only)
+
+params = dict(sizes=sizes, bars=args.bars, seed=args.seed, rounds=args.rounds, warmup=args.warmup, only=args.only)
+write_results(out, results, params, ROOT)
+print(f"Results: {out}")
+
+failed = [result["fullname"] for result in results if "error" in result]
+if failed:
+    print(f"{len(failed)} failed: {', '.join(failed)}")
+
+if args.compare:
+    old = json.loads(args.compare.read_bytes())
+    new = json.loads(out.read_bytes())
+    slower = compare(old, new, args.threshold)
+    if slower:
+        print(f"{len(slower)} slower than {args.threshold}x: {', '.join(slower)}")
+        sys.exit(1)
+if failed:
+    sys.exit(1)
@@ -0,0 +1,228 @@
+import logging
+import pandas as pd
+from pathlib import Path
+from functools import cached_property
+from types import SimpleNamespace
+from typing import Callable, Dict, List
+import src.analyses.treading.patterns.pattern as Pattern
+import src.analyses.treading.patterns.pattern_kernel as Kernel
+import src.analyses.treading.patterns.pattern_backtest as Backtest
+from src.analyses.treading.patterns.method.pattern_detector import PatternDetector
+from src.services.loading.csv_tail import read_tail
+from src.services.loading.loader.trading_csv_loader import TradingCsvLoader
+from src.test.benchmark.harness import Benchmark, Skip
+from src.test.benchmark.reference import chunked_tail, rolling_max_min
+from src.test.benchmark.synthetic import make_universe, write_csv
+
+"""
+Benchmark cases of each stage of a scan: loading, pivots, pattern finders,
+serialization and plot saving. A case is called with a Benchmark and the
+BenchEnv of a universe size, and times one pass over the whole universe.
+"""
+
+# Bars the scan reads per symbol, the loader's default period
+PERIOD = 160
+# Images saved per round by plot.save, plotting is far slower than the rest
+PLOT_LIMIT = 10
+# Forward returns measured by backtest, in bars
+HORIZONS = (5, 10, 20)
+# Rows read from the end of a file by the loader.read_tail cases, from files
+# of LONG_BARS bars of LONG_SYMBOLS symbols, whatever the universe size
+TAIL_ROWS = (160, 1000, 5000)
+LONG_BARS = 6000
+LONG_SYMBOLS = 20
+# Pattern of synthetic.PATTERNS each finder detects, finders without one have none planted
+PLANTED = dict(vcpu="VCPU", dtop="DTOP", hnsd="HNSD", trng="Symmetric")
+
+CASES: Dict[str, Callable[[Benchmark, "BenchEnv"], None]] = {}
+
+
+def case(name: str):
+    """Register a benchmark case under name"""
+    def register(fn):
+        CASES[name] = fn
+        return fn
+    return register
+
+
+class BenchEnv:
+    """
+    The first `size` symbols of a synthetic universe, as CSV files for the
+    loader cases and as DataFrames of the last PERIOD bars for the others.
+    Pivots and detections are computed once, for the cases that need them.
+    """
+
+    def __init__(self, universe: Dict[str, pd.DataFrame], labels: Dict[str, str], folder: Path, size: int):
+        self.symbols = list(universe)[:size]
+        self.bars = {symbol: universe[symbol] for symbol in self.symbols}
+        self.frames = {symbol: universe[symbol].iloc[-PERIOD:] for symbol in self.symbols}
+        self.labels = {symbol: labels[symbol] for symbol in self.symbols if symbol in labels}
+        self.folder = folder
+        self.detector = PatternDetector(logging.getLogger(__name__))
+        self.loader_config = dict(DATA_PATH=str(folder), DEFAULT_TF="daily")
+
+    @cached_property
+    def pivots(self) -> Dict[str, pd.DataFrame]:
+        return {symbol: self.detector.get_max_min(df) for symbol, df in self.frames.items()}
+
+    @cached_property
+    def arrays(self) -> dict:
+        return {symbol: Kernel.get_pattern_arrays(self.detector, df, self.pivots[symbol])
+                for symbol, df in self.frames.items()}
+
+    @cached_property
+    def long_files(self) -> List[Path]:
+        """CSV files of LONG_SYMBOLS symbols with LONG_BARS bars, written once"""
+        folder = self.folder.parent / "long"
+        if not folder.is_dir():
+            universe, _ = make_universe(LONG_SYMBOLS, bars=LONG_BARS, seed=1)
+            write_csv(universe, folder)
+        return sorted(folder.glob("*.csv"))
+
+    def _detect(self, frames: Dict[str, pd.DataFrame], pivots: Dict[str, pd.DataFrame]) -> List[dict]:
+        found = []
+        for fn in (fn for fn in Pattern.get_pattern_dict().values() if callable(fn)):
+            for symbol, df in frames.items():
+                result = fn(self.detector, symbol, df, pivots[symbol])
+                if result:
+                    found.append(result)
+        return found
+
+    @cached_property
+    def detections(self) -> List[dict]:
+        """Patterns found by every pandas finder, as the scan returns them"""
+        return self._detect(self.frames, self.pivots)
+
+    @cached_property
+    def past_detections(self) -> List[dict]:
+        """Patterns found by every pandas finder in the PERIOD bars before the
+        last max(HORIZONS) bars, which the backtest measures them on"""
+        ahead = max(HORIZONS)
+        frames = {symbol: df.iloc[-PERIOD - ahead:-ahead] for symbol, df in self.bars.items()}
+        return self._detect(frames, {symbol: self.detector.get_max_min(df) for symbol, df in frames.items()})
+
+
+class BenchUniverse:
+    """Synthetic universe of the largest size, written once to folder"""
+
+    def __init__(self, folder: Path, size: int, bars: int = 300, seed: int = 0):
+        self.folder = Path(folder)
+        self.universe, self.labels = make_universe(size, bars=bars, seed=seed)
+        write_csv(self.universe, self.folder)
+
+    def env(self, size: int) -> BenchEnv:
+        return BenchEnv(self.universe, self.labels, self.folder, size)
+
+
+@case("loader.get")
+def bench_loader_get(benchmark: Benchmark, env: BenchEnv):
+    loader = TradingCsvLoader(env.loader_config, period=PERIOD)
+    benchmark(lambda: [loader.get(symbol) for symbol in env.symbols])
+
+
+@case("loader.iter_many")
+def bench_loader_iter_many(benchmark: Benchmark, env: BenchEnv):
+    loader = TradingCsvLoader(env.loader_config, period=PERIOD)
+    benchmark(lambda: sum(1 for _ in loader.iter_many(env.symbols)))
+
+
+def _tail_case(rows: int, reader: Callable) -> Callable[[Benchmark, BenchEnv], None]:
+    def bench_tail(benchmark: Benchmark, env: BenchEnv):
+        files = env.long_files
+        benchmark(lambda: [reader(file, period=rows) for file in files])
+        benchmark.extra_info.update(items=len(files))
+
+    return bench_tail
+
+
+# read_tail next to the chunked backward read it replaced
+for _rows in TAIL_ROWS:
+    case(f"loader.read_tail.{_rows}")(_tail_case(_rows, read_tail))
+    case(f"loader.read_tail.{_rows}.chunked")(_tail_case(_rows, chunked_tail))
+
+
+@case("pivots.get_max_min")
+def bench_get_max_min(benchmark: Benchmark, env: BenchEnv):
+    detector = env.detector
+    benchmark(lambda: [detector.get_max_min(df) for df in env.frames.values()])
+
+
+@case("pivots.get_max_min.rolling")
+def bench_rolling_max_min(benchmark: Benchmark, env: BenchEnv):
+    # the loop get_max_min replaced, to compare with pivots.get_max_min
+    benchmark(lambda: [rolling_max_min(df) for df in env.frames.values()])
+
+
+@case("pivots.get_pattern_arrays")
+def bench_get_pattern_arrays(benchmark: Benchmark, env: BenchEnv):
+    detector, pivots = env.detector, env.pivots
+    benchmark(lambda: [Kernel.get_pattern_arrays(detector, df, pivots[symbol]) for symbol, df in env.frames.items()])
+
+
+def _finder_case(key: str, kernel: str) -> Callable[[Benchmark, BenchEnv], None]:
+    fn = Pattern.get_pattern_dict(kernel)[key]
+
+    def bench_finder(benchmark: Benchmark, env: BenchEnv):
+        detector, pivots = env.detector, env.pivots
+        if kernel == "array":
+            arrays = env.arrays
+
+            def scan():
+                return {symbol: fn(detector, symbol, df, pivots[symbol], arrays[symbol])
+                        for symbol, df in env.frames.items()}
+        else:
+            def scan():
+                return {symbol: fn(detector, symbol, df, pivots[symbol]) for symbol, df in env.frames.items()}
+
+        results = {symbol: result for symbol, result in benchmark(scan).items() if result}
+        # every pattern planted for the finder must be found, a regression check as much as a timing
+        planted = [symbol for symbol, label in env.labels.items() if label == PLANTED.get(key)]
+        missed = [symbol for symbol in planted if results.get(symbol, {}).get("pattern") != PLANTED[key]]
+        assert not missed, f"find.{key} ({kernel}) missed the planted {PLANTED[key]} of {missed}"
+        benchmark.extra_info.update(found=len(results), planted_found=len(planted))
+
+    return bench_finder
+
+
+for _key in ("vcpu", "vcpd", "dbot", "dtop", "hnsd", "hnsu", "trng"):
+    for _kernel in Pattern.KERNELS:
+        case(f"find.{_key}" + ("" if _kernel == "pandas" else f".{_kernel}"))(_finder_case(_key, _kernel))
+
+
+@case("serialize.make_serializable")
+def bench_make_serializable(benchmark: Benchmark, env: BenchEnv):
+    detector, detections = env.detector, env.detections
+    benchmark(lambda: [detector.make_serializable(result) for result in detections])
+    benchmark.extra_info.update(items=len(detections))
+
+
+@case("backtest")
+def bench_backtest(benchmark: Benchmark, env: BenchEnv):
+    det = Backtest.get_detections(env.past_detections)
+    if not len(det.sym):
+        raise Skip("No pattern found to backtest")
+    benchmark(lambda: Backtest.backtest(det, env.bars.get, HORIZONS))
+    benchmark.extra_info.update(items=len(det.sym))
+
+
+@case("plot.save")
+def bench_plot_save(benchmark: Benchmark, env: BenchEnv):
+    try:
+        import mplfinance  # noqa: F401
+    except ModuleNotFoundError:
+        raise Skip("mplfinance is not installed")
+    from src.engine import Engine
+    from src.services.saving.saving_plot_service import SavingPlotService
+
+    save_folder = env.folder.parent / "images"
+    loader = TradingCsvLoader(env.loader_config, period=PERIOD)
+    # the service only logs, the user's Config is not needed
+    config = SimpleNamespace(logger=logging.getLogger(__name__))
+    plotter = SavingPlotService(Engine(config), None, loader, save_folder)
+    # SavingPlotService reads the pattern name from `patterns`
+    patterns = [dict(result, patterns=result["pattern"])
+                for result in map(env.detector.make_serializable, env.detections[:PLOT_LIMIT])]
+    if not patterns:
+        raise Skip("No pattern found to plot")
+    benchmark(lambda: [plotter.save(dct.copy()) for dct in patterns])
+    benchmark.extra_info.update(items=len(patterns))
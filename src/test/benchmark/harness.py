@@ -0,0 +1,146 @@
+import os
+import sys
+import json
+import time
+import platform
+import statistics
+import subprocess
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+
+class Skip(Exception):
+    """Raised by a case that can not run here, e.g. a missing optional package"""
+
+
+class Benchmark:
+    """
+    Times a callable, `result = benchmark(fn, *args, **kwargs)`.
+
+    The callable runs `warmup` times untimed, then `rounds` times timed.
+    Cases may add counts to `extra_info`, they are kept in the results.
+    """
+
+    def __init__(self, rounds: int = 5, warmup: int = 1):
+        self.rounds = max(1, rounds)
+        self.warmup = max(0, warmup)
+        self.times: List[float] = []
+        self.extra_info: Dict[str, Any] = {}
+
+    def __call__(self, fn: Callable, *args, **kwargs):
+        result = None
+        for _ in range(self.warmup):
+            result = fn(*args, **kwargs)
+        self.times = []
+        for _ in range(self.rounds):
+            start = time.perf_counter()
+            result = fn(*args, **kwargs)
+            self.times.append(time.perf_counter() - start)
+        return result
+
+    def stats(self) -> dict:
+        return dict(
+            rounds=len(self.times),
+            min=min(self.times),
+            max=max(self.times),
+            mean=statistics.fmean(self.times),
+            median=statistics.median(self.times),
+            stddev=statistics.stdev(self.times) if len(self.times) > 1 else 0.0,
+        )
+
+
+def commit_info(cwd: Path) -> dict:
+    """Commit and dirty flag of the git tree at cwd, empty outside a git tree"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=cwd, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=cwd,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {}
+    return dict(id=commit, dirty=dirty)
+
+
+def machine_info() -> dict:
+    return dict(
+        python=platform.python_version(),
+        implementation=platform.python_implementation(),
+        machine=platform.machine(),
+        system=platform.system(),
+        release=platform.release(),
+        cpu_count=os.cpu_count(),
+        processor=platform.processor(),
+    )
+
+
+def write_results(path: Path, benchmarks: List[dict], params: dict, cwd: Path):
+    """Results file, laid out as pytest-benchmark's --benchmark-json"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(dict(
+        datetime=datetime.now().isoformat(timespec="seconds"),
+        commit_info=commit_info(cwd),
+        machine_info=machine_info(),
+        params=params,
+        benchmarks=benchmarks,
+    ), indent=1))
+    os.replace(tmp, path)
+
+
+def compare(old: dict, new: dict, threshold: float = 1.1, out=sys.stdout) -> List[str]:
+    """
+    Print the min time of every benchmark of new against old.
+    Returns the benchmarks more than `threshold` times slower.
+    """
+    before = {b["fullname"]: b for b in old["benchmarks"] if "stats" in b}
+    slower = []
+    out.write(f"{'benchmark':<40} {'old ms':>10} {'new ms':>10} {'ratio':>7}\n")
+    for bench in new["benchmarks"]:
+        if "stats" not in bench or bench["fullname"] not in before:
+            continue
+        a, b = before[bench["fullname"]]["stats"]["min"], bench["stats"]["min"]
+        ratio = b / a if a else float("inf")
+        flag = ""
+        if ratio > threshold:
+            slower.append(bench["fullname"])
+            flag = " slower"
+        elif ratio < 1 / threshold:
+            flag = " faster"
+        out.write(f"{bench['fullname']:<40} {a * 1e3:>10.2f} {b * 1e3:>10.2f} {ratio:>7.2f}{flag}\n")
+    return slower
+
+
+def run_cases(cases: Dict[str, Callable], env_for: Callable[[int], Any], sizes: List[int],
+              rounds: int = 5, warmup: int = 1, only: Optional[str] = None, out=sys.stdout) -> List[dict]:
+    """
+    Run every case at every size, returns their results.
+    A case that fails is reported with its error in `error`, the others still run.
+    """
+    results = []
+    for size in sizes:
+        env = env_for(size)
+        for name, case in cases.items():
+            if only and only not in name:
+                continue
+            fullname = f"{name}[{size}]"
+            benchmark = Benchmark(rounds=rounds, warmup=warmup)
+            entry = dict(name=name, fullname=fullname, group=name.split(".")[0], params=dict(size=size))
+            try:
+                case(benchmark, env)
+            except Skip as e:
+                entry["skipped"] = str(e)
+                out.write(f"{fullname:<40} skipped: {e}\n")
+                results.append(entry)
+                continue
+            except Exception as e:
+                entry["error"] = f"{type(e).__name__}: {e}"
+                out.write(f"{fullname:<40} error: {entry['error']}\n")
+                results.append(entry)
+                continue
+            entry.update(stats=benchmark.stats(), extra_info=benchmark.extra_info)
+            items = benchmark.extra_info.get("items") or size
+            out.write(f"{fullname:<40} min {entry['stats']['min'] * 1e3:>10.2f} ms"
+                      f"  {entry['stats']['min'] / items * 1e6:>9.1f} us/item\n")
+            results.append(entry)
+    return results
@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+"""
+Deterministic synthetic daily OHLCV data for the benchmarks.
+
+Symbols are random walks, some of them end with a planted pattern drawn
+through the waypoints of PATTERNS. The same seed always gives the same
+universe, on any machine.
+"""
+
+# Waypoints of each planted pattern: (bars from the previous waypoint, price
+# relative to the first waypoint). The first waypoint is the end of the random
+# walk, the last one is the last bar. Drawn so the pandas and array finders
+# of the pattern detect them, see TradingAnalyse for the pattern names.
+PATTERNS: Dict[str, List[Tuple[int, float]]] = {
+    # A high, B low, C high just under A, D back up, E last close
+    "VCPU": [(0, 1.0), (14, 0.87), (16, 0.995), (12, 0.935), (8, 0.965)],
+    # A high, B low, C high at A, D last close between B and C
+    "DTOP": [(0, 1.0), (14, 0.985), (14, 0.999), (8, 0.992)],
+    # A left shoulder, B neck, C head, D neck, E right shoulder, F last close
+    "HNSD": [(0, 1.0), (12, 0.945), (14, 1.055), (14, 0.947), (14, 1.0), (8, 0.975)],
+    # A high, B low, C lower high, D higher low, E lower high, F last close
+    "Symmetric": [(0, 1.0), (10, 0.86), (10, 0.97), (10, 0.89), (10, 0.945), (8, 0.92)],
+}
+
+
+def _bars(rng: np.random.Generator, close: np.ndarray, anchors: np.ndarray, spread: float) -> pd.DataFrame:
+    """OHLCV bars on a close path. Bars at anchors get the widest wick of
+    their neighbours, so their High or Low is the pivot of the window."""
+    size = close.shape[0]
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    wick = spread * close * rng.uniform(0.2, 0.8, size)
+    upper = wick.copy()
+    lower = rng.permutation(wick)
+    peak = np.zeros(size, dtype=bool)
+    trough = np.zeros(size, dtype=bool)
+    for pos in anchors:
+        # a waypoint is a peak if it is above its neighbours
+        before, after = close[max(0, pos - 1)], close[min(size - 1, pos + 1)]
+        if close[pos] >= max(before, after):
+            peak[pos] = True
+        elif close[pos] <= min(before, after):
+            trough[pos] = True
+    upper[peak] = spread * close[peak]
+    lower[trough] = spread * close[trough]
+    volume = rng.integers(200_000, 2_000_000, size)
+    # volume dries up as a pattern goes on, the first peak has the most
+    volume[peak] = np.linspace(4_000_000, 2_500_000, int(peak.sum()), dtype=np.int64)
+    return pd.DataFrame({
+        "Open": open_,
+        "High": np.maximum(open_, close) + upper,
+        "Low": np.minimum(open_, close) - lower,
+        "Close": close,
+        "Volume": volume,
+        "Dividends": 0.0,
+        "Stock Splits": 0.0,
+    })
+
+
+def random_walk(rng: np.random.Generator, bars: int, start: float = 50.0, vol: float = 0.02) -> np.ndarray:
+    """Close prices of a geometric random walk"""
+    return start * np.exp(np.cumsum(rng.normal(0.0003, vol, bars)))
+
+
+def planted(rng: np.random.Generator, pattern: str, bars: int, level: float = 100.0) -> Tuple[np.ndarray, np.ndarray]:
+    """Close prices ending with pattern, and the positions of its waypoints.
+    The random walk before the pattern stays under its first waypoint."""
+    waypoints = PATTERNS[pattern]
+    # a few bars more or less between waypoints, the shape is kept
+    steps = np.array([step for step, _ in waypoints]) + rng.integers(-1, 2, len(waypoints)) * (np.arange(len(waypoints)) > 0)
+    anchors = bars - 1 - steps.sum() + np.cumsum(steps)
+    prices = level * np.array([price for _, price in waypoints])
+
+    close = np.empty(bars)
+    # walk up to the first waypoint from 60-85% of it, a bridge pinned at both ends
+    head = anchors[0] + 1
+    walk = np.cumsum(rng.normal(0, 0.01, head))
+    bridge = walk - np.linspace(0, 1, head) * walk[-1]
+    close[:head] = np.linspace(rng.uniform(0.6, 0.85), 1, head) * prices[0] * np.exp(bridge)
+    close[:head] = np.minimum(close[:head], prices[0] * 0.97)
+    # last bars rise straight to the first waypoint
+    close[head - 10:head] = np.linspace(close[head - 10], prices[0], 10)
+    # straight legs between waypoints, with a little noise away from the waypoints
+    for (a, b), (pa, pb) in zip(zip(anchors[:-1], anchors[1:]), zip(prices[:-1], prices[1:])):
+        leg = np.linspace(pa, pb, b - a + 1)
+        leg[2:-2] *= 1 + rng.normal(0, 0.0005, b - a - 3)
+        close[a:b + 1] = leg
+    return close, anchors
+
+
+def make_universe(
+        symbols: int,
+        bars: int = 300,
+        seed: int = 0,
+        planted_ratio: float = 0.2,
+        end: str = "2024-06-28",
+) -> Tuple[Dict[str, pd.DataFrame], Dict[str, str]]:
+    """
+    Daily bars of `symbols` synthetic symbols, SYN00000, SYN00001 ...
+    A `planted_ratio` of them end with a pattern of PATTERNS, in turn.
+    Returns the bars by symbol and the planted pattern by symbol.
+    """
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end=end, periods=bars, tz="America/New_York", name="Date")
+    names = list(PATTERNS)
+    every = max(1, round(1 / planted_ratio)) if planted_ratio else 0
+    universe: Dict[str, pd.DataFrame] = {}
+    labels: Dict[str, str] = {}
+    for i in range(symbols):
+        symbol = f"SYN{i:05d}"
+        level = float(rng.uniform(10, 300))
+        if every and i % every == 0:
+            # find_triangles compares trend line slopes in price per bar,
+            # planted patterns are priced high enough for any of them
+            level = float(rng.uniform(150, 300))
+            pattern = names[(i // every) % len(names)]
+            close, anchors = planted(rng, pattern, bars, level)
+            labels[symbol] = pattern
+        else:
+            close, anchors = random_walk(rng, bars, level), np.empty(0, dtype=np.intp)
+        df = _bars(rng, close, anchors, spread=0.008)
+        df.index = index
+        universe[symbol] = df
+    return universe, labels
+
+
+def write_csv(universe: Dict[str, pd.DataFrame], folder: Path, symbols: Optional[List[str]] = None):
+    """Write the bars as the fetch service does, one SYMBOL.csv per symbol"""
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    for symbol in symbols or universe:
+        universe[symbol].to_csv(folder / f"{symbol}.csv", index=True, header=True)
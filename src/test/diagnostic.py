@@ -1,148 +1,74 @@
-import pandas as pd
 from pathlib import Path
+from argparse import ArgumentParser
+from src.config import Config
+from src.services.loading.integrity_checker import integrity_checker
 
 """
-This script checks data integrity of all csv files in eod2_data/daily.
+This script checks data integrity of all csv files in the daily folder.
 
-It checks for below []
-By default only a maximum of 5 errors are printed. 
-Edit the ERROR_THRESHOLD variable to print more error. 
+Every file is checked, in parallel, see IntegrityChecker for the checks.
+Files unchanged since the last run are not read again.
+By default only a maximum of 5 errors are printed for each check.
+Edit the ERROR_THRESHOLD variable to print more error,
+all of them are written to the report in the log folder.
 Once error is corrected must rerun to verify.
 
-EOD2 takes extreme care to ensure data integrity 
-but it is possible due to bugs or accidental user inputs.
-
-Run this script periodically and report any errors by raising an issue:
-https://github.com/BennyThadikaran/eod2/issues
-
-Your reporting helps make EOD2 rock solid and stable.
+Run: python -m src.test.diagnostic [--full] [--workers N] [--folder PATH]
 """
 
 ERROR_THRESHOLD = 5
 
-DIR = Path(__file__).parents[1]
-
-# - Empty files
-exceptionsList = []
-# - Corrupt or incorrectly formatted files
-indexMismatchList = []
-# - Duplicate entries in files
-duplicatesList = []
-# - Incorrect column dataTypes.
-typeMismatchList = []
-colMismatchList = []
-# - NAN values in OHLCV rows
-hasNansList = []
-
-
-def get_error_count():
-    return max(
-        len(exceptionsList),
-        len(indexMismatchList),
-        len(duplicatesList),
-        len(typeMismatchList),
-        len(colMismatchList),
-        len(hasNansList),
-    )
-
-
-def print_result():
-    if get_error_count() == 0:
+checkTitles = {
+    "read": "File or Pandas exceptions",
+    "empty": "Empty files",
+    "columns": "Column mismatch",
+    "dtype": "Datatype mismatch",
+    "dates": "Unparsable dates",
+    "order": "Dates out of order",
+    "duplicates": "Duplicate entries",
+    "gaps": "Gaps in dates",
+    "nans": "Column with NAN values",
+    "ohlc": "OHLC mismatch",
+    "negative": "Negative values",
+}
+
+
+def print_result(issues: dict):
+    if not issues:
         print("No errors\n")
         return
 
-    if len(exceptionsList):
-        print("\nFile or Pandas exceptions")
-        print("\n".join(exceptionsList))
-
-    if len(indexMismatchList):
-        print("\nPandas Index mismatch")
-        print("\n".join(indexMismatchList))
-
-    if len(duplicatesList):
-        print("\nDuplicate entries")
-        print("\n".join(duplicatesList))
-
-    if len(typeMismatchList):
-        print("\nDatatype mismatch")
-        print("\n".join(typeMismatchList))
-
-    if len(colMismatchList):
-        print("\nColumn mismatch")
-        print("\n".join(colMismatchList))
-
-    if len(hasNansList):
-        print("\nColumn with NAN values")
-        print("\n".join(hasNansList))
-
-    print(f"\nTotal errors: {get_error_count()}")
-
-
-daily = DIR / "eod2_data" / "daily"
-
-dtypeMismatchText = (
-    "{}: Column type Mismatch in {}. Expected float64 or int64. Got {}"
-)
-columnMismatchText = "{}: Column Length Mismatch. Expect {} got {}"
-indexMismatchText = (
-    "{}: Pandas Index type Mismatch. Expect datetime64[ns] got {}"
-)
-hasNansText = "{}: Column {} has NAN values"
-
-for child in daily.iterdir():
-    try:
-        df = pd.read_csv(child, index_col="Date", parse_dates=True)
-    except Exception as e:
-        # Catch pandas or file parsing errors
-        exceptionsList.append(f"{child.name.upper()}: {e!r}")
-        continue
-
-    # File is empty or only has column headings
-    if df.shape[0] < 1:
-        print(f"daily/{child.name} is empty.")
-        continue
-
-    # Catch Type errors in Datetime index
-    if df.index.dtype != "datetime64[ns]":
-        txt = indexMismatchText.format(
-            child.name.upper().ljust(15), df.index.dtype
-        )
-
-        indexMismatchList.append(txt)
-
-    columns = df.columns
-    colLength = len(columns)
-
-    # Catch column length errors
-    if colLength != 8:
-        txt = columnMismatchText.format(
-            child.name.upper().ljust(15), 5, colLength
-        )
-
-        colMismatchList.append(txt)
-
-    # Catch column dataType mismatch
-    for col in df.columns:
-        if df[col].dtype not in ("float64", "int64"):
-            txt = dtypeMismatchText.format(
-                child.name.upper().ljust(15), col, df[col].dtype
-            )
-
-            typeMismatchList.append(txt)
-
-    for col in ("Open", "High", "Low", "Close", "Volume"):
-        if df[col].hasnans:
-            hasNansList.append(
-                hasNansText.format(child.name.upper().ljust(15), col)
-            )
-
-    # Catch duplicate entries in file
-    if df.index.has_duplicates:
-        duplicatesList.append(child.name.upper())
-
-    if get_error_count() >= ERROR_THRESHOLD:
-        break
-
-print_result()
-
-
+    by_check = {}
+    for name, file_issues in issues.items():
+        for issue in file_issues:
+            first = f" from {issue['first']}" if issue["first"] else ""
+            by_check.setdefault(issue["check"], []).append(
+                f"{name.upper().ljust(15)}: {issue['detail']} ({issue['count']}{first})")
+
+    for check, lines in by_check.items():
+        print(f"\n{checkTitles.get(check, check)}")
+        print("\n".join(lines[:ERROR_THRESHOLD]))
+        if len(lines) > ERROR_THRESHOLD:
+            print(f"... {len(lines) - ERROR_THRESHOLD} more")
+
+    print(f"\nTotal files with errors: {len(issues)}")
+
+
+parser = ArgumentParser(prog="diagnostic.py")
+parser.add_argument("--full", action="store_true", help="check every file, even unchanged ones")
+parser.add_argument("--workers", type=int, metavar="int", help="worker processes, default INTEGRITY_WORKERS or all CPUs")
+parser.add_argument("--folder", type=Path, metavar="str", help="folder of the csv files, default the daily folder")
+args = parser.parse_args()
+
+config = Config()
+checker = integrity_checker(
+    config.__dict__,
+    folder=args.folder or config.FOLDER_Daily,
+    state=config.FOLDER_Cache / "integrity.json",
+    report=config.ROOT_Logs / "integrity_report.json")
+if args.workers:
+    checker.workers = args.workers
+
+stats = checker.run(force=args.full)
+print_result(stats.pop("issues"))
+print(f"{stats}\nReport: {checker.report}")
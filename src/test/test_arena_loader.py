@@ -0,0 +1,74 @@
+import gc
+import pickle
+import pandas as pd
+import pytest
+from concurrent.futures import ProcessPoolExecutor
+from src.services.loading.loader.arena_loader import ArenaLoader
+from src.services.loading.loader.trading_csv_loader import TradingCsvLoader
+from src.test.benchmark.synthetic import make_universe, write_csv
+
+COLUMNS = list(ArenaLoader.columns)
+
+
+@pytest.fixture(scope="module")
+def loader(tmp_path_factory) -> TradingCsvLoader:
+    folder = tmp_path_factory.mktemp("daily")
+    universe, _ = make_universe(5, bars=300, seed=8)
+    write_csv(universe, folder)
+    return TradingCsvLoader(dict(DATA_PATH=str(folder)), tf="daily", period=160)
+
+
+@pytest.fixture
+def arena(loader):
+    arena = ArenaLoader(loader, [f"SYN{i:05d}" for i in range(5)] + ["UNKNOWN"])
+    yield arena
+    arena.close()
+
+
+def read_frames(arena: ArenaLoader, symbols: list) -> dict:
+    # copies, views of the block can not be sent back
+    return {symbol: None if (df := arena.get(symbol)) is None else df.copy() for symbol in symbols}
+
+
+def test_get_same_as_loader(arena, loader):
+    for symbol in arena.offsets:
+        pd.testing.assert_frame_equal(arena.get(symbol), loader.get(symbol)[COLUMNS])
+    assert arena.get("UNKNOWN") is None
+
+
+def test_get_in_worker_process(arena, loader):
+    symbols = list(arena.offsets) + ["UNKNOWN"]
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        frames = executor.submit(read_frames, arena, symbols).result()
+    for symbol in arena.offsets:
+        pd.testing.assert_frame_equal(frames[symbol], loader.get(symbol)[COLUMNS])
+    assert frames["UNKNOWN"] is None
+
+
+def test_copy_detaches_when_collected(arena):
+    copy = pickle.loads(pickle.dumps(arena))
+    assert copy.get("SYN00000") is not None
+    shm = copy._shm
+    del copy
+    gc.collect()
+    # closed by the finalizer, the block itself is still there for the owner
+    assert shm.buf is None
+    assert arena.get("SYN00000") is not None
+
+
+def test_symbols_with_other_time_zones(loader):
+    class MixedLoader(TradingCsvLoader):
+        def get(self, symbol):
+            df = super().get(symbol)
+            if df is not None and symbol == "SYN00001":
+                df.index = df.index.tz_convert("America/New_York")
+            return df
+
+    mixed = MixedLoader(dict(DATA_PATH=str(loader.data_path)), tf="daily", period=160)
+    arena = ArenaLoader(mixed, ["SYN00000", "SYN00001"])
+    try:
+        for symbol in ("SYN00000", "SYN00001"):
+            pd.testing.assert_frame_equal(arena.get(symbol), mixed.get(symbol)[COLUMNS])
+        assert str(arena.get("SYN00001").index.tz) == "America/New_York"
+    finally:
+        arena.close()
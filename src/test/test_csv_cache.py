@@ -0,0 +1,68 @@
+import os
+import pandas as pd
+import pytest
+from src.services.loading.csv_cache import CsvCache
+from src.test.benchmark.synthetic import make_universe
+
+
+@pytest.fixture
+def history() -> pd.DataFrame:
+    universe, _ = make_universe(1, bars=300, seed=7)
+    return next(iter(universe.values()))
+
+
+@pytest.fixture
+def cache(tmp_path) -> CsvCache:
+    return CsvCache(tmp_path / "cache")
+
+
+def test_get_same_as_csv(cache, history, tmp_path):
+    file = tmp_path / "SYM.csv"
+    history.to_csv(file)
+    df = cache.get(file)
+    pd.testing.assert_frame_equal(df, CsvCache.read_csv(file))
+    assert cache.path(file).exists()
+    # from the cache file
+    pd.testing.assert_frame_equal(CsvCache(cache.folder).get(file), df)
+
+
+def test_get_rebuilds_when_csv_rewritten(cache, history, tmp_path, monkeypatch):
+    file = tmp_path / "SYM.csv"
+    history.iloc[:200].to_csv(file)
+    cache.get(file)
+    cached = cache.path(file).stat().st_mtime_ns
+
+    read = []
+    read_csv = CsvCache.read_csv
+    monkeypatch.setattr(CsvCache, "read_csv", staticmethod(lambda f: read.append(f) or read_csv(f)))
+    cache.get(file)
+    assert not read
+
+    # more rows
+    history.to_csv(file)
+    pd.testing.assert_frame_equal(cache.get(file), read_csv(file))
+    assert len(read) == 1 and cache.path(file).stat().st_mtime_ns != cached
+
+    # same size, only the mtime changed
+    revised = history.copy()
+    revised.iloc[-1, revised.columns.get_loc("Volume")] += 1
+    assert len(revised.to_csv()) == file.stat().st_size
+    stat = file.stat()
+    revised.to_csv(file)
+    os.utime(file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert cache.get(file)["Volume"].iat[-1] == revised["Volume"].iat[-1]
+    assert len(read) == 2
+
+
+def test_get_missing_or_empty(cache, tmp_path):
+    assert cache.get(tmp_path / "MISSING.csv") is None
+    empty = tmp_path / "EMPTY.csv"
+    empty.touch()
+    assert cache.get(empty) is None
+
+
+def test_get_ignores_unreadable_cache(cache, history, tmp_path):
+    file = tmp_path / "SYM.csv"
+    history.to_csv(file)
+    cache.path(file).write_bytes(b"not an npz")
+    pd.testing.assert_frame_equal(cache.get(file), CsvCache.read_csv(file))
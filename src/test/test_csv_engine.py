@@ -0,0 +1,78 @@
+import logging
+import types
+import numpy as np
+import pandas as pd
+import pytest
+from src.engines.csv_engine import CsvEngine
+
+
+def history(days: int, start: str = "2024-01-02", close: float = 10.0) -> pd.DataFrame:
+    """Daily bars dated like yfinance, midnight New York"""
+    index = pd.bdate_range(start, periods=days, tz="America/New_York", name="Date")
+    values = close + np.arange(days, dtype=float)
+    return pd.DataFrame(dict(Open=values, Close=values, Volume=np.full(days, 100)), index=index)
+
+
+def stored(csv: CsvEngine) -> pd.DataFrame:
+    df = pd.read_csv(csv.Path, index_col=0)
+    df.index = pd.to_datetime(df.index, utc=True).tz_convert("America/New_York")
+    df.index.name = "Date"
+    return df
+
+
+@pytest.fixture
+def csv(tmp_path):
+    config = types.SimpleNamespace(logger=logging.getLogger(__name__))
+    return CsvEngine(config, tmp_path / "daily" / "TEST.csv")
+
+
+def test_append_new_file(csv):
+    df = history(10)
+    assert csv.append_df(df) == 10
+    pd.testing.assert_frame_equal(stored(csv), df, check_freq=False)
+
+
+def test_append_new_and_replaced_dates(csv):
+    csv.append_df(history(10))
+    # the last 2 stored days are replaced, 3 days are added
+    update = history(5, start="2024-01-12", close=50.0)
+    assert csv.append_df(update) == 5
+    expected = pd.concat([history(8), update])
+    pd.testing.assert_frame_equal(stored(csv), expected, check_freq=False)
+    # the same rows again write nothing
+    assert csv.append_df(update) == 0
+
+
+def test_append_older_dates_keeps_later_history(csv):
+    df = history(10)
+    csv.append_df(df)
+    update = history(2, close=50.0)
+    csv.append_df(update)
+    result = stored(csv)
+    assert len(result) == 10
+    pd.testing.assert_frame_equal(result, pd.concat([update, df.iloc[2:]]), check_freq=False)
+
+
+def test_append_older_dates_other_time_of_day(csv):
+    df = history(10)
+    csv.append_df(df)
+    # same days stamped at the open, they replace the stored midnight rows
+    update = history(2, start="2024-01-03", close=50.0)
+    update.index = update.index + pd.Timedelta(hours=9, minutes=30)
+    csv.append_df(update)
+    result = stored(csv)
+    assert len(result) == 10
+    assert result.index.normalize().is_unique
+    pd.testing.assert_frame_equal(result.iloc[1:3], update, check_freq=False)
+    pd.testing.assert_frame_equal(result.drop(result.index[1:3]), df.drop(df.index[1:3]), check_freq=False)
+
+
+def test_append_other_columns_merges(csv):
+    csv.append_df(history(10)[["Open", "Close"]])
+    update = history(3, start="2024-01-12", close=50.0)
+    # 2 stored days replaced, 1 day added
+    assert csv.append_df(update) == 11
+    result = stored(csv)
+    assert list(result.columns) == ["Open", "Close", "Volume"]
+    assert len(result) == 11
+    pd.testing.assert_frame_equal(result.iloc[-3:], update, check_freq=False, check_dtype=False)
@@ -0,0 +1,116 @@
+import os
+import pandas as pd
+import pytest
+from datetime import datetime
+from src.services.loading.csv_index import CsvIndex
+from src.services.loading.csv_tail import read_tail
+from src.test.benchmark.synthetic import make_universe
+
+PERIODS = (1, 20, 160, 1000)
+# mid-week in winter and summer, a Saturday, the last bar, after the last bar
+END_DATES = (None, datetime(2024, 1, 10), datetime(2024, 6, 20), datetime(2024, 3, 9),
+             datetime(2024, 6, 28), datetime(2024, 8, 1))
+
+
+@pytest.fixture
+def history() -> pd.DataFrame:
+    universe, _ = make_universe(1, bars=400, seed=5)
+    return next(iter(universe.values()))
+
+
+@pytest.fixture
+def index(tmp_path) -> CsvIndex:
+    return CsvIndex(tmp_path / "cache")
+
+
+def assert_same_as_rebuilt(index: CsvIndex, file, tmp_path):
+    # read() falls back to read_tail on rows it can not parse, compare the offsets themselves
+    updated = index.update(file)
+    rebuilt = CsvIndex(tmp_path / "rebuilt").update(file)
+    assert (updated.starts == rebuilt.starts).all() and (updated.dates == rebuilt.dates).all()
+    assert (updated.end, updated.tail) == (rebuilt.end, rebuilt.tail)
+
+
+def assert_same_as_read_tail(index: CsvIndex, file):
+    for period in PERIODS:
+        for end_date in END_DATES:
+            expected = read_tail(file, period=period, end_date=end_date)
+            pd.testing.assert_frame_equal(index.read(file, period=period, end_date=end_date), expected)
+
+
+def touch(file, seconds: int):
+    # a rewrite within the same clock tick must still be seen as a change
+    stat = file.stat()
+    os.utime(file, ns=(stat.st_atime_ns, stat.st_mtime_ns + seconds * 1_000_000_000))
+
+
+def test_read_same_as_read_tail(index, history, tmp_path):
+    file = tmp_path / "SYM.csv"
+    history.to_csv(file)
+    assert_same_as_read_tail(index, file)
+    assert index.path(file).exists()
+    # read again from the saved index
+    assert_same_as_read_tail(CsvIndex(index.folder), file)
+
+
+def test_read_before_first_row(index, history, tmp_path):
+    file = tmp_path / "SYM.csv"
+    history.to_csv(file)
+    with pytest.raises(IndexError):
+        index.read(file, end_date=datetime(2020, 1, 1))
+
+
+def test_read_after_append(index, history, tmp_path):
+    file = tmp_path / "SYM.csv"
+    history.iloc[:300].to_csv(file)
+    assert_same_as_read_tail(index, file)
+    indexed = index.update(file)
+
+    with open(file, "a") as f:
+        f.write(history.iloc[300:].to_csv(header=False))
+    touch(file, 1)
+    extended = index.update(file)
+    # only the rows from the last indexed one on were indexed again
+    assert (extended.starts[:300] == indexed.starts).all()
+    assert len(extended.starts) == 400
+    assert_same_as_rebuilt(index, file, tmp_path)
+    assert_same_as_read_tail(index, file)
+
+
+def test_read_after_append_to_row_without_line_end(index, history, tmp_path):
+    file = tmp_path / "SYM.csv"
+    file.write_text(history.iloc[:300].to_csv().rstrip("\n"))
+    index.update(file)
+    with open(file, "a") as f:
+        f.write("\n" + history.iloc[300:].to_csv(header=False))
+    touch(file, 1)
+    assert_same_as_rebuilt(index, file, tmp_path)
+    assert_same_as_read_tail(index, file)
+
+
+def test_read_after_last_row_rewritten(index, history, tmp_path):
+    file = tmp_path / "SYM.csv"
+    history.iloc[:300].to_csv(file)
+    index.update(file)
+
+    # history fetched again with other prices, then new days appended. The file
+    # grew but an earlier row got shorter, every row after it moved
+    revised = history.copy()
+    revised.iloc[299, revised.columns.get_loc("Close")] += 1.5
+    revised.iloc[100, revised.columns.get_loc("Close")] = round(revised["Close"].iat[100], 2)
+    revised.to_csv(file)
+    touch(file, 1)
+    assert_same_as_rebuilt(index, file, tmp_path)
+    assert_same_as_read_tail(index, file)
+    assert index.read(file, period=1, end_date=datetime(2024, 6, 30))["Close"].iat[-1] == revised["Close"].iat[-1]
+
+
+def test_read_after_file_shortened(index, history, tmp_path):
+    file = tmp_path / "SYM.csv"
+    history.to_csv(file)
+    index.update(file)
+    history.iloc[:250].to_csv(file)
+    touch(file, 1)
+    assert_same_as_rebuilt(index, file, tmp_path)
+    assert_same_as_read_tail(index, file)
+    assert len(index.update(file).starts) == 250
@@ -0,0 +1,66 @@
+import mmap
+import pandas as pd
+import pytest
+from datetime import datetime
+from src.services.loading.csv_tail import find_date_end, read_tail
+from src.test.benchmark.reference import chunked_tail
+from src.test.benchmark.synthetic import make_universe, write_csv
+
+PERIODS = (1, 20, 160, 1000)
+# mid-week in winter and summer, a Saturday, a Sunday, the second and the last bar
+END_DATES = (None, datetime(2024, 1, 10), datetime(2024, 6, 20), datetime(2024, 3, 9),
+             datetime(2023, 11, 5), datetime(2022, 12, 20), datetime(2024, 6, 28))
+
+
+@pytest.fixture(scope="module")
+def files(tmp_path_factory) -> list:
+    folder = tmp_path_factory.mktemp("daily")
+    universe, _ = make_universe(3, bars=400, seed=6)
+    write_csv(universe, folder)
+    return sorted(folder.glob("*.csv"))
+
+
+@pytest.mark.parametrize("period", PERIODS)
+@pytest.mark.parametrize("end_date", END_DATES)
+def test_read_tail_same_as_chunked_reader(files, period, end_date):
+    for file in files:
+        pd.testing.assert_frame_equal(read_tail(file, period, end_date), chunked_tail(file, period, end_date))
+
+
+def test_read_tail_end_date_on_weekend(files):
+    # the Friday before is the last row
+    df = read_tail(files[0], period=5, end_date=datetime(2024, 3, 10))
+    assert df.index[-1].date().isoformat() == "2024-03-08" and len(df) == 5
+
+
+def test_read_tail_before_first_row(files):
+    for reader in (read_tail, chunked_tail):
+        with pytest.raises(IndexError):
+            reader(files[0], period=20, end_date=datetime(2020, 1, 1))
+
+
+def test_read_tail_after_last_row(files):
+    # a full period, where the chunked reader returned fewer rows
+    df = read_tail(files[0], period=160, end_date=datetime(2025, 1, 1))
+    pd.testing.assert_frame_equal(df, read_tail(files[0], period=160))
+    assert len(df) == 160
+
+
+def test_read_tail_empty_and_header_only(tmp_path):
+    empty = tmp_path / "EMPTY.csv"
+    empty.touch()
+    assert read_tail(empty) is None
+    header = tmp_path / "HEADER.csv"
+    header.write_text("Date,Open,High,Low,Close,Volume\n")
+    assert read_tail(header).empty
+
+
+def test_find_date_end(files):
+    with open(files[0], "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        header_end = mm.find(b"\n") + 1
+        lines = mm[header_end:].splitlines(keepends=True)
+        for key in (b"2022-01-01", b"2023-06-14", b"2024-03-09", b"2024-06-28", b"2030-01-01"):
+            # start of the first row dated after key
+            after = [i for i, line in enumerate(lines) if line[:10] > key]
+            expected = header_end + sum(map(len, lines[:after[0]])) if after else len(mm)
+            assert find_date_end(mm, header_end, len(mm), key) == expected
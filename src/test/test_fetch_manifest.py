@@ -0,0 +1,107 @@
+import os
+import zlib
+import pandas as pd
+import pytest
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from src.services.fetching.fetch_manifest import FetchManifest, last_close
+
+TZ = ZoneInfo("America/New_York")
+# a Tuesday evening, the last close is the same day at 16:00
+NOW = datetime(2024, 7, 2, 18, 0, tzinfo=TZ)
+
+
+def write_history(file, last: str, days: int = 20):
+    index = pd.bdate_range(end=last, periods=days, tz=TZ, name="Date")
+    pd.DataFrame(dict(Close=range(days)), index=index).to_csv(file)
+    return file
+
+
+def touch(file, seconds: int = 1):
+    stat = file.stat()
+    os.utime(file, ns=(stat.st_atime_ns, stat.st_mtime_ns + seconds * 1_000_000_000))
+
+
+@pytest.fixture
+def manifest(tmp_path) -> FetchManifest:
+    return FetchManifest(tmp_path / "manifest.json", tz=TZ)
+
+
+def test_last_close():
+    assert last_close(NOW, TZ) == datetime(2024, 7, 2, 16, tzinfo=TZ)
+    # before the close, the previous session
+    assert last_close(datetime(2024, 7, 2, 10, tzinfo=TZ), TZ) == datetime(2024, 7, 1, 16, tzinfo=TZ)
+    # on a Sunday, the Friday close
+    assert last_close(datetime(2024, 7, 7, 10, tzinfo=TZ), TZ) == datetime(2024, 7, 5, 16, tzinfo=TZ)
+
+
+def test_scan(tmp_path):
+    file = write_history(tmp_path / "A.csv", "2024-07-02")
+    entry = FetchManifest.scan(file)
+    assert entry["last_date"] == "2024-07-02" and entry["rows"] == 20
+    assert entry["checksum"] == f"{zlib.crc32(file.read_bytes()):08x}"
+    assert (entry["size"], entry["mtime_ns"]) == (file.stat().st_size, file.stat().st_mtime_ns)
+
+    empty = tmp_path / "EMPTY.csv"
+    empty.touch()
+    assert FetchManifest.scan(empty)["last_date"] is None and FetchManifest.scan(empty)["rows"] == 0
+
+
+def test_is_current(manifest, tmp_path):
+    current = write_history(tmp_path / "CUR.csv", "2024-07-02")
+    manifest.record("CUR", current, fetched_at=datetime(2024, 7, 2, 17, tzinfo=TZ))
+    stale = write_history(tmp_path / "OLD.csv", "2024-07-01")
+    manifest.record("OLD", stale, fetched_at=datetime(2024, 7, 2, 9, tzinfo=TZ))
+
+    assert manifest.is_current("CUR", current, NOW)
+    # fetched before the last close
+    assert not manifest.is_current("OLD", stale, NOW)
+    # no entry, no file
+    assert not manifest.is_current("NEW", write_history(tmp_path / "NEW.csv", "2024-07-02"), NOW)
+    assert not manifest.is_current("CUR", tmp_path / "MISSING.csv", NOW)
+
+
+def test_is_current_after_file_changes(manifest, tmp_path):
+    file = write_history(tmp_path / "CUR.csv", "2024-07-02")
+    manifest.record("CUR", file, fetched_at=datetime(2024, 7, 2, 17, tzinfo=TZ))
+
+    # written again with the same rows, only the mtime changed
+    write_history(file, "2024-07-02")
+    touch(file)
+    assert manifest.is_current("CUR", file, NOW)
+    assert manifest.entries["CUR"]["mtime_ns"] == file.stat().st_mtime_ns
+
+    # same size, other rows
+    file.write_bytes(file.read_bytes().replace(b",19\n", b",18\n"))
+    touch(file, 2)
+    assert not manifest.is_current("CUR", file, NOW)
+
+    # rows appended
+    manifest.record("CUR", file, fetched_at=datetime(2024, 7, 2, 17, tzinfo=TZ))
+    with open(file, "a") as f:
+        f.write("2024-07-03 00:00:00-04:00,20\n")
+    assert not manifest.is_current("CUR", file, NOW)
+    assert manifest.last_date("CUR", file) == "2024-07-03"
+
+
+def test_plan(manifest, tmp_path):
+    fetched = datetime(2024, 7, 2, 17, tzinfo=TZ)
+    files = {symbol: tmp_path / f"{symbol}.csv" for symbol in ("CUR", "DAYS", "MONTHS", "MISSING")}
+    manifest.record("CUR", write_history(files["CUR"], "2024-07-02"), fetched_at=fetched)
+    # files changed since their entry or never recorded
+    write_history(files["DAYS"], "2024-06-28")
+    write_history(files["MONTHS"], "2024-03-01")
+
+    groups = manifest.plan(list(files), files, "1d", NOW)
+    assert groups == {"5d": ["DAYS"], "6mo": ["MONTHS"], "1d": ["MISSING"]}
+    # a longer period asked for is kept
+    assert manifest.plan(["DAYS"], files, "1y", NOW) == {"1y": ["DAYS"]}
+
+
+def test_save_and_reload(manifest, tmp_path):
+    file = write_history(tmp_path / "CUR.csv", "2024-07-02")
+    manifest.record("CUR", file, fetched_at=datetime(2024, 7, 2, 17, tzinfo=TZ))
+    manifest.save()
+    reloaded = FetchManifest(manifest.path, tz=TZ)
+    assert reloaded.entries == manifest.entries
+    assert reloaded.is_current("CUR", file, NOW)
@@ -0,0 +1,108 @@
+import json
+import logging
+import threading
+import types
+import pandas as pd
+import pytest
+from src.config import Config
+from src.engine import Engine
+from src.services.fetching.fetching_trading_service import FetchingTradingService
+from src.services.fetching.history_fetcher import HistoryFetcher
+
+SYMBOLS = [f"S{i:02d}" for i in range(10)]
+# never returned by the provider
+MISSING = {"S03", "S07"}
+RETRIES = 3
+
+
+class StubProvider:
+    """Fails the first `failures` requests, then returns every symbol but MISSING"""
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def download(self, symbols, period, timeout):
+        with self.lock:
+            self.calls.append(list(symbols))
+            if len(self.calls) <= self.failures:
+                raise ConnectionError("rate limited")
+        return {
+            symbol: pd.DataFrame({"Close": [1.0]}, index=pd.DatetimeIndex(["2024-01-02"], name="Date"))
+            for symbol in symbols if symbol not in MISSING
+        }
+
+
+@pytest.fixture
+def fetched():
+    saved = {}
+    provider = StubProvider(failures=2)
+    fetcher = HistoryFetcher(
+        provider, save=saved.__setitem__, threads=1, rate=1000, burst=10, batch_size=5,
+        retries=RETRIES, backoff=0, timeout=5)
+    return fetcher.fetch(SYMBOLS, desc="Test"), provider, saved
+
+
+def test_fetch_retries_failed_requests_and_missing_symbols(fetched):
+    stats, provider, saved = fetched
+    # batch 1 fails twice, then returns S00-S04 but S03
+    assert provider.calls[:3] == [SYMBOLS[:5]] * 3
+    # batch 2 returns S05-S09 but S07, which is asked again until the retries are spent
+    assert provider.calls[3:] == [SYMBOLS[5:], ["S07"], ["S07"]]
+    assert sorted(saved) == sorted(set(SYMBOLS) - MISSING)
+
+
+def test_fetch_stats_and_failures(fetched):
+    stats, _, _ = fetched
+    assert stats["symbols"] == 10 and stats["fetched"] == 8 and stats["failed"] == 2
+    failures = stats["failures"]
+    assert set(failures) == MISSING
+    assert all(failure["attempts"] == RETRIES for failure in failures.values())
+    assert all(failure["error"] == "No data returned" for failure in failures.values())
+
+
+def test_fetch_reports_request_errors():
+    fetcher = HistoryFetcher(StubProvider(failures=RETRIES), save=lambda *_: None, batch_size=10,
+                             retries=RETRIES, backoff=0, rate=1000)
+    stats = fetcher.fetch(["S00", "S01"], desc="Test")
+    assert stats["fetched"] == 0 and stats["failed"] == 2
+    assert stats["failures"]["S00"]["error"] == "ConnectionError: rate limited"
+    assert stats["failures"]["S00"]["attempts"] == RETRIES
+
+
+def test_fetch_retries_only_symbols_timing_out():
+    class SlowProvider:
+        """S01 times out on its first request, the others answer"""
+
+        def __init__(self):
+            self.calls = []
+
+        def download(self, symbols, period, timeout):
+            self.calls.append((list(symbols), timeout))
+            first = len(self.calls) == 1
+            return {symbol: pd.DataFrame({"Close": [1.0]}) for symbol in symbols if not (first and symbol == "S01")}
+
+    provider = SlowProvider()
+    fetcher = HistoryFetcher(provider, save=lambda *_: None, batch_size=3, retries=RETRIES, backoff=0,
+                             rate=1000, timeout=5)
+    stats = fetcher.fetch(["S00", "S01", "S02"], desc="Test")
+    # the timeout is the wait for each symbol, whatever the batch size
+    assert provider.calls == [(["S00", "S01", "S02"], 5), (["S01"], 5)]
+    assert stats["fetched"] == 3 and stats["failed"] == 0
+
+
+def test_failure_ledger(fetched, tmp_path):
+    stats, _, _ = fetched
+    config = types.SimpleNamespace(
+        FOLDER_Watch=tmp_path, logger=logging.getLogger(__name__), path_exist=Config.path_exist)
+    service = FetchingTradingService(Engine(config))
+    ledger = tmp_path / "tradings_fetch_failures.json"
+
+    # S00 failed in a previous run, OTHER was not fetched in this one
+    service.update_failure_ledger(["S00", "OTHER"], {"S00": {"error": "old"}, "OTHER": {"error": "old"}})
+    service.update_failure_ledger(SYMBOLS, stats["failures"])
+    data = json.loads(ledger.read_text())
+    assert set(data) == MISSING | {"OTHER"}
+    assert data["S03"]["attempts"] == RETRIES
+    assert data["OTHER"] == {"error": "old"}
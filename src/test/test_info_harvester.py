@@ -0,0 +1,96 @@
+import os
+import json
+import time
+import threading
+import pytest
+from src.services.fetching.info_harvester import InfoHarvester
+
+RETRIES = 3
+
+
+class StubProvider:
+    """Fails the first `failures[symbol]` requests of a symbol, -1 always"""
+
+    def __init__(self, failures: dict = None):
+        self.failures = failures or {}
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def info(self, symbol):
+        with self.lock:
+            self.calls.append(symbol)
+            attempt = self.calls.count(symbol)
+        fails = self.failures.get(symbol, 0)
+        if fails < 0 or attempt <= fails:
+            raise ConnectionError("rate limited")
+        return dict(symbol=symbol, quoteType="EQUITY")
+
+
+def write_info(folder, symbol, info):
+    path = folder / info["quoteType"] / f"{symbol}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(info))
+    return path
+
+
+def harvester(tmp_path, provider, save=None, **kwargs) -> InfoHarvester:
+    folder = tmp_path / "infos"
+    folder.mkdir(exist_ok=True)
+    return InfoHarvester(
+        provider, save=save or (lambda symbol, info: write_info(folder, symbol, info)),
+        folder=folder, checkpoint=tmp_path / "checkpoint.json",
+        rate=1000, burst=10, retries=RETRIES, backoff=0, **kwargs)
+
+
+def test_harvest_retries(tmp_path):
+    provider = StubProvider(dict(FLAKY=2, BAD=-1))
+    stats = harvester(tmp_path, provider).harvest(["A", "FLAKY", "BAD"])
+    assert provider.calls.count("A") == 1
+    assert provider.calls.count("FLAKY") == 3
+    assert provider.calls.count("BAD") == RETRIES
+    assert stats["symbols"] == 3 and stats["fetched"] == 2 and stats["failed"] == 1
+    assert stats["failures"] == {"BAD": "ConnectionError: rate limited"}
+    assert (tmp_path / "infos" / "EQUITY" / "FLAKY.json").exists()
+    assert not (tmp_path / "checkpoint.json").exists()
+
+
+def test_harvest_skips_fresh_infos(tmp_path):
+    folder = tmp_path / "infos"
+    write_info(folder, "FRESH", dict(quoteType="EQUITY"))
+    stale = write_info(folder, "STALE", dict(quoteType="ETF"))
+    old = time.time() - 2 * 86400
+    os.utime(stale, (old, old))
+
+    provider = StubProvider()
+    stats = harvester(tmp_path, provider, ttl=86400).harvest(["FRESH", "STALE", "NEW"])
+    assert sorted(provider.calls) == ["NEW", "STALE"]
+    assert stats["skipped"] == 1 and stats["fetched"] == 2
+
+    # no TTL fetches every symbol
+    provider = StubProvider()
+    harvester(tmp_path, provider, ttl=0).harvest(["FRESH", "STALE"])
+    assert sorted(provider.calls) == ["FRESH", "STALE"]
+
+
+def test_harvest_resumes_from_checkpoint(tmp_path):
+    symbols = [f"S{i}" for i in range(6)]
+    saved = []
+
+    def save(symbol, info):
+        if len(saved) == 3:
+            raise KeyboardInterrupt
+        saved.append(symbol)
+
+    provider = StubProvider(dict(S1=-1))
+    with pytest.raises(KeyboardInterrupt):
+        harvester(tmp_path, provider, save=save, threads=1, checkpoint_every=1).harvest(symbols)
+    state = json.loads((tmp_path / "checkpoint.json").read_text())
+    assert state["done"] == ["S0", "S2", "S3"]
+    assert list(state["failed"]) == ["S1"]
+
+    # the symbols done are not fetched again, even without info files to skip them by TTL
+    provider = StubProvider()
+    stats = harvester(tmp_path, provider, threads=1).harvest(symbols)
+    assert provider.calls == ["S1", "S4", "S5"]
+    assert stats["skipped"] == 3 and stats["fetched"] == 3 and stats["failed"] == 0
+    assert not (tmp_path / "checkpoint.json").exists()
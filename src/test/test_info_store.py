@@ -0,0 +1,78 @@
+import json
+import numpy as np
+import pytest
+from src.services.loading.info_store import InfoStore
+
+
+def info(symbol: str, sector: str = "Technology", cap=1e9) -> dict:
+    return dict(symbol=symbol, quoteType="EQUITY", shortName=f"{symbol} Inc", sector=sector,
+                industry="Software", marketCap=cap, extra=dict(nested=[1, 2]))
+
+
+@pytest.fixture
+def store(tmp_path) -> InfoStore:
+    return InfoStore(tmp_path / "infos.npz")
+
+
+def test_round_trip(store):
+    store.upsert({"BBB": info("BBB"), "AAA": info("AAA", sector="Energy", cap=None)})
+    df = InfoStore(store.path).load(raw=True)
+    assert df.index.tolist() == ["AAA", "BBB"]
+    assert df.loc["AAA", "sector"] == "Energy" and df.loc["BBB", "sector"] == "Technology"
+    assert np.isnan(df.loc["AAA", "marketCap"]) and df.loc["BBB", "marketCap"] == 1e9
+    assert df.loc["AAA", "country"] == ""
+    assert json.loads(df.loc["BBB", "raw"]) == info("BBB")
+    assert "raw" not in InfoStore(store.path).load().columns
+
+    # overwrite a key, keep the others
+    store.upsert({"AAA": info("AAA", sector="Utilities"), "CCC": info("CCC")})
+    df = InfoStore(store.path).load(raw=True)
+    assert df.index.tolist() == ["AAA", "BBB", "CCC"]
+    assert df.loc["AAA", "sector"] == "Utilities"
+    assert json.loads(df.loc["AAA", "raw"])["sector"] == "Utilities"
+
+
+def test_add_buffers_until_flush(store):
+    store.add("AAA", info("AAA"))
+    store.add("BBB", info("BBB"))
+    assert not store.exists()
+    store.flush()
+    assert store.load().index.tolist() == ["AAA", "BBB"]
+    # nothing pending, nothing written
+    stat = store.path.stat().st_mtime_ns
+    store.flush()
+    assert store.path.stat().st_mtime_ns == stat
+
+
+def test_add_flush_every(tmp_path):
+    store = InfoStore(tmp_path / "infos.npz", flush_every=2)
+    store.add("AAA", info("AAA"))
+    assert not store.exists()
+    store.add("BBB", info("BBB"))
+    assert store.load().index.tolist() == ["AAA", "BBB"]
+
+
+def test_flush_reads_the_file_once(store, monkeypatch):
+    loads = []
+    load = InfoStore.load
+    monkeypatch.setattr(InfoStore, "load", lambda self, raw=False: loads.append(raw) or load(self, raw))
+    for i in range(5):
+        store.upsert({f"S{i}": info(f"S{i}")})
+    assert len(loads) == 1
+
+    # written by another store, read again
+    InfoStore(store.path).upsert({"OTHER": info("OTHER")})
+    loads.clear()
+    store.upsert({"S9": info("S9")})
+    assert len(loads) == 1
+    assert store.load().index.tolist() == ["OTHER", "S0", "S1", "S2", "S3", "S4", "S9"]
+
+
+def test_rebuild(store, tmp_path):
+    folder = tmp_path / "infos"
+    (folder / "EQUITY").mkdir(parents=True)
+    (folder / "EQUITY" / "AAA.json").write_text(json.dumps(info("AAA")))
+    (folder / "EQUITY" / "BAD.json").write_text("{not json")
+    store.upsert({"OLD": info("OLD")})
+    store.rebuild(folder)
+    assert store.load().index.tolist() == ["AAA"]
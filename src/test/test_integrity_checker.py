@@ -0,0 +1,140 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from src.services.loading.integrity_checker import IntegrityChecker, check_file, integrity_checker
+
+
+def bars(days: int = 20, start: str = "2024-01-02") -> pd.DataFrame:
+    """Valid daily bars as the fetch service writes them"""
+    index = pd.bdate_range(start, periods=days, tz="America/New_York", name="Date")
+    close = np.linspace(10.0, 12.0, days)
+    return pd.DataFrame(dict(Open=close - 0.1, High=close + 0.5, Low=close - 0.5, Close=close,
+                             Volume=np.full(days, 1000)), index=index)
+
+
+def write(df: pd.DataFrame, file):
+    df.to_csv(file)
+    return file
+
+
+def checks(result: dict) -> dict:
+    return {issue["check"]: (issue["count"], issue["first"]) for issue in result["issues"]}
+
+
+def test_clean_file(tmp_path):
+    result = check_file(write(bars(), tmp_path / "A.csv"))
+    assert result["issues"] == []
+    assert result["rows"] == 20 and result["last_date"] == "2024-01-29"
+    assert result["file"] == "A.csv" and result["size"] == (tmp_path / "A.csv").stat().st_size
+
+
+def test_dates(tmp_path):
+    df = bars()
+    # rows 3 and 4 swapped, row 8 repeated, a gap of 8 business days after row 15
+    df = pd.concat([df.iloc[:3], df.iloc[[4, 3]], df.iloc[5:9], df.iloc[8:9], df.iloc[9:16]])
+    df = pd.concat([df, bars(3, start="2024-02-07")])
+    assert checks(check_file(write(df, tmp_path / "A.csv"))) == dict(
+        order=(1, "2024-01-05"), duplicates=(1, "2024-01-12"), gaps=(1, "2024-02-07"))
+
+
+def test_gap_days(tmp_path):
+    file = write(pd.concat([bars(5), bars(5, start="2024-01-15")]), tmp_path / "A.csv")
+    # 4 business days missing
+    assert check_file(file)["issues"] == []
+    assert checks(check_file(file, gap_days=3)) == dict(gaps=(1, "2024-01-15"))
+
+
+def test_values(tmp_path):
+    df = bars()
+    df.iloc[2, df.columns.get_loc("Close")] = np.nan
+    df.iloc[5, df.columns.get_loc("High")] = df.Low.iloc[5] - 1
+    df.iloc[7, df.columns.get_loc("Volume")] = -1
+    df.iloc[9, df.columns.get_loc("Low")] = df.Close.iloc[9] + 1
+    # a NaN row is only reported as nans
+    assert checks(check_file(write(df, tmp_path / "A.csv"))) == dict(
+        nans=(1, "2024-01-04"), ohlc=(2, "2024-01-09"), negative=(1, "2024-01-11"))
+
+
+def test_unparsable(tmp_path):
+    file = write(bars(3), tmp_path / "A.csv")
+    text = file.read_text().splitlines()
+    text[2] = "not a date," + text[2].split(",", 1)[1]
+    text[3] = text[3].rsplit(",", 1)[0] + ",x"
+    file.write_text("\n".join(text) + "\n")
+    result = check_file(file)
+    issues = checks(result)
+    assert issues["dates"] == (1, "not a date")
+    assert issues["nans"] == (1, "2024-01-04")
+    assert [issue["detail"] for issue in result["issues"] if issue["check"] == "dtype"] == ["Volume is object"]
+    assert result["last_date"] == "2024-01-04"
+
+
+@pytest.mark.parametrize("content, check", [
+    (b"", "read"),
+    (b"Date,Open,High,Low,Close,Volume\n", "empty"),
+    (b"Date,Open,Close\n2024-01-02,1,2\n", "columns"),
+])
+def test_unusable_file(tmp_path, content, check):
+    file = tmp_path / "A.csv"
+    file.write_bytes(content)
+    assert [issue["check"] for issue in check_file(file)["issues"]] == [check]
+
+
+@pytest.fixture
+def folder(tmp_path):
+    folder = tmp_path / "daily"
+    folder.mkdir()
+    write(bars(), folder / "GOOD.csv")
+    bad = bars()
+    bad.iloc[3, bad.columns.get_loc("Volume")] = -5
+    write(bad, folder / "BAD.csv")
+    return folder
+
+
+def checker(folder, **kwargs) -> IntegrityChecker:
+    return IntegrityChecker(folder, folder.parent / "state.json", folder.parent / "report.json", **kwargs)
+
+
+def test_run(folder):
+    stats = checker(folder, workers=1).run()
+    assert (stats["files"], stats["checked"], stats["skipped"], stats["with_issues"]) == (2, 2, 0, 1)
+    assert [issue["check"] for issue in stats["issues"]["BAD.csv"]] == ["negative"]
+    report = json.loads((folder.parent / "report.json").read_text())
+    assert report["files_by_check"] == dict(negative=1)
+    assert report["issues"] == stats["issues"]
+
+
+def test_run_skips_unchanged_files(folder):
+    checker(folder, workers=1).run()
+    stats = checker(folder, workers=1).run()
+    # results of the skipped files are still reported
+    assert (stats["checked"], stats["skipped"], stats["with_issues"]) == (0, 2, 1)
+
+    # fixed, added and deleted files
+    write(bars(), folder / "BAD.csv")
+    write(bars(), folder / "NEW.csv")
+    (folder / "GOOD.csv").unlink()
+    stats = checker(folder, workers=1).run()
+    assert (stats["files"], stats["checked"], stats["skipped"], stats["with_issues"]) == (2, 2, 0, 0)
+    state = json.loads((folder.parent / "state.json").read_text())
+    assert sorted(state["files"]) == ["BAD.csv", "NEW.csv"]
+
+    assert checker(folder, workers=1).run(force=True)["checked"] == 2
+    # results of another gap setting are not used
+    assert checker(folder, workers=1, gap_days=2).run()["checked"] == 2
+
+
+def test_run_in_process_pool(folder):
+    for i in range(6):
+        write(bars(), folder / f"S{i}.csv")
+    serial = checker(folder, workers=1).run(force=True)
+    pooled = checker(folder, workers=2).run(force=True)
+    assert pooled["checked"] == serial["checked"] == 8
+    assert pooled["issues"] == serial["issues"]
+
+
+def test_integrity_checker_settings(folder):
+    checker = integrity_checker(dict(INTEGRITY_WORKERS=3, INTEGRITY_GAP_DAYS=2), folder, folder / "s", folder / "r")
+    assert (checker.workers, checker.gap_days) == (3, 2)
+    assert integrity_checker({}, folder, folder / "s", folder / "r").gap_days == 5
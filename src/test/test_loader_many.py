@@ -0,0 +1,101 @@
+import time
+import threading
+import pandas as pd
+import pytest
+from src.services.loading.loader.abstract_loader import AbstractLoader
+from src.services.loading.loader.trading_csv_loader import TradingCsvLoader
+from src.test.benchmark.synthetic import make_universe, write_csv
+
+SYMBOLS = [f"SYN{i:05d}" for i in range(6)]
+
+
+class DictLoader(AbstractLoader):
+    """Loader of frames held in a dict, only get and close"""
+
+    timeframes = dict(daily="D")
+
+    def __init__(self, frames: dict, tf: str = "daily", end_date=None, period: int = 160):
+        self.frames = frames
+        self.timeframe = tf
+        self.closed = True
+        self.calls = []
+
+    def get(self, symbol):
+        self.calls.append(symbol)
+        return self.frames.get(symbol)
+
+    def close(self):
+        pass
+
+
+class SlowLoader(TradingCsvLoader):
+    """Loads the first symbols slowest, records the symbols started"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.started = []
+        self.lock = threading.Lock()
+
+    def get(self, symbol):
+        with self.lock:
+            self.started.append(symbol)
+        time.sleep(0.05 if symbol in ("SYN00000", "SYN00001") else 0.0)
+        return super().get(symbol)
+
+
+@pytest.fixture(scope="module")
+def folder(tmp_path_factory):
+    folder = tmp_path_factory.mktemp("daily")
+    universe, _ = make_universe(len(SYMBOLS), bars=200, seed=13)
+    write_csv(universe, folder)
+    return folder
+
+
+def test_default_iter_many():
+    frames = {symbol: pd.DataFrame(dict(Close=[float(i)])) for i, symbol in enumerate(SYMBOLS)}
+    loader = DictLoader(frames)
+    symbols = ["SYN00003", "MISSING", "SYN00001", "SYN00003"]
+    items = loader.iter_many(symbols)
+    # lazy, a symbol is loaded when it is asked for
+    assert loader.calls == []
+    assert next(items) == ("SYN00003", frames["SYN00003"])
+    assert loader.calls == ["SYN00003"]
+    assert [(symbol, df is None) for symbol, df in items] == [
+        ("MISSING", True), ("SYN00001", False), ("SYN00003", False)]
+
+    many = loader.get_many(symbols)
+    assert list(many) == ["SYN00003", "MISSING", "SYN00001"]
+    assert many["MISSING"] is None and many["SYN00001"] is frames["SYN00001"]
+
+
+@pytest.mark.parametrize("threads", [1, 3])
+def test_csv_iter_many_in_order(folder, threads):
+    loader = SlowLoader(dict(DATA_PATH=str(folder), LOADER_THREADS=threads), tf="daily")
+    symbols = SYMBOLS + ["MISSING"] + SYMBOLS[:2]
+    items = list(loader.iter_many(symbols))
+    # the first symbols load slowest, they are still yielded first
+    assert [symbol for symbol, _ in items] == symbols
+    for symbol, df in items:
+        if symbol == "MISSING":
+            assert df is None
+        else:
+            pd.testing.assert_frame_equal(df, loader.get(symbol))
+
+    many = loader.get_many(symbols)
+    assert list(many) == SYMBOLS + ["MISSING"]
+    assert many["MISSING"] is None
+
+
+def test_csv_iter_many_bounded(folder):
+    threads = 2
+    loader = SlowLoader(dict(DATA_PATH=str(folder), LOADER_THREADS=threads), tf="daily")
+    symbols = SYMBOLS * 4
+    items = loader.iter_many(symbols)
+    assert next(items)[0] == "SYN00000"
+    # 2 x threads in flight, and one more submitted as the first is yielded
+    assert len(loader.started) <= 2 * threads + 1
+    # closed early, the symbols not started are never loaded
+    items.close()
+    started = len(loader.started)
+    time.sleep(0.1)
+    assert len(loader.started) == started < len(symbols)
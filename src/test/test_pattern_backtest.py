@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+import src.analyses.treading.patterns.pattern_backtest as Backtest
+
+# Closes of 8 daily bars, High and Low are 1 above and below
+CLOSE = [10.0, 10.0, 10.0, 11.0, 9.0, 12.0, 8.0, 13.0]
+HORIZONS = (2, 3)
+
+
+@pytest.fixture(scope="module")
+def bars() -> pd.DataFrame:
+    close = np.array(CLOSE)
+    index = pd.bdate_range("2024-01-01", periods=close.shape[0], tz="America/New_York", name="Date")
+    return pd.DataFrame(dict(Open=close, High=close + 1, Low=close - 1, Close=close, Volume=1000), index=index)
+
+
+def detection(bars: pd.DataFrame, pattern: str, as_of: int, entry: tuple) -> dict:
+    """Pattern dict as the scan returns it, seen as of bar `as_of`, with an entry line
+    from bar 0 to bar 2 at the prices of `entry`"""
+    index = bars.index
+    (y0, y1) = entry
+    return dict(
+        sym="SYN",
+        pattern=pattern,
+        start=index[0],
+        end=index[as_of],
+        df_end=index[as_of],
+        lines=(((index[0], y0), (index[2], y1)),),
+    )
+
+
+def test_backtest_hand_computed(bars):
+    patterns = [
+        # bullish, horizontal entry line at 10.5 broken by the close of bar 3
+        detection(bars, "VCPU", 2, (10.5, 10.5)),
+        # bearish, entry line falling 0.5 a bar, 9.5 at bar 4, broken by its close of 9
+        detection(bars, "DTOP", 2, (11.5, 10.5)),
+        # too close to the last bar for any horizon
+        detection(bars, "VCPU", 6, (10.5, 10.5)),
+    ]
+    result = Backtest.backtest(Backtest.get_detections(patterns), lambda symbol: bars, HORIZONS)
+    bull, bear, late = (result[(result.pattern == p) & (result.as_of == bars.index[i].tz_convert("UTC"))].iloc[0]
+                        for p, i in (("VCPU", 2), ("DTOP", 2), ("VCPU", 6)))
+
+    # from the close of bar 2 at 10: closes 11, 9, 12, highs 12, 10, 13, lows 10, 8, 11
+    assert bull.direction == 1
+    assert bull.base == 10.0
+    assert bull.ret_2 == pytest.approx(-0.1)
+    assert bull.ret_3 == pytest.approx(0.2)
+    assert bull.mfe_2 == pytest.approx(0.2)
+    assert bull.mfe_3 == pytest.approx(0.3)
+    assert bull.mae_2 == pytest.approx(-0.2)
+    assert bull.mae_3 == pytest.approx(-0.2)
+    assert bull.entry == pytest.approx(10.5)
+    assert bull.breakout == 1
+
+    # bearish returns are signed so that a fall is a gain
+    assert bear.direction == -1
+    assert bear.ret_2 == pytest.approx(0.1)
+    assert bear.ret_3 == pytest.approx(-0.2)
+    assert bear.mfe_2 == pytest.approx(0.2)
+    assert bear.mfe_3 == pytest.approx(0.2)
+    assert bear.mae_2 == pytest.approx(-0.2)
+    assert bear.mae_3 == pytest.approx(-0.3)
+    assert bear.entry == pytest.approx(10.5)
+    assert bear.breakout == 2
+
+    # one bar after bar 6, none of the horizons is complete but its close of 13 breaks out
+    for column in ("ret_2", "ret_3", "mfe_2", "mfe_3", "mae_2", "mae_3"):
+        assert np.isnan(late[column]), column
+    assert late.breakout == 1
+
+
+def test_backtest_rejects_empty_horizons(bars):
+    det = Backtest.get_detections([detection(bars, "VCPU", 2, (10.5, 10.5))])
+    with pytest.raises(ValueError):
+        Backtest.backtest(det, lambda symbol: bars, ())
@@ -0,0 +1,155 @@
+import logging
+import numpy as np
+import pandas as pd
+import pytest
+from src.analyses.treading.patterns.method.pattern_detector import PatternDetector
+from src.test.benchmark.reference import rolling_max_min
+from src.test.benchmark.synthetic import make_universe
+
+
+@pytest.fixture(scope="module")
+def detector() -> PatternDetector:
+    return PatternDetector(logging.getLogger(__name__))
+
+
+@pytest.fixture(scope="module")
+def universe() -> dict:
+    universe, _ = make_universe(40, bars=200, seed=3)
+    return universe
+
+
+def with_gaps(df: pd.DataFrame, seed: int) -> pd.DataFrame:
+    """df with a few NaN High and Low, and runs of equal highs and lows"""
+    rng = np.random.default_rng(seed)
+    df = df.copy()
+    size = df.shape[0]
+    df.loc[rng.random(size) < 0.03, "High"] = np.nan
+    df.loc[rng.random(size) < 0.03, "Low"] = np.nan
+    df["High"] = df["High"].round(0)
+    df["Low"] = df["Low"].round(0)
+    return df
+
+
+def assert_same_pivots(result: pd.DataFrame, expected: pd.DataFrame):
+    # the loop sorted with an unstable sort, a bar that is both a pivot high
+    # and a pivot low may come in either order
+    def rows(pivots: pd.DataFrame) -> pd.DataFrame:
+        return pivots.reset_index().sort_values(list(pivots.index.names) + ["P"], kind="stable", ignore_index=True)
+
+    pd.testing.assert_frame_equal(rows(result), rows(expected))
+
+
+@pytest.mark.parametrize("bars_left, bars_right", [(6, 6), (3, 5), (1, 1)])
+def test_get_max_min_matches_rolling_loop(detector, universe, bars_left, bars_right):
+    for i, df in enumerate(universe.values()):
+        for frame in (df, with_gaps(df, i)):
+            expected = rolling_max_min(frame, bars_left, bars_right)
+            result = detector.get_max_min(frame, bars_left, bars_right)
+            assert_same_pivots(result, expected)
+
+
+@pytest.mark.parametrize("bars_left, bars_right", [(6, 6), (2, 3)])
+def test_get_max_min_short_frames(detector, universe, bars_left, bars_right):
+    # frames shorter than a window have no pivot, one window long have at most one of each
+    df = next(iter(universe.values()))
+    window = bars_left + 1 + bars_right
+    for size in range(window + 3):
+        frame = df.iloc[:size]
+        expected = rolling_max_min(frame, bars_left, bars_right)
+        result = detector.get_max_min(frame, bars_left, bars_right)
+        assert result.shape[0] == expected.shape[0]
+        if size < window:
+            assert result.empty
+        else:
+            assert_same_pivots(result, expected)
+
+
+def test_get_suffix_extrema_matches_pandas(detector):
+    # the finders used series.loc[idx:].max() and .idxmax(), which skip NaN
+    rng = np.random.default_rng(5)
+    for size in range(40):
+        values = rng.integers(0, 6, size).astype(float)
+        values[rng.random(size) < 0.25] = np.nan
+        if size > 3:
+            values[-2:] = np.nan
+        ext = detector.get_suffix_extrema(values)
+        series = pd.Series(values)
+        for i in range(size):
+            suffix = series.iloc[i:]
+            if suffix.isna().all():
+                # no position of values, so no bar is the max or min of an all NaN suffix
+                assert np.isnan(ext.max[i]) and np.isnan(ext.min[i])
+                assert ext.max_pos[i] == size and ext.min_pos[i] == size
+                continue
+            assert ext.max[i] == suffix.max() and ext.max_pos[i] == suffix.idxmax()
+            assert ext.min[i] == suffix.min() and ext.min_pos[i] == suffix.idxmin()
+
+
+@pytest.fixture
+def cached(tmp_path, monkeypatch):
+    """Detector persisting pivots in tmp_path, with the lengths of the frames get_max_min scanned"""
+    detector = PatternDetector(logging.getLogger(__name__), pivot_folder=tmp_path)
+    scanned = []
+    get_max_min = detector.get_max_min
+
+    def spy(df, *args, **kwargs):
+        scanned.append(df.shape[0])
+        return get_max_min(df, *args, **kwargs)
+
+    monkeypatch.setattr(detector, "get_max_min", spy)
+    return detector, scanned
+
+
+def assert_incremental(detector, frame: pd.DataFrame, bars_left=6, bars_right=6):
+    result = detector.get_max_min_incremental(frame, "SYM_daily", bars_left, bars_right)
+    expected = PatternDetector(logging.getLogger(__name__)).get_max_min(frame, bars_left, bars_right)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+@pytest.mark.parametrize("bars_left, bars_right", [(6, 6), (2, 4)])
+def test_incremental_appended_bars(cached, universe, bars_left, bars_right):
+    detector, scanned = cached
+    df = next(iter(universe.values()))
+    # cold cache, then a scan window moving on by a few bars per call
+    for end in range(100, 201, 9):
+        frame = df.iloc[end - 80:end]
+        assert_incremental(detector, frame, bars_left, bars_right)
+        # only the first call scans the whole frame
+        assert (scanned[-1] == 80) == (end == 100)
+    assert (detector.pivot_folder / f"SYM_daily_{bars_left}_{bars_right}.json").exists()
+
+
+def test_incremental_revised_last_bar(cached, universe):
+    detector, scanned = cached
+    df = next(iter(universe.values()))
+    assert_incremental(detector, df.iloc[:120])
+    # the last stored bar changed, e.g. an intraday fetch replaced by the close
+    frame = df.iloc[:130].copy()
+    frame.iloc[119, frame.columns.get_loc("High")] += 5.0
+    assert_incremental(detector, frame)
+    assert scanned[-1] == 130
+
+
+def test_incremental_back_dated_and_shorter_frames(cached, universe):
+    detector, scanned = cached
+    df = next(iter(universe.values()))
+    assert_incremental(detector, df.iloc[50:150])
+    # back-dated, the last stored bar is not in the frame
+    assert_incremental(detector, df.iloc[50:120])
+    assert scanned[-1] == 70
+    # starts before the stored first bar
+    assert_incremental(detector, df.iloc[20:120])
+    assert scanned[-1] == 100
+    # shorter frame ending on the stored last bar
+    assert_incremental(detector, df.iloc[80:120])
+    assert scanned[-1] < 40
+    # shorter than a window
+    assert_incremental(detector, df.iloc[110:120])
+
+
+def test_incremental_unreadable_state(cached, universe):
+    detector, scanned = cached
+    df = next(iter(universe.values()))
+    (detector.pivot_folder / "SYM_daily_6_6.json").write_text("{not json")
+    assert_incremental(detector, df.iloc[:100])
+    assert scanned[-1] == 100
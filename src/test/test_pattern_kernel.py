@@ -0,0 +1,60 @@
+import logging
+import pandas as pd
+import pytest
+import src.analyses.treading.patterns.pattern as Pattern
+import src.analyses.treading.patterns.pattern_kernel as Kernel
+from src.analyses.treading.patterns.method.pattern_detector import PatternDetector
+from src.test.benchmark.synthetic import make_universe
+
+# Bars of each scanned window, the loader's default period
+PERIOD = 160
+# Windows of each symbol, ending this many bars before the last one
+ENDS = (0, 7, 23, 51)
+
+FINDERS = [key for key, fn in Pattern.get_pattern_dict().items() if callable(fn)]
+
+
+@pytest.fixture(scope="module")
+def detector() -> PatternDetector:
+    return PatternDetector(logging.getLogger(__name__))
+
+
+@pytest.fixture(scope="module")
+def windows(detector) -> list:
+    """(symbol, bars, pivots, arrays) of every window of a synthetic universe"""
+    universe, _ = make_universe(120, bars=PERIOD + max(ENDS), seed=11)
+    windows = []
+    for symbol, df in universe.items():
+        for end in ENDS:
+            frame = df.iloc[df.shape[0] - end - PERIOD:df.shape[0] - end]
+            pivots = detector.get_max_min(frame)
+            windows.append((symbol, frame, pivots, Kernel.get_pattern_arrays(detector, frame, pivots)))
+    return windows
+
+
+def run(fn, *args):
+    """Result of a finder, or the type of the exception it raised"""
+    try:
+        return fn(*args)
+    except Exception as e:
+        return type(e)
+
+
+def test_every_finder_has_an_array_twin():
+    assert set(FINDERS) == {key for key, fn in Pattern.get_pattern_dict("array").items() if callable(fn)}
+
+
+@pytest.mark.parametrize("key", FINDERS)
+def test_array_finder_matches_pandas_finder(detector, windows, key):
+    pandas_fn = Pattern.get_pattern_dict("pandas")[key]
+    array_fn = Pattern.get_pattern_dict("array")[key]
+    found = 0
+    for symbol, frame, pivots, arrays in windows:
+        expected = run(pandas_fn, detector, symbol, frame, pivots)
+        assert run(array_fn, detector, symbol, frame, pivots) == expected, symbol
+        assert run(array_fn, detector, symbol, frame, pivots, arrays) == expected, symbol
+        # the pandas finders take the shared features of the scan too
+        assert run(pandas_fn, detector, symbol, frame, pivots, arrays) == expected, symbol
+        found += isinstance(expected, dict)
+    # the universe has patterns to find, the finders are not only compared on None
+    assert found > 0
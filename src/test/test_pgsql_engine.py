@@ -0,0 +1,100 @@
+import logging
+import types
+import pandas as pd
+import pytest
+from src.engines.pgsql_engine import PgSqlEngine
+
+TABLE = "test_symbol"
+
+
+@pytest.fixture
+def engine(db_conn, tmp_path):
+    config = types.SimpleNamespace(DB_CONN=db_conn, ROOT_Logs=tmp_path, logger=logging.getLogger(__name__))
+    engine = PgSqlEngine(config)
+    with engine.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        cursor.execute(f"""
+            CREATE TABLE {TABLE} (
+                symbol      varchar(20) PRIMARY KEY,
+                name        text,
+                asset_type  integer     NOT NULL,
+                ipo_date    date,
+                market_cap  double precision
+            )""")
+    yield engine
+    with engine.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+def rows(engine) -> dict:
+    with engine.cursor() as cursor:
+        cursor.execute(f"SELECT symbol, name, asset_type, ipo_date::text FROM {TABLE} ORDER BY symbol")
+        return {row[0]: row[1:] for row in cursor.fetchall()}
+
+
+def symbols(count: int, name: str = "first") -> pd.DataFrame:
+    return pd.DataFrame(dict(
+        symbol=[f"S{i:03d}" for i in range(count)],
+        name=[f"{name} {i}" for i in range(count)],
+        asset_type=[1] * count,
+        ipo_date=["2001-02-03"] * count,
+    ))
+
+
+def test_bulk_upsert_inserts_then_merges(engine, tmp_path):
+    metrics = engine.bulk_upsert(TABLE, symbols(10), key_columns=["symbol"], batch_size=3)
+    assert metrics["rows"] == 10 and metrics["merged"] == 10
+    assert metrics["duplicates"] == 0 and metrics["rejected"] == 0
+    assert rows(engine)["S004"] == ("first 4", 1, "2001-02-03")
+
+    # S005 to S014: 5 existing rows updated, 5 new rows, S014 twice keeps its last row
+    update = pd.concat([symbols(15, "second").iloc[5:], symbols(15, "last").iloc[[14]]], ignore_index=True)
+    metrics = engine.bulk_upsert(TABLE, update, key_columns=["symbol"], batch_size=4)
+    assert metrics["rows"] == 11 and metrics["duplicates"] == 1 and metrics["merged"] == 10
+    stored = rows(engine)
+    assert len(stored) == 15
+    assert stored["S004"][0] == "first 4"
+    assert stored["S005"][0] == "second 5"
+    assert stored["S014"][0] == "last 14"
+    assert not (tmp_path / f"{TABLE}_rejects.csv").exists()
+
+
+def test_bulk_upsert_isolates_bad_rows(engine, tmp_path):
+    df = symbols(20)
+    # an unparsable date and a missing NOT NULL value, in different COPY batches
+    df.loc[3, "ipo_date"] = "not a date"
+    df.loc[13, "asset_type"] = None
+    reject_path = tmp_path / "rejects.csv"
+    metrics = engine.bulk_upsert(TABLE, df, key_columns=["symbol"], batch_size=8, reject_path=reject_path)
+
+    assert metrics["rows"] == 20 and metrics["rejected"] == 2 and metrics["merged"] == 18
+    stored = rows(engine)
+    assert "S003" not in stored and "S013" not in stored
+    assert len(stored) == 18
+
+    rejects = pd.read_csv(reject_path)
+    assert rejects["symbol"].tolist() == ["S003", "S013"]
+    assert rejects["error"].str.len().gt(0).all()
+
+    # a clean load removes the rejects of the previous one
+    engine.bulk_upsert(TABLE, symbols(2), key_columns=["symbol"], reject_path=reject_path)
+    assert not reject_path.exists()
+
+
+def test_bulk_upsert_keeps_float_columns(engine, tmp_path):
+    df = symbols(4)
+    # asset_type gets float with a missing value, market_cap holds whole and huge floats
+    df["asset_type"] = [1, 2, None, 3]
+    df["market_cap"] = [1e20, 2.0, 2.5, None]
+    metrics = engine.bulk_upsert(TABLE, df, key_columns=["symbol"], reject_path=tmp_path / "rejects.csv")
+    assert metrics["merged"] == 3 and metrics["rejected"] == 1
+    with engine.cursor() as cursor:
+        cursor.execute(f"SELECT symbol, asset_type, market_cap FROM {TABLE} ORDER BY symbol")
+        assert cursor.fetchall() == [("S000", 1, 1e20), ("S001", 2, 2.0), ("S003", 3, None)]
+
+    # decimals or out of range in an integer column are rejected, not cast
+    df = symbols(2, "second")
+    df["asset_type"] = [1.5, 1e20]
+    metrics = engine.bulk_upsert(TABLE, df, key_columns=["symbol"], reject_path=tmp_path / "rejects.csv")
+    assert metrics["rejected"] == 2
+    assert rows(engine)["S000"][0] == "first 0"
@@ -0,0 +1,58 @@
+import pandas as pd
+import pytest
+from datetime import datetime
+from src.services.loading.loader.pgsql_loader import PgSqlLoader
+from src.services.loading.loader.trading_csv_loader import TradingCsvLoader
+from src.test.benchmark.synthetic import make_universe, write_csv
+
+TABLE = "test_ohlcv_daily"
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+# end of the file, winter and summer dates of an open day, a winter month end
+END_DATES = (None, datetime(2024, 1, 10), datetime(2024, 6, 20), datetime(2024, 1, 31))
+
+
+@pytest.fixture(scope="module")
+def folders(db_conn, tmp_path_factory):
+    """Daily CSV files of a synthetic universe, imported into TABLE"""
+    folder = tmp_path_factory.mktemp("daily")
+    universe, _ = make_universe(6, bars=400, seed=4)
+    write_csv(universe, folder)
+    loader = PgSqlLoader(dict(DB_CONN=db_conn, DB_OHLCV_TABLE=TABLE))
+    loader._execute(f"DROP TABLE IF EXISTS {TABLE}")
+    loader.create_schema()
+    assert loader.import_csv(sorted(folder.glob("*.csv"))) == 6 * 400
+    yield folder, list(universe)
+    loader._execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+def loaders(db_conn, folder, tf, end_date, period=160):
+    csv = TradingCsvLoader(dict(DATA_PATH=str(folder)), tf=tf, end_date=end_date, period=period)
+    pgsql = PgSqlLoader(dict(DB_CONN=db_conn, DB_OHLCV_TABLE=TABLE), tf=tf, end_date=end_date, period=period)
+    return csv, pgsql
+
+
+@pytest.mark.parametrize("end_date", END_DATES)
+def test_daily_same_as_csv_loader(db_conn, folders, end_date):
+    folder, symbols = folders
+    csv, pgsql = loaders(db_conn, folder, "daily", end_date)
+    frames = pgsql.get_many(symbols)
+    for symbol in symbols:
+        expected = csv.get(symbol)[COLUMNS]
+        pd.testing.assert_frame_equal(frames[symbol], expected, check_freq=False)
+
+
+@pytest.mark.parametrize("end_date", (None, datetime(2024, 1, 10)))
+def test_weekly_same_as_csv_loader(db_conn, folders, end_date):
+    folder, symbols = folders
+    csv, pgsql = loaders(db_conn, folder, "weekly", end_date, period=20)
+    for symbol, df in pgsql.iter_many(symbols):
+        expected = csv.get(symbol)[COLUMNS]
+        # the csv loader reads 7 days per week, its oldest weeks are partial
+        pd.testing.assert_frame_equal(df.iloc[1:], expected.iloc[-len(df) + 1:], check_freq=False)
+
+
+def test_unknown_symbol(db_conn, folders):
+    folder, symbols = folders
+    _, pgsql = loaders(db_conn, folder, "daily", None)
+    assert pgsql.get("UNKNOWN") is None
+    assert set(pgsql.get_many([symbols[0], "UNKNOWN"])) == {symbols[0], "UNKNOWN"}
@@ -0,0 +1,104 @@
+import threading
+import multiprocessing
+import pytest
+from src.engines.pgsql_engine import PgSqlPool, close_pools, get_pool
+
+
+def backend_pid(conn) -> int:
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT pg_backend_pid()")
+        return cursor.fetchone()[0]
+
+
+@pytest.fixture
+def pool(db_conn):
+    pool = PgSqlPool(maxconn=2, ping_after=0.0, **{k: v for k, v in db_conn.items() if v is not None})
+    yield pool
+    pool.closeall()
+
+
+def test_connection_limit(pool):
+    held = threading.Semaphore(0)
+    release = threading.Event()
+    got_third = threading.Event()
+
+    def hold():
+        with pool.connection():
+            held.release()
+            release.wait()
+
+    def third():
+        with pool.connection():
+            got_third.set()
+
+    holders = [threading.Thread(target=hold) for _ in range(2)]
+    for thread in holders:
+        thread.start()
+    for _ in holders:
+        assert held.acquire(timeout=5)
+    waiter = threading.Thread(target=third)
+    waiter.start()
+    # both connections in use, the third caller waits
+    assert not got_third.wait(0.5)
+    release.set()
+    assert got_third.wait(5)
+    for thread in holders + [waiter]:
+        thread.join()
+
+
+def test_connections_reused(pool):
+    with pool.connection() as conn:
+        first = backend_pid(conn)
+    with pool.connection() as conn:
+        assert backend_pid(conn) == first
+
+
+def test_reconnect_after_server_dropped_connection(pool, db_conn):
+    with pool.connection() as conn:
+        dropped = backend_pid(conn)
+    # the server ends the idle connection, e.g. idle timeout or restart
+    other = PgSqlPool(maxconn=1, ping_after=60.0, **{k: v for k, v in db_conn.items() if v is not None})
+    try:
+        with other.connection() as conn, conn.cursor() as cursor:
+            cursor.execute("SELECT pg_terminate_backend(%s)", (dropped,))
+    finally:
+        other.closeall()
+    # idle longer than ping_after, the ping fails and a new connection is opened
+    with pool.connection() as conn:
+        assert backend_pid(conn) != dropped
+
+
+def test_rollback_on_error(pool):
+    with pytest.raises(ZeroDivisionError):
+        with pool.connection() as conn, conn.cursor() as cursor:
+            cursor.execute("CREATE TEMP TABLE test_pool_rollback (id int)")
+            1 / 0
+    with pool.connection() as conn, conn.cursor() as cursor:
+        cursor.execute("SELECT to_regclass('pg_temp.test_pool_rollback')")
+        assert cursor.fetchone()[0] is None
+
+
+def _child_backend(db_conn: dict, queue):
+    with get_pool(db_conn).connection() as conn:
+        queue.put(backend_pid(conn))
+
+
+def test_pool_rebuilt_after_fork(db_conn):
+    pool = get_pool(db_conn)
+    try:
+        with pool.connection() as conn:
+            parent = backend_pid(conn)
+        context = multiprocessing.get_context("fork")
+        queue = context.Queue()
+        child = context.Process(target=_child_backend, args=(db_conn, queue))
+        child.start()
+        child_backend = queue.get(timeout=30)
+        child.join(30)
+        assert child.exitcode == 0
+        # the child opened its own connection and left the parent's open
+        assert child_backend != parent
+        assert get_pool(db_conn) is pool
+        with pool.connection() as conn:
+            assert backend_pid(conn) == parent
+    finally:
+        close_pools()
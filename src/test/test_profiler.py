@@ -0,0 +1,84 @@
+import time
+import pstats
+import cProfile
+from src.utilities.profiler import collapsed_stacks, ProcessProfiler
+
+
+def spin(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def toy():
+    spin(0.02)
+    for _ in range(3):
+        busy()
+
+
+def busy():
+    total = 0
+    for i in range(200_000):
+        total += i
+    return total
+
+
+def profiled(function) -> pstats.Stats:
+    profile = cProfile.Profile()
+    profile.runcall(function)
+    return pstats.Stats(profile)
+
+
+def stack_of(stacks: dict, name: str) -> str:
+    found = [stack for stack in stacks if stack.split(";")[-1].startswith(f"{name} (")]
+    assert len(found) == 1, found
+    return found[0]
+
+
+def test_own_time_on_its_stack():
+    stats = profiled(toy)
+    stacks = collapsed_stacks(stats)
+    raw = {func[2]: value for func, value in stats.stats.items()}
+
+    # the loop of busy is its own time, under toy
+    busy_stack = stack_of(stacks, "busy")
+    assert busy_stack.split(";")[-2].startswith("toy (test_profiler.py:")
+    assert stacks[busy_stack] == int(raw["busy"][2] * 1e6)
+    # perf_counter is a built-in, labelled by its name only
+    assert f"{stack_of(stacks, 'spin')};<built-in method time.perf_counter>" in stacks
+
+    # every stack adds up to the profiled time, but for rounding
+    assert abs(sum(stacks.values()) - stats.total_tt * 1e6) <= len(stacks)
+
+
+def test_time_split_between_callers():
+    def first():
+        spin(0.03)
+
+    def second():
+        spin(0.01)
+
+    def both():
+        first()
+        second()
+
+    stacks = collapsed_stacks(profiled(both))
+    first_us = sum(us for stack, us in stacks.items() if ";first (" in stack and ";spin (" in stack)
+    second_us = sum(us for stack, us in stacks.items() if ";second (" in stack and ";spin (" in stack)
+    assert first_us > 2 * second_us > 0
+
+
+def test_min_share_leaves_out_small_stacks():
+    stats = profiled(toy)
+    assert all(";busy (" not in stack for stack in collapsed_stacks(stats, min_share=0.9))
+
+
+def test_process_profiler(tmp_path):
+    profiler = ProcessProfiler(tmp_path / "profile")
+    profiler.start()
+    toy()
+    profiler.stop()
+    files = {file.name for file in (tmp_path / "profile").iterdir()}
+    assert {"merged.prof", "report.txt", "collapsed.txt"} <= files
+    assert "Profile of 1 processes, 1 main and 0 workers" in (tmp_path / "profile" / "report.txt").read_text()
+    assert any(";busy (" in line for line in (tmp_path / "profile" / "collapsed.txt").read_text().splitlines())
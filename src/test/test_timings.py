@@ -0,0 +1,66 @@
+import pytest
+from src.utilities.timings import Timings
+
+
+def snapshot(stages: dict, counters: dict) -> dict:
+    timings = Timings(enabled=True)
+    for name, seconds in stages.items():
+        for s in seconds:
+            timings.add(name, s)
+    for name, n in counters.items():
+        timings.count(name, n)
+    return timings.drain()
+
+
+def test_disabled_records_nothing():
+    timings = Timings()
+    with timings.time("stage"):
+        pass
+    timings.count("symbols")
+    assert timings.drain() == dict(stages={}, counters={})
+
+
+def test_time_and_count():
+    timings = Timings(enabled=True)
+    for _ in range(3):
+        with timings.time("stage"):
+            pass
+    timings.count("symbols", 2)
+    timings.count("symbols")
+    calls, total, longest = timings.stages["stage"]
+    assert calls == 3 and 0 <= longest <= total
+    assert timings.counters == dict(symbols=3)
+
+
+def test_drain_resets():
+    timings = Timings(enabled=True)
+    timings.add("stage", 0.5)
+    timings.count("symbols")
+    assert timings.drain() == dict(stages=dict(stage=[1, 0.5, 0.5]), counters=dict(symbols=1))
+    assert timings.drain() == dict(stages={}, counters={})
+    # still enabled after a drain
+    timings.count("symbols")
+    assert timings.counters == dict(symbols=1)
+
+
+def test_merge_sums_calls_and_totals_keeps_max():
+    timings = Timings(enabled=True)
+    timings.merge(snapshot(dict(load=[0.1, 0.3], scan=[1.0]), dict(symbols=2)))
+    timings.merge(snapshot(dict(load=[0.2], plot=[0.5]), dict(symbols=1, patterns=4)))
+    timings.merge(None)
+    assert timings.stages["load"] == [3, pytest.approx(0.6), 0.3]
+    assert timings.stages["scan"] == [1, 1.0, 1.0]
+    assert timings.stages["plot"] == [1, 0.5, 0.5]
+    assert timings.counters == dict(symbols=3, patterns=4)
+
+
+def test_to_dict():
+    timings = Timings(enabled=True)
+    timings.merge(snapshot(dict(load=[0.1, 0.3], scan=[0.6]), dict(symbols=2)))
+    data = timings.to_dict()
+    # by total time, longest first
+    assert list(data["stages"]) == ["scan", "load"]
+    assert data["stages"]["load"] == dict(calls=2, seconds=0.4, mean_ms=200.0, max_ms=300.0, share=0.4)
+    assert data["stages"]["scan"]["share"] == 0.6
+    assert data["counters"] == dict(symbols=2)
+    assert Timings().to_dict() == dict(stages={}, counters={})
@@ -0,0 +1,140 @@
+import json
+import logging
+import numpy as np
+import pandas as pd
+import pytest
+from datetime import datetime
+from types import SimpleNamespace
+from src.engine import Engine
+from src.service import Service
+from src.utilities.timings import TIMINGS
+import src.analyses.treading.trading_analyse as Analyse
+from src.analyses.treading.trading_analyse import TradingAnalyse
+from src.test.benchmark.synthetic import make_universe, write_csv
+
+SYMBOLS = [f"SYN{i:05d}" for i in range(6)]
+# last bar of the synthetic universe, a Friday
+LAST = datetime(2024, 6, 28)
+
+
+@pytest.fixture(scope="module")
+def folder(tmp_path_factory):
+    folder = tmp_path_factory.mktemp("daily")
+    universe, _ = make_universe(len(SYMBOLS), bars=300, seed=0)
+    write_csv(universe, folder)
+    return folder
+
+
+@pytest.fixture(autouse=True)
+def worker_state():
+    # the scan functions run in this process too, leave no settings behind
+    yield
+    Analyse._scan_settings.clear()
+    TIMINGS.reset(enabled=False)
+
+
+def make_analyse(folder, tmp_path, date=None, **config) -> TradingAnalyse:
+    config = SimpleNamespace(
+        logger=logging.getLogger(__name__),
+        DATA_PATH=str(folder),
+        ROOT_Logs=tmp_path,
+        FOLDER_States=tmp_path,
+        **config)
+    args = SimpleNamespace(tf="daily", date=date, left=6, right=6, file=None, pattern="all", save=None)
+    return TradingAnalyse(Service(Engine(config)), args)
+
+
+def found(patterns: list) -> list:
+    return sorted((dct["sym"], dct["pattern"], str(dct["start"])) for dct in patterns)
+
+
+def test_chunk_size(folder, tmp_path, monkeypatch):
+    assert make_analyse(folder, tmp_path, SCAN_CHUNK_SIZE=7)._get_chunk_size(1000) == 7
+    analyse = make_analyse(folder, tmp_path)
+    monkeypatch.setattr(Analyse.os, "cpu_count", lambda: 2)
+    # about 4 batches per worker, at least 1 and at most 64 symbols
+    assert analyse._get_chunk_size(80) == 10
+    assert analyse._get_chunk_size(3) == 1
+    assert analyse._get_chunk_size(100_000) == 64
+
+
+@pytest.mark.parametrize("timings", [False, True])
+def test_scan_batch(folder, tmp_path, timings):
+    analyse = make_analyse(folder, tmp_path)
+    fns = analyse._get_functions("all")
+    Analyse._init_scan_worker(dict(analyse._scan_worker_settings(fns, analyse.loader), timings=timings))
+    patterns, timing = Analyse._scan_batch(SYMBOLS + ["MISSING"])
+
+    expected = []
+    for symbol in SYMBOLS:
+        expected.extend(Analyse._scan_symbol(
+            symbol, analyse.loader.get(symbol), fns, analyse.loader, analyse.PatternDetector, analyse._logger))
+    assert patterns and found(patterns) == found(expected)
+    assert timing["symbols"] == len(SYMBOLS) + 1 and timing["seconds"] > 0
+    if timings:
+        assert timing["stages"]["counters"]["symbols"] == len(SYMBOLS) + 1
+        assert timing["stages"]["stages"]["loader.get"][0] == len(SYMBOLS) + 2
+    else:
+        assert "stages" not in timing
+
+
+def test_scan_in_batches(folder, tmp_path):
+    analyse = make_analyse(folder, tmp_path, SCAN_CHUNK_SIZE=4, SCAN_TIMINGS=True)
+    patterns = analyse.process_by_pattern_name(SYMBOLS, "all", [])
+    # the last entry is the scan settings, not a pattern
+    assert patterns.pop() == dict(timeframe="daily", end_date=None)
+
+    single = make_analyse(folder, tmp_path, SCAN_CHUNK_SIZE=len(SYMBOLS))
+    assert found(patterns) == found(single.process_by_pattern_name(SYMBOLS, "all", [])[:-1])
+    assert sorted(t["symbols"] for t in analyse.batch_timings) == [2, 4]
+
+    # stages of every batch are merged into the report
+    report = json.loads((tmp_path / "scan_timings.json").read_text())
+    assert report["counters"]["symbols"] == len(SYMBOLS)
+    assert report["counters"]["patterns"] == len(patterns)
+
+
+def walk_reference(analyse: TradingAnalyse, start: datetime, step: int, bars: int) -> list:
+    """Detections of a regular scan of the last `bars` bars as of every step-th bar from start"""
+    detector, fns = analyse.PatternDetector, analyse._get_functions("all")
+    found = []
+    for symbol in SYMBOLS:
+        df = analyse.loader_class(dict(DATA_PATH=analyse._config.DATA_PATH), end_date=LAST, period=1000).get(symbol)
+        for end in range(df.index.searchsorted(pd.Timestamp(start).tz_localize(df.index.tz)), len(df), step):
+            frame = df.iloc[max(0, end - bars + 1):end + 1]
+            pivots = detector.get_max_min(frame)
+            for fn in fns:
+                result = fn(detector, symbol, frame, pivots)
+                if result:
+                    found.append((symbol, result["pattern"], frame.index[-1].value, pd.Timestamp(result["start"]).value))
+    return sorted(found)
+
+
+def test_walk_forward(folder, tmp_path):
+    start = datetime(2024, 5, 1)
+    analyse = make_analyse(folder, tmp_path, date=LAST, SCAN_CHUNK_SIZE=4)
+    df = analyse.process_walk_forward(SYMBOLS, "all", [], start=start, step=3, bars=120)
+
+    file = tmp_path / "walk_symbols_all_daily_20240501_20240628.npz"
+    with np.load(file) as npz:
+        assert set(npz.files) == {"timeframe", *TradingAnalyse.walk_columns}
+        assert str(npz["timeframe"]) == "daily"
+        assert npz["as_of"].dtype == np.int64 and npz["entry_y0"].dtype == np.float64
+        walk = sorted(zip(npz["sym"].tolist(), npz["pattern"].tolist(), npz["as_of"].tolist(), npz["start"].tolist()))
+        as_of = npz["as_of"]
+    # the same detections as a scan on each of those dates
+    assert walk and walk == walk_reference(analyse, start, 3, 120)
+    assert as_of.min() >= pd.Timestamp("2024-05-01", tz="America/New_York").value
+
+    # the returned frame holds the same rows, dates in UTC
+    assert list(df.columns) == list(TradingAnalyse.walk_columns) and len(df) == len(walk)
+    assert str(df["as_of"].dt.tz) == "UTC"
+    assert sorted(df["as_of"].astype("int64").tolist()) == sorted(as_of.tolist())
+
+
+def test_walk_forward_nothing_found(folder, tmp_path):
+    analyse = make_analyse(folder, tmp_path, date=LAST)
+    df = analyse.process_walk_forward(["MISSING"], "all", [], start=datetime(2024, 6, 1))
+    assert df.empty and list(df.columns) == list(TradingAnalyse.walk_columns)
+    with np.load(tmp_path / "walk_symbols_all_daily_20240601_20240628.npz") as npz:
+        assert all(npz[k].shape == (0,) for k in TradingAnalyse.walk_columns)
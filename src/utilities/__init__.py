@@ -1,4 +1,6 @@
 from .dates import Dates
 from .plugin import Plugin
 from .tools import Tools
-from .utils import Utils
\ No newline at end of file
+from .utils import Utils
+from .timings import Timings
+from .profiler import ProcessProfiler
@@ -0,0 +1,146 @@
+import os
+import io
+import atexit
+import pstats
+import cProfile
+import logging
+from pathlib import Path
+from datetime import datetime
+from multiprocessing import util
+from typing import Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+# pstats key of a function: (file, line, name)
+Func = Tuple[str, int, str]
+
+
+def _label(func: Func) -> str:
+    file, line, name = func
+    if file == "~":
+        # built-in functions have no file
+        return name
+    return f"{name} ({Path(file).name}:{line})"
+
+
+def collapsed_stacks(stats: pstats.Stats, min_share: float = 1e-5) -> Dict[str, int]:
+    """
+    Stacks in the collapsed format of flamegraph.pl and speedscope, microseconds
+    of own time by `root;caller;...;function` stack.
+
+    cProfile only keeps caller-callee pairs, a function's time is split between
+    the stacks it was called from in proportion to the time each call edge took.
+    Recursive calls are folded into the first frame of the function. Stacks
+    under `min_share` of the total time are left out.
+    """
+    raw = stats.stats  # type: ignore[attr-defined]
+    min_us = max(1.0, stats.total_tt * 1e6 * min_share)  # type: ignore[attr-defined]
+    callees: Dict[Func, Dict[Func, float]] = {}
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller, (_, _, _, edge_ct) in callers.items():
+            callees.setdefault(caller, {})[func] = edge_ct
+    roots = [func for func, (_, _, _, _, callers) in raw.items() if not callers]
+
+    stacks: Dict[str, int] = {}
+    # (function, seconds of it on this stack, stack labels, functions on the stack)
+    todo: List[Tuple[Func, float, Tuple[str, ...], frozenset]] = [
+        (func, raw[func][3], (), frozenset()) for func in roots]
+    while todo:
+        func, seconds, path, seen = todo.pop()
+        _, _, tt, ct, _ = raw[func]
+        share = seconds / ct if ct else 0.0
+        path = path + (_label(func),)
+        own = int(tt * share * 1e6)
+        if own >= min_us:
+            key = ";".join(path)
+            stacks[key] = stacks.get(key, 0) + own
+        seen = seen | {func}
+        for callee, edge_ct in callees.get(func, {}).items():
+            if callee not in seen and edge_ct * share * 1e6 >= min_us:
+                todo.append((callee, edge_ct * share, path, seen))
+    return stacks
+
+
+class ProcessProfiler:
+    """
+    cProfile of this process and of every process it forks with multiprocessing,
+    e.g. the workers of a ProcessPoolExecutor.
+
+    Each process writes its stats to `folder` when it exits. The main process
+    then merges them and writes to `folder`:
+        merged.prof     pstats file of all processes, for snakeviz or pstats
+        report.txt      functions by cumulative then own time
+        collapsed.txt   collapsed stacks, for flamegraph.pl or speedscope
+
+    Only the main thread of each process is profiled. Workers are profiled when
+    they are forked, the default on Linux.
+
+    Parameters:
+    :param folder: Folder of the profile files
+    :type folder: Path
+    :param limit: Functions listed in each section of the report
+    :type limit: int
+    """
+
+    def __init__(self, folder: Path, limit: int = 60):
+        self.folder = Path(folder)
+        self.limit = limit
+        self.main_pid = os.getpid()
+        self.profile: Optional[cProfile.Profile] = None
+
+    def start(self):
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.profile = cProfile.Profile()
+        util.register_after_fork(self, ProcessProfiler._start_child)
+        atexit.register(self.stop)
+        self.profile.enable()
+
+    def _start_child(self):
+        # the profile copied from the parent is replaced by one of this process
+        if self.profile is not None:
+            self.profile.disable()
+        self.profile = cProfile.Profile()
+        # finalizers of a multiprocessing child run when it exits, atexit does not
+        util.Finalize(self, self._dump, exitpriority=100)
+        self.profile.enable()
+
+    def _dump(self) -> Path:
+        self.profile.disable()
+        role = "main" if os.getpid() == self.main_pid else "worker"
+        file = self.folder / f"{role}_{os.getpid()}.prof"
+        self.profile.dump_stats(file)
+        return file
+
+    def stop(self):
+        """Write the main process stats and merge those of every process"""
+        if self.profile is None or os.getpid() != self.main_pid:
+            return
+        atexit.unregister(self.stop)
+        self._dump()
+        self.profile = None
+
+        files = sorted(self.folder.glob("*_*.prof"))
+        stats = pstats.Stats(*map(str, files))
+        stats.dump_stats(self.folder / "merged.prof")
+
+        report = io.StringIO()
+        stats.stream = report
+        workers = sum(1 for file in files if file.name.startswith("worker_"))
+        report.write(f"Profile of {len(files)} processes, 1 main and {workers} workers\n")
+        report.write(f"{stats.total_calls} calls in {stats.total_tt:.3f}s summed over processes\n\n")
+        stats.sort_stats("cumulative").print_stats(self.limit)
+        stats.sort_stats("tottime").print_stats(self.limit)
+        (self.folder / "report.txt").write_text(report.getvalue())
+
+        stacks = collapsed_stacks(stats)
+        (self.folder / "collapsed.txt").write_text(
+            "".join(f"{stack} {us}\n" for stack, us in sorted(stacks.items())))
+        logger.info(f"Profile of {len(files)} processes written to {self.folder}")
+
+
+def start_profiler(log_folder: Path, name: str) -> ProcessProfiler:
+    """Profile this process and its workers into log_folder/profile/<name>_<time>"""
+    profiler = ProcessProfiler(Path(log_folder) / "profile" / f"{name}_{datetime.now():%Y%m%d_%H%M%S}")
+    profiler.start()
+    return profiler
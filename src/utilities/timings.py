@@ -0,0 +1,127 @@
+import time
+from typing import Dict, List, Optional
+
+
+class _NullTimer:
+    """Timer of a disabled Timings, does nothing"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("timings", "name", "start")
+
+    def __init__(self, timings: "Timings", name: str):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timings.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Timings:
+    """
+    Wall time and calls of named stages, and named counters, of one process.
+
+        with TIMINGS.time("get_max_min"):
+            ...
+        TIMINGS.count("symbols")
+
+    Disabled, time() returns a shared no-op timer and count() returns at once,
+    so instrumented code costs a method call per stage.
+    Worker processes send drain() back with their results, the parent merge()s them.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        # name: [calls, total seconds, max seconds]
+        self.stages: Dict[str, List[float]] = {}
+        self.counters: Dict[str, int] = {}
+
+    def reset(self, enabled: Optional[bool] = None):
+        if enabled is not None:
+            self.enabled = enabled
+        self.stages = {}
+        self.counters = {}
+
+    def time(self, name: str):
+        """Context manager adding its wall time to stage name"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def add(self, name: str, seconds: float, calls: int = 1):
+        stage = self.stages.get(name)
+        if stage is None:
+            self.stages[name] = [calls, seconds, seconds]
+        else:
+            stage[0] += calls
+            stage[1] += seconds
+            if seconds > stage[2]:
+                stage[2] = seconds
+
+    def count(self, name: str, n: int = 1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def drain(self) -> dict:
+        """Stages and counters recorded since the last drain, reset"""
+        snapshot = dict(stages=self.stages, counters=self.counters)
+        self.stages = {}
+        self.counters = {}
+        return snapshot
+
+    def merge(self, snapshot: Optional[dict]):
+        """Add the stages and counters of another process"""
+        if not snapshot:
+            return
+        for name, (calls, total, longest) in snapshot["stages"].items():
+            stage = self.stages.setdefault(name, [0, 0.0, 0.0])
+            stage[0] += calls
+            stage[1] += total
+            stage[2] = max(stage[2], longest)
+        for name, n in snapshot["counters"].items():
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def to_dict(self) -> dict:
+        timed = sum(total for _, total, _ in self.stages.values())
+        return dict(
+            stages={
+                name: dict(
+                    calls=int(calls),
+                    seconds=round(total, 6),
+                    mean_ms=round(total / calls * 1e3, 4) if calls else 0.0,
+                    max_ms=round(longest * 1e3, 4),
+                    share=round(total / timed, 4) if timed else 0.0)
+                for name, (calls, total, longest) in sorted(self.stages.items(), key=lambda kv: -kv[1][1])
+            },
+            counters=dict(self.counters),
+        )
+
+    def summary(self) -> str:
+        """Stages by total time, then the counters, as a text table"""
+        data = self.to_dict()
+        lines = [f"{'stage':<32} {'calls':>9} {'total s':>10} {'mean ms':>10} {'max ms':>10} {'share':>7}"]
+        for name, stage in data["stages"].items():
+            lines.append(
+                f"{name:<32} {stage['calls']:>9} {stage['seconds']:>10.3f} {stage['mean_ms']:>10.3f} "
+                f"{stage['max_ms']:>10.3f} {stage['share']:>7.1%}")
+        lines.extend(f"{name:<32} {n:>9}" for name, n in data["counters"].items())
+        return "\n".join(lines)
+
+
+# Timings of this process, enabled by the scan for itself and its workers
+TIMINGS = Timings()